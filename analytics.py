@@ -0,0 +1,186 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, extract
+
+from models import db, Presentation, Slide
+
+logger = logging.getLogger(__name__)
+
+# Per-user results are dropped on any write; the TTL only bounds date drift
+# (the 30-day and 12-month windows) and staleness across processes
+ANALYTICS_CACHE_TTL = float(os.environ.get('ANALYTICS_CACHE_TTL', 300))
+ANALYTICS_CACHE_SIZE = int(os.environ.get('ANALYTICS_CACHE_SIZE', 1000))
+
+RECENT_DAYS = 30
+RECENT_LIMIT = 10
+TOP_EDITED_LIMIT = 5
+
+
+class AnalyticsCache:
+    """Small LRU of computed analytics keyed by user id"""
+
+    def __init__(self, max_entries=ANALYTICS_CACHE_SIZE, ttl=ANALYTICS_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] <= time.time():
+                del self._entries[user_id]
+                entry = None
+            if not entry:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id, value):
+        with self._lock:
+            self._entries[user_id] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+
+_cache = AnalyticsCache()
+
+
+def invalidate_user_analytics(user_id):
+    """Call after any change to a user's presentations or slides"""
+    _cache.invalidate(user_id)
+
+
+def analytics_cache_stats():
+    return _cache.stats()
+
+
+def get_user_analytics(user_id):
+    """Return the analytics page data for a user, computing it on a cache miss"""
+    data = _cache.get(user_id)
+    if data is None:
+        started = time.perf_counter()
+        data = compute_user_analytics(user_id)
+        _cache.put(user_id, data)
+        logger.debug(f"Computed analytics for user {user_id} in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return data
+
+
+def hours_between(start, end):
+    """SQL expression for the hours from start to end on the current database"""
+    if db.engine.dialect.name == 'sqlite':
+        return (func.julianday(end) - func.julianday(start)) * 24
+    return extract('epoch', end - start) / 3600
+
+
+def compute_user_analytics(user_id):
+    """Aggregate a user's presentations and slides with GROUP BY queries"""
+    owned = Presentation.user_id == user_id
+    now = datetime.now().replace(tzinfo=None)
+
+    presentation_count, avg_slides = db.session.query(
+        func.count(Presentation.id), func.avg(Presentation.slide_count)
+    ).filter(owned).one()
+
+    template_usage = dict(
+        db.session.query(Presentation.template_id, func.count(Presentation.id))
+        .filter(owned)
+        .group_by(Presentation.template_id)
+        .all()
+    )
+
+    layout_usage = dict(
+        db.session.query(Slide.layout, func.count(Slide.id))
+        .join(Presentation, Slide.presentation_id == Presentation.id)
+        .filter(owned)
+        .group_by(Slide.layout)
+        .all()
+    )
+
+    # Day 0 is Sunday on both SQLite (strftime %w) and Postgres (dow)
+    weekday = extract('dow', Presentation.created_at)
+    days_data = [0] * 7
+    for day, count in db.session.query(weekday, func.count(Presentation.id))\
+            .filter(owned, Presentation.created_at.isnot(None))\
+            .group_by(weekday).all():
+        days_data[int(day)] = count
+
+    # Chart labels step back 30 days at a time from today, as before
+    months_labels = [(now - timedelta(days=30 * i)).strftime('%b %Y') for i in range(11, -1, -1)]
+    year = extract('year', Presentation.created_at)
+    month = extract('month', Presentation.created_at)
+    monthly_counts = {}
+    for y, m, count in db.session.query(year, month, func.count(Presentation.id))\
+            .filter(owned, Presentation.created_at >= now - timedelta(days=365))\
+            .group_by(year, month).all():
+        monthly_counts[datetime(int(y), int(m), 1).strftime('%b %Y')] = count
+    months_data = [monthly_counts.get(label, 0) for label in months_labels]
+
+    recent_filter = (owned, Presentation.created_at >= now - timedelta(days=RECENT_DAYS))
+    recent_count = Presentation.query.filter(*recent_filter).count()
+    recent_presentations = [
+        {
+            'id': row.id,
+            'topic': row.topic,
+            'template_id': row.template_id,
+            'slide_count': row.slide_count,
+            'created_at': row.created_at,
+            'updated_at': row.updated_at
+        }
+        for row in db.session.query(
+            Presentation.id, Presentation.topic, Presentation.template_id,
+            Presentation.slide_count, Presentation.created_at, Presentation.updated_at
+        ).filter(*recent_filter).order_by(Presentation.created_at.desc()).limit(RECENT_LIMIT)
+    ]
+
+    hours = hours_between(Presentation.created_at, Presentation.updated_at)
+    edits_per_hour = Presentation.slide_count / hours
+    top_edited = [
+        {'id': row.id, 'topic': row.topic, 'edits_per_hour': float(row.edits_per_hour)}
+        for row in db.session.query(Presentation.id, Presentation.topic, edits_per_hour.label('edits_per_hour'))
+        .filter(owned, Presentation.created_at.isnot(None), Presentation.updated_at > Presentation.created_at)
+        .order_by(edits_per_hour.desc())
+        .limit(TOP_EDITED_LIMIT)
+    ]
+
+    return {
+        'presentation_count': presentation_count,
+        'avg_slides': round(float(avg_slides or 0), 1),
+        'template_usage': template_usage,
+        'layout_usage': layout_usage,
+        'days_data': days_data,
+        'months_labels': months_labels,
+        'months_data': months_data,
+        'recent_count': recent_count,
+        'recent_presentations': recent_presentations,
+        'top_edited': top_edited
+    }
@@ -1,9 +1,11 @@
-from flask import Flask, request, jsonify, render_template, send_file, session, redirect, url_for
-from models import db, User, Presentation as PresentationModel, Slide
+from flask import Flask, request, jsonify, render_template, send_file, session, redirect, url_for, g, has_request_context, has_app_context
+from models import db, User, Presentation as PresentationModel, Slide, GenerationJob
 from auth import auth_bp, login_required
-from pptx_export import export_pptx_local
-from text_extraction_utils import process_uploaded_file, analyze_text_content, chunk_text, detect_headings_and_structure
+from pptx_export import export_pptx, export_pptx_local, get_export_cache, get_slide_cache
+from text_extraction_utils import process_uploaded_file, detect_headings_and_structure_enhanced, get_extraction_cache, MAX_UPLOAD_BYTES, DOCUMENT_PREVIEW_CHARS
+from documents import store_uploaded_document, store_text_document, load_document, purge_expired_documents
 import model_downloader
+from ollama_http import get_client as get_ollama_client
 from ollama_client import (
     generate_presentation_outline,
     generate_slides_from_outline,
@@ -11,6 +13,16 @@ from ollama_client import (
     generate_slides_from_outline_enhanced
 )
 from content_utils import process_content_for_layout
+from sse import format_sse, stream_worker_events, sse_response
+from jobs import job_manager, JobQueueFull, JobLimitExceeded
+from analytics import get_user_analytics, invalidate_user_analytics, analytics_cache_stats
+from retrieval import document_key
+from slide_ops import apply_slide_ops, replace_slides, PresentationNotFound, VersionConflict
+from db_engine import configure_database
+from pagination import presentation_summary_page
+from migrations import run_migrations
+import tracing
+import metrics
 import re
 import os
 import random
@@ -18,20 +30,19 @@ import json
 import requests
 import tempfile
 import logging
+import threading
 import calendar
 import textwrap
 from datetime import datetime, timedelta, timezone as dt_timezone
 from pytz import timezone as pytz_timezone
-from collections import Counter
 from sqlalchemy import func, extract, cast, Date
+from werkzeug.exceptions import RequestEntityTooLarge
 
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.dml.color import RGBColor
 
-from tkinter import Tk, filedialog  
-
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -44,11 +55,14 @@ logging.basicConfig(
 DEFAULT_DOCUMENT_MODE = 'preserve'  # Default mode for document processing
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev_key_change_in_production')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///pptgenerator.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES  # reject oversized uploads before reading the body
 
-db.init_app(app)
+configure_database(app, db)
+tracing.init_app(app)
+metrics.init_app(app)
 
+app.route('/api/export', methods=['POST'])(login_required(export_pptx))
 app.route('/api/export-local', methods=['POST'])(export_pptx_local)
 @app.template_filter('format_datetime')
 def format_datetime_filter(dt):
@@ -57,6 +71,11 @@ def format_datetime_filter(dt):
         return ""
     return dt.strftime('%b %d, %Y - %I:%M %p')
 
+@app.errorhandler(413)
+def request_too_large(e):
+    limit_mb = MAX_UPLOAD_BYTES / (1024 * 1024)
+    return jsonify({'error': f'Upload exceeds the {limit_mb:.0f}MB limit'}), 413
+
 @app.route('/api/model/status', methods=['GET'])
 def model_status():
     status = model_downloader.get_status()
@@ -67,6 +86,48 @@ def model_start_download():
     result = model_downloader.start_download()
     return jsonify(result)
 
+@app.route('/api/ollama/stats', methods=['GET'])
+def ollama_stats():
+    """Per-call latency and response cache summary for the shared Ollama client"""
+    client = get_ollama_client()
+    return jsonify({
+        'latency': client.latency_stats(),
+        'cache': client.cache.stats()
+    })
+
+@metrics.register_collector
+def collect_app_metrics():
+    depth = job_manager.queue_depth()
+    yield ('generation_jobs', 'gauge', 'Generation jobs waiting or running, by status.',
+           [({'status': status}, count) for status, count in depth.items()])
+    yield from metrics.cache_families({
+        'ollama_response': get_ollama_client().cache.stats(),
+        'extraction': get_extraction_cache().stats(),
+        'analytics': analytics_cache_stats(),
+        'pptx_export': get_export_cache().stats(),
+        'pptx_slides': get_slide_cache().stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Counters and latency histograms in the Prometheus text format"""
+    return app.response_class(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/traces', methods=['GET'])
+@login_required
+def list_traces():
+    """Recent request and job traces for the current user, newest first"""
+    return jsonify({'traces': tracing.recent_traces(session.get('user_id'))})
+
+@app.route('/api/traces/<request_id>', methods=['GET'])
+@login_required
+def get_trace(request_id):
+    """Per-stage spans for one request id (the X-Request-Id header) or job id"""
+    trace = tracing.get_trace(request_id)
+    if trace is None or trace.user_id != session.get('user_id'):
+        return jsonify({'error': 'Trace not found'}), 404
+    return jsonify(trace.to_dict())
+
 def is_model_downloaded():
     return model_downloader.is_model_downloaded()
 
@@ -247,7 +308,9 @@ def manage_slides(presentation_id):
         db.session.add(new_slide)
         presentation.slide_count += 1
         presentation.updated_at = datetime.now()
+        presentation.version += 1
         db.session.commit()
+        invalidate_user_analytics(user_id)
         
         return jsonify({
             'message': 'Slide added successfully',
@@ -257,37 +320,34 @@ def manage_slides(presentation_id):
     elif request.method == 'PUT':
         data = request.json
         
-        if 'slides' in data:
-            slides_data = data['slides']
-            
-            Slide.query.filter_by(presentation_id=presentation.id).delete()
-            
-            for i, slide_data in enumerate(slides_data):
-                slide = Slide(
-                    presentation_id=presentation.id,
-                    slide_order=i,
-                    layout=slide_data.get('layout'),
-                    content=slide_data.get('content', {})
-                )
-                db.session.add(slide)
-            
-            presentation.slide_count = len(slides_data)
-            
-        elif 'slide_id' in data:
-            slide_id = data['slide_id']
-            slide = Slide.query.filter_by(id=slide_id, presentation_id=presentation.id).first()
-            
-            if not slide:
-                return jsonify({'error': 'Slide not found'}), 404
-            
-            if 'layout' in data:
-                slide.layout = data['layout']
-            
-            if 'content' in data:
-                slide.content = data['content']
+        # Both forms go through the slide-ops path: rows are updated in place
+        # and an optional "version" is checked like the PATCH endpoint does
+        try:
+            if 'slides' in data:
+                replace_slides(user_id, presentation.id, data['slides'], version=data.get('version'))
+                
+            elif 'slide_id' in data:
+                slide_id = data['slide_id']
+                slide = Slide.query.filter_by(id=slide_id, presentation_id=presentation.id).first()
+                
+                if not slide:
+                    return jsonify({'error': 'Slide not found'}), 404
+                
+                op = {'op': 'update', 'slide_id': slide.id}
+                if 'layout' in data:
+                    op['layout'] = data['layout']
+                if 'content' in data:
+                    op['content'] = data['content']
+                apply_slide_ops(user_id, presentation.id, data.get('version', presentation.version), [op])
+                
+            else:
+                apply_slide_ops(user_id, presentation.id, data.get('version', presentation.version), [])
+        except VersionConflict as e:
+            return jsonify({'error': str(e), 'version': e.current_version}), 409
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        presentation.updated_at = datetime.now()
-        db.session.commit()
+        invalidate_user_analytics(user_id)
         
         return jsonify({
             'message': 'Slides updated successfully',
@@ -317,105 +377,57 @@ def manage_slides(presentation_id):
         
         presentation.slide_count -= 1
         presentation.updated_at = datetime.now()
+        presentation.version += 1
         
         db.session.commit()
+        invalidate_user_analytics(user_id)
         
         return jsonify({
             'message': 'Slide deleted successfully'
         })
 
 
+@app.route('/api/presentations/<int:presentation_id>/slides', methods=['PATCH'])
+@login_required
+def patch_slides(presentation_id):
+    """Apply slide-level ops (update, insert, delete, reorder) in one transaction.
+
+    Body: {"version": n, "ops": [...], "topic"?: str, "template"?: str}.
+    Responds 409 with the current version if the presentation changed since n.
+    """
+    user_id = session.get('user_id')
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+
+    if not isinstance(version, int):
+        return jsonify({'error': 'version is required'}), 400
+
+    try:
+        result = apply_slide_ops(
+            user_id, presentation_id, version, data.get('ops', []),
+            topic=data.get('topic'), template_id=data.get('template')
+        )
+    except PresentationNotFound:
+        return jsonify({'error': 'Presentation not found or unauthorized'}), 404
+    except VersionConflict as e:
+        return jsonify({'error': str(e), 'version': e.current_version}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    invalidate_user_analytics(user_id)
+    return jsonify({'message': 'Slides updated successfully', **result})
+
+
 @app.route('/analytics')
 @login_required
 def analytics():
     user_id = session.get('user_id')
     username = session.get('username')
     
-    presentation_count = PresentationModel.query.filter_by(user_id=user_id).count()
+    # Aggregated in SQL and cached per user until their presentations change
+    stats = get_user_analytics(user_id)
     
-    thirty_days_ago = datetime.now().replace(tzinfo=None) - timedelta(days=30)
-    recent_presentations = PresentationModel.query.filter_by(user_id=user_id)\
-        .filter(PresentationModel.created_at >= thirty_days_ago)\
-        .order_by(PresentationModel.created_at.desc()).all()
-    
-    all_presentations = PresentationModel.query.filter_by(user_id=user_id).all()
-    
-    template_usage = {}
-    for p in all_presentations:
-        if p.template_id not in template_usage:
-            template_usage[p.template_id] = 0
-        template_usage[p.template_id] += 1
-    
-    if presentation_count > 0:
-        avg_slides = sum([p.slide_count for p in all_presentations]) / presentation_count
-    else:
-        avg_slides = 0
-    
-    days_data = [0] * 7  
-    
-    for p in all_presentations:
-        if p.created_at:
-            day_of_week = p.created_at.weekday()
-            day_of_week = (day_of_week + 1) % 7
-            days_data[day_of_week] += 1
-    
-    all_slides = []
-    for pres in all_presentations:
-        all_slides.extend(pres.slides)
-    
-    layout_usage = {}
-    for slide in all_slides:
-        if slide.layout not in layout_usage:
-            layout_usage[slide.layout] = 0
-        layout_usage[slide.layout] += 1
-    
-    twelve_months_ago = datetime.now().replace(tzinfo=None) - timedelta(days=365)
-    
-    current_date = datetime.now()
-    months_labels = []
-    monthly_counts = {}
-    
-    for i in range(11, -1, -1):  
-        month_date = current_date - timedelta(days=30*i)
-        month_label = month_date.strftime('%b %Y')
-        months_labels.append(month_label)
-        monthly_counts[month_label] = 0
-    
-    for presentation in all_presentations:
-        if presentation.created_at:
-            if presentation.created_at >= twelve_months_ago:
-                month_label = presentation.created_at.strftime('%b %Y')
-                if month_label in monthly_counts:
-                    monthly_counts[month_label] += 1
-    
-    months_data = [monthly_counts.get(label, 0) for label in months_labels]
-    
-    edit_frequency = []
-    for p in all_presentations:
-        if p.created_at and p.updated_at:  
-            time_diff = p.updated_at - p.created_at
-            hours_since_creation = time_diff.total_seconds() / 3600
-            if hours_since_creation > 0:
-                edit_frequency.append({
-                    'id': p.id,
-                    'topic': p.topic,
-                    'edits_per_hour': (p.slide_count / hours_since_creation) if hours_since_creation else 0
-                })
-    
-    edit_frequency.sort(key=lambda x: x['edits_per_hour'], reverse=True)
-    top_edited = edit_frequency[:5]  
-    
-    return render_template('analytics.html',
-                          username=username,
-                          presentation_count=presentation_count,
-                          recent_presentations=recent_presentations,
-                          avg_slides=round(avg_slides, 1),
-                          template_usage=template_usage,
-                          layout_usage=layout_usage,
-                          days_data=days_data,
-                          months_labels=months_labels,
-                          months_data=months_data,
-                          top_edited=top_edited)
+    return render_template('analytics.html', username=username, **stats)
 
 @app.route('/')
 def index():
@@ -429,22 +441,22 @@ def dashboard():
     user_id = session.get('user_id')
     username = session.get('username')
     
-    presentations = PresentationModel.query.filter_by(user_id=user_id).order_by(PresentationModel.updated_at.desc()).all()
+    # First page only; the template pages through the rest via /api/presentations
+    presentations, next_cursor = presentation_summary_page(user_id)
     
-    thirty_days_ago = datetime.now().replace(tzinfo=None) - timedelta(days=30)
-    recent_count = PresentationModel.query.filter_by(user_id=user_id)\
-        .filter(PresentationModel.created_at >= thirty_days_ago).count()
+    # Counts come from the cached analytics rather than loading every deck
+    stats = get_user_analytics(user_id)
     
     fav_template = "None"
-    if presentations:
-        template_counts = Counter([p.template_id for p in presentations])
-        if template_counts:
-            fav_template = template_counts.most_common(1)[0][0]
+    if stats['template_usage']:
+        fav_template = max(stats['template_usage'].items(), key=lambda item: item[1])[0]
     
     return render_template('dashboard.html', 
                           username=username,
                           presentations=presentations,
-                          recent_count=recent_count,
+                          next_cursor=next_cursor,
+                          presentation_count=stats['presentation_count'],
+                          recent_count=stats['recent_count'],
                           fav_template=fav_template,
                           create_url=url_for('create'))
 # Update your editor route in app.py
@@ -467,189 +479,435 @@ def generate_page():
     
     return render_template('generate.html', method=method)
 
+def current_user_id():
+    """The signed-in user, or on a job worker thread the user who submitted the job"""
+    if has_request_context():
+        return session.get('user_id')
+    return g.get('job_user_id') if has_app_context() else None
+
+def resolve_document(document_id):
+    """Load a stored document by handle. Raises ValueError if it is unknown, expired or not the user's."""
+    return load_document(document_id, current_user_id())
+
+def resolve_content_data(content_data):
+    """Fill in full_text and chunks for content data that only carries a document handle"""
+    if not content_data:
+        return content_data
+    if content_data.get('full_text') and not content_data.get('document_id'):
+        # Raw text has no document id to key its retrieval index by; hash it once here, not per slide
+        return dict(content_data, index_key=document_key(content_data['full_text']))
+    if content_data.get('full_text') or not content_data.get('document_id'):
+        return content_data
+    
+    document = resolve_document(content_data['document_id'])
+    return dict(
+        content_data,
+        full_text=document['text'],
+        chunks=document['chunks'],
+        analysis=content_data.get('analysis') or document['analysis']
+    )
+
+def parse_outline_request(data):
+    """Validate an outline request body and build the generation arguments.
+    
+    Raises ValueError with a user-facing message when the input is invalid.
+    """
+    topic = data.get('topic', '').strip()
+    slide_count = int(data.get('slideCount', 5))
+    input_method = data.get('inputMethod', 'topic')
+    
+    # Validate common requirements
+    if not topic:
+        raise ValueError('Topic is required')
+    
+    if not (1 <= slide_count <= 10):
+        raise ValueError('Slide count must be between 1 and 10')
+    
+    # Handle different input methods
+    content_context = None
+    processing_mode = 'generate'
+    
+    if input_method == 'text':
+        text_content = data.get('textContent', '')
+        text_stats = data.get('textStats', {})
+        if data.get('documentId') and not text_content:
+            document = resolve_document(data['documentId'])
+            text_content = document['text']
+            text_stats = text_stats or document['analysis']
+        
+        if not text_content or len(text_content.strip()) < 50:
+            raise ValueError('Text content must be at least 50 characters')
+        
+        content_context = {
+            'type': 'text',
+            'content': text_content,
+            'stats': text_stats,
+            'word_count': len(text_content.split()),
+            'char_count': len(text_content)
+        }
+        processing_mode = 'preserve'
+        
+    elif input_method == 'upload':
+        document_content = data.get('documentContent', '')
+        document_stats = data.get('documentStats', {})
+        if data.get('documentId') and not document_content:
+            document = resolve_document(data['documentId'])
+            document_content = document['text']
+            document_stats = document_stats or document['analysis']
+        processing_mode = data.get('processingMode', 'preserve')
+        
+        if not document_content or len(document_content.strip()) < 50:
+            raise ValueError('Document content must be at least 50 characters')
+        
+        content_context = {
+            'type': 'document',
+            'content': document_content,
+            'stats': document_stats,
+            'processing_mode': processing_mode,
+            'word_count': len(document_content.split()),
+            'char_count': len(document_content)
+        }
+    
+    return {
+        'topic': topic,
+        'slide_count': slide_count,
+        'input_method': input_method,
+        'content_context': content_context,
+        'processing_mode': processing_mode,
+        'use_cache': not data.get('bypassCache', False)
+    }
+
+def build_outline_response(params, on_token=None, cancelled=None):
+    """Run outline generation for parsed request params and build the response payload"""
+    input_method = params['input_method']
+    content_context = params['content_context']
+    
+    logging.info(f"🎯 Generating outline: method={input_method}, topic='{params['topic']}', slides={params['slide_count']}")
+    
+    # Generate outline with content context
+    outline = generate_presentation_outline_enhanced(
+        topic=params['topic'],
+        slide_count=params['slide_count'],
+        input_method=input_method,
+        content_context=content_context,
+        processing_mode=params['processing_mode'],
+        on_token=on_token,
+        use_cache=params['use_cache'],
+        cancelled=cancelled
+    )
+    
+    if not outline:
+        return None
+    
+    # Add generation metadata
+    outline['generation_metadata'] = {
+        'input_method': input_method,
+        'processing_mode': params['processing_mode'],
+        'content_stats': content_context.get('stats', {}) if content_context else {},
+        'generated_at': datetime.now().isoformat(),
+        'slide_count_requested': params['slide_count'],
+        'slide_count_generated': len(outline.get('slide_structure', []))
+    }
+    
+    logging.info(f"✅ Enhanced outline generated: {len(outline['slide_structure'])} slides from {input_method}")
+    
+    return {
+        'outline': outline,
+        'message': f'Outline generated successfully from {input_method}',
+        'input_method': input_method,
+        'processing_mode': params['processing_mode']
+    }
+
 # Ensure your outline generation endpoint works
 @app.route('/api/generate-outline', methods=['POST'])
 @login_required
 def generate_outline_enhanced():
     """Enhanced outline generation supporting all input methods"""
     try:
-        data = request.json
-        topic = data.get('topic', '').strip()
-        slide_count = int(data.get('slideCount', 5))
-        input_method = data.get('inputMethod', 'topic')
-        
-        logging.info(f"🎯 Generating outline: method={input_method}, topic='{topic}', slides={slide_count}")
-        
-        # Validate common requirements
-        if not topic:
-            return jsonify({'error': 'Topic is required'}), 400
-        
-        if not (1 <= slide_count <= 10):
-            return jsonify({'error': 'Slide count must be between 1 and 10'}), 400
-        
-        # Handle different input methods
-        content_context = None
-        processing_mode = 'generate'
+        try:
+            params = parse_outline_request(request.json)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if input_method == 'text':
-            text_content = data.get('textContent', '')
-            text_stats = data.get('textStats', {})
-            
-            if not text_content or len(text_content.strip()) < 50:
-                return jsonify({'error': 'Text content must be at least 50 characters'}), 400
-            
-            content_context = {
-                'type': 'text',
-                'content': text_content,
-                'stats': text_stats,
-                'word_count': len(text_content.split()),
-                'char_count': len(text_content)
-            }
-            processing_mode = 'preserve'
-            
-        elif input_method == 'upload':
-            document_content = data.get('documentContent', '')
-            document_stats = data.get('documentStats', {})
-            processing_mode = data.get('processingMode', 'preserve')
-            
-            if not document_content or len(document_content.strip()) < 50:
-                return jsonify({'error': 'Document content must be at least 50 characters'}), 400
-            
-            content_context = {
-                'type': 'document',
-                'content': document_content,
-                'stats': document_stats,
-                'processing_mode': processing_mode,
-                'word_count': len(document_content.split()),
-                'char_count': len(document_content)
-            }
+        result = build_outline_response(params)
         
-        # Generate outline with content context
-        outline = generate_presentation_outline_enhanced(
-            topic=topic,
-            slide_count=slide_count,
-            input_method=input_method,
-            content_context=content_context,
-            processing_mode=processing_mode
-        )
-        
-        if not outline:
+        if not result:
             return jsonify({'error': 'Failed to generate outline'}), 500
         
-        # Add generation metadata
-        outline['generation_metadata'] = {
-            'input_method': input_method,
-            'processing_mode': processing_mode,
-            'content_stats': content_context.get('stats', {}) if content_context else {},
-            'generated_at': datetime.now().isoformat(),
-            'slide_count_requested': slide_count,
-            'slide_count_generated': len(outline.get('slide_structure', []))
-        }
-        
-        logging.info(f"✅ Enhanced outline generated: {len(outline['slide_structure'])} slides from {input_method}")
-        
-        return jsonify({
-            'outline': outline,
-            'message': f'Outline generated successfully from {input_method}',
-            'input_method': input_method,
-            'processing_mode': processing_mode
-        })
+        return jsonify(result)
         
     except Exception as e:
         logging.error(f"❌ Error in enhanced outline generation: {e}")
         return jsonify({'error': f'Outline generation failed: {str(e)}'}), 500
 
+@app.route('/api/generate-outline/stream', methods=['POST'])
+@login_required
+def generate_outline_stream():
+    """Streaming outline generation: 'token' events while the model writes, then 'outline'"""
+    try:
+        params = parse_outline_request(request.json)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def work(emit, cancelled):
+        result = build_outline_response(params, on_token=lambda text: emit('token', {'text': text}),
+                                        cancelled=cancelled)
+        if cancelled.is_set():
+            return
+        if not result:
+            emit('error', {'error': 'Failed to generate outline'})
+            return
+        emit('outline', result)
+    
+    return sse_response(stream_worker_events(work))
+
+def parse_slides_request(data):
+    """Validate a generate-from-outline request body. Raises ValueError when invalid."""
+    outline = data.get('outline')
+    template_id = data.get('template')
+    
+    if not outline or not template_id:
+        raise ValueError('Outline and template are required')
+    
+    return {
+        'outline': outline,
+        'template_id': template_id,
+        'content_data': resolve_content_data(data.get('contentData')),  # Original content for context
+        'processing_mode': data.get('processingMode', 'preserve'),
+        'use_cache': not data.get('bypassCache', False)
+    }
+
+def build_slides_response(params, on_event=None, cancelled=None):
+    """Generate slides for parsed request params and build the response payload"""
+    outline = params['outline']
+    template_id = params['template_id']
+    content_data = params['content_data']
+    processing_mode = params['processing_mode']
+    
+    # Extract metadata
+    generation_metadata = outline.get('generation_metadata', {})
+    input_method = generation_metadata.get('input_method', 'topic')
+    
+    logging.info(f"🎨 Generating slides from outline: method={input_method}, slides={len(outline['slide_structure'])}")
+    
+    # Generate slides with enhanced context
+    slides = generate_slides_from_outline_enhanced(
+        outline=outline,
+        template_id=template_id,
+        content_data=content_data,
+        processing_mode=processing_mode,
+        on_event=on_event,
+        cancelled=cancelled,
+        use_cache=params['use_cache']
+    )
+    
+    if not slides:
+        return None
+    
+    logging.info(f"✅ Generated {len(slides)} slides from enhanced outline")
+    
+    return {
+        'slides': slides,
+        'template': template_id,
+        'outline': outline,
+        'slide_count': len(slides),
+        'generation_method': f'{input_method}-outline-based',
+        'processing_mode': processing_mode,
+        'input_method': input_method,
+        'content_preserved': content_data is not None
+    }
+
 # Ensure your slide generation from outline works
 @app.route('/api/generate-from-outline', methods=['POST'])
 @login_required
 def generate_from_outline_enhanced():
     """Enhanced slide generation from outline with content context"""
     try:
-        data = request.json
-        outline = data.get('outline')
-        template_id = data.get('template')
-        content_data = data.get('contentData')  # Original content for context
-        processing_mode = data.get('processingMode', 'preserve')
-        
-        if not outline or not template_id:
-            return jsonify({'error': 'Outline and template are required'}), 400
+        try:
+            params = parse_slides_request(request.json)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Extract metadata
-        generation_metadata = outline.get('generation_metadata', {})
-        input_method = generation_metadata.get('input_method', 'topic')
+        result = build_slides_response(params)
         
-        logging.info(f"🎨 Generating slides from outline: method={input_method}, slides={len(outline['slide_structure'])}")
-        
-        # Generate slides with enhanced context
-        slides = generate_slides_from_outline_enhanced(
-            outline=outline,
-            template_id=template_id,
-            content_data=content_data,
-            processing_mode=processing_mode
-        )
-        
-        if not slides:
+        if not result:
             return jsonify({'error': 'Failed to generate slides from outline'}), 500
         
-        logging.info(f"✅ Generated {len(slides)} slides from enhanced outline")
-        
-        return jsonify({
-            'slides': slides,
-            'template': template_id,
-            'outline': outline,
-            'slide_count': len(slides),
-            'generation_method': f'{input_method}-outline-based',
-            'processing_mode': processing_mode,
-            'input_method': input_method,
-            'content_preserved': content_data is not None
-        })
+        return jsonify(result)
         
     except Exception as e:
         logging.error(f"❌ Error generating slides from enhanced outline: {e}")
         return jsonify({'error': f'Slide generation failed: {str(e)}'}), 500
 
+@app.route('/api/generate-from-outline/stream', methods=['POST'])
+@login_required
+def generate_from_outline_stream():
+    """Streaming slide generation: per-slide 'slide_started' and 'slide_done' events, then 'complete'"""
+    try:
+        params = parse_slides_request(request.json)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def work(emit, cancelled):
+        emit('outline', {'slide_count': len(params['outline'].get('slide_structure', []))})
+        result = build_slides_response(params, on_event=emit, cancelled=cancelled)
+        if cancelled.is_set():
+            return
+        if not result:
+            emit('error', {'error': 'Failed to generate slides from outline'})
+            return
+        emit('complete', result)
+    
+    return sse_response(stream_worker_events(work))
+
+def parse_presentation_request(data):
+    """Validate a generate-presentation request body. Raises ValueError when invalid."""
+    if not data.get('outline') or not data.get('template'):
+        raise ValueError('Outline and template are required')
+    return dict(data, contentData=resolve_content_data(data.get('contentData')))
+
+def build_presentation_response(data, on_event=None):
+    """Run the outline → theme → slides flow for a validated request body"""
+    method = data.get('method', 'topic')
+    outline = data.get('outline')
+    template_id = data.get('template')
+    use_cache = not data.get('bypassCache', False)
+    
+    # Generate slides from outline
+    if method in ['text', 'upload'] and data.get('contentData'):
+        # Use enhanced generation with content context
+        slides = generate_slides_from_outline_enhanced(
+            outline=outline,
+            template_id=template_id,
+            content_data=data.get('contentData'),
+            processing_mode=data.get('processingMode', 'preserve'),
+            on_event=on_event,
+            use_cache=use_cache
+        )
+    else:
+        # Use standard outline-based generation
+        slides = generate_slides_from_outline(outline, template_id, use_cache=use_cache)
+    
+    if not slides:
+        return None
+    
+    return {
+        'slides': slides,
+        'template': template_id,
+        'outline': outline,
+        'slide_count': len(slides),
+        'generation_method': f'{method}-outline-based',
+        'success': True
+    }
+
 @app.route('/api/generate-presentation', methods=['POST'])
 @login_required
 def generate_presentation_new_flow():
     """Generate presentation using the new outline → theme → slides flow"""
     try:
-        data = request.json
-        method = data.get('method', 'topic')
-        outline = data.get('outline')
-        template_id = data.get('template')
-        
-        if not outline or not template_id:
-            return jsonify({'error': 'Outline and template are required'}), 400
-        
-        # Generate slides from outline
-        if method in ['text', 'upload'] and data.get('contentData'):
-            # Use enhanced generation with content context
-            slides = generate_slides_from_outline_enhanced(
-                outline=outline,
-                template_id=template_id,
-                content_data=data.get('contentData'),
-                processing_mode=data.get('processingMode', 'preserve')
-            )
-        else:
-            # Use standard outline-based generation
-            slides = generate_slides_from_outline(outline, template_id)
+        try:
+            data = parse_presentation_request(request.json)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        result = build_presentation_response(data)
         
-        if not slides:
+        if not result:
             return jsonify({'error': 'Failed to generate slides from outline'}), 500
         
-        return jsonify({
-            'slides': slides,
-            'template': template_id,
-            'outline': outline,
-            'slide_count': len(slides),
-            'generation_method': f'{method}-outline-based',
-            'success': True
-        })
+        return jsonify(result)
         
     except Exception as e:
         logging.error(f"Error in new presentation generation flow: {e}")
         return jsonify({'error': f'Presentation generation failed: {str(e)}'}), 500
 
+def run_outline_job(payload, emit):
+    result = build_outline_response(parse_outline_request(payload), on_token=lambda text: emit('token', {'text': text}))
+    if not result:
+        raise RuntimeError('Failed to generate outline')
+    return result
+
+def run_slides_job(payload, emit):
+    result = build_slides_response(parse_slides_request(payload), on_event=emit)
+    if not result:
+        raise RuntimeError('Failed to generate slides from outline')
+    return result
+
+def run_presentation_job(payload, emit):
+    result = build_presentation_response(parse_presentation_request(payload), on_event=emit)
+    if not result:
+        raise RuntimeError('Failed to generate slides from outline')
+    return result
+
+# Job kinds mirror the synchronous endpoints and take the same request bodies
+job_manager.register('generate-outline', run_outline_job, validate=parse_outline_request)
+job_manager.register('generate-from-outline', run_slides_job, validate=parse_slides_request)
+job_manager.register('generate-presentation', run_presentation_job, validate=parse_presentation_request)
+
+@app.route('/api/jobs/<kind>', methods=['POST'])
+@login_required
+def submit_job(kind):
+    """Queue a generation job; the body is the same as the matching /api/<kind> endpoint"""
+    try:
+        job = job_manager.submit(session.get('user_id'), kind, request.json or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except JobLimitExceeded as e:
+        return jsonify({'error': str(e)}), 429
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    
+    return jsonify({
+        'job': job.to_dict(),
+        'status_url': url_for('job_status', job_id=job.id),
+        'result_url': url_for('job_result', job_id=job.id),
+        'events_url': url_for('job_events', job_id=job.id)
+    }), 202
+
+def get_user_job(job_id):
+    return GenerationJob.query.filter_by(id=job_id, user_id=session.get('user_id')).first()
+
+@app.route('/api/jobs', methods=['GET'])
+@login_required
+def list_jobs():
+    jobs = GenerationJob.query.filter_by(user_id=session.get('user_id'))\
+        .order_by(GenerationJob.created_at.desc()).limit(50).all()
+    return jsonify({'jobs': [job.to_dict() for job in jobs]})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    job = get_user_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job': job.to_dict()})
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+@login_required
+def job_result(job_id):
+    job = get_user_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status == 'failed':
+        return jsonify({'error': job.error or 'Generation failed', 'job': job.to_dict()}), 500
+    if job.status != 'completed':
+        return jsonify({'error': 'Job has not finished yet', 'job': job.to_dict()}), 409
+    return jsonify(job.result)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+@login_required
+def job_events(job_id):
+    """Subscribe to a job's progress as Server-Sent Events until it finishes"""
+    job = get_user_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def frames():
+        for item in job_manager.subscribe(job):
+            yield ": keep-alive\n\n" if item is None else format_sse(*item)
+    
+    return sse_response(frames())
+
 @app.route('/editor/<int:presentation_id>')
 @login_required
 def edit_presentation(presentation_id):
@@ -693,6 +951,7 @@ def save_presentation():
         db.session.add(slide)
     
     db.session.commit()
+    invalidate_user_analytics(user_id)
     
     return jsonify({
         'message': 'Presentation saved successfully',
@@ -702,8 +961,29 @@ def save_presentation():
 @app.route('/api/presentations', methods=['GET'])
 @login_required
 def list_presentations():
+    """List presentations; ?view=summary returns keyset-paginated rows without slides"""
     user_id = session.get('user_id')
     
+    if request.args.get('view') == 'summary':
+        try:
+            items, next_cursor = presentation_summary_page(
+                user_id,
+                limit=request.args.get('limit'),
+                cursor=request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        for item in items:
+            item['created_at_display'] = format_datetime_filter(item['created_at'])
+            item['created_at'] = item['created_at'].isoformat() if item['created_at'] else None
+            item['updated_at'] = item['updated_at'].isoformat() if item['updated_at'] else None
+        
+        return jsonify({
+            'presentations': items,
+            'next_cursor': next_cursor
+        })
+    
     presentations = PresentationModel.query.filter_by(user_id=user_id).order_by(PresentationModel.updated_at.desc()).all()
     
     return jsonify({
@@ -737,6 +1017,7 @@ def delete_presentation(presentation_id):
         Slide.query.filter_by(presentation_id=presentation_id).delete()
         db.session.delete(presentation)
         db.session.commit()
+        invalidate_user_analytics(presentation.user_id)
         return jsonify({'message': 'Presentation deleted successfully'})
     except Exception as e:
         db.session.rollback()
@@ -762,23 +1043,16 @@ def update_existing_presentation(presentation_id):
     if not topic or not template_id or not slides:
         return jsonify({'error': 'Missing required fields'}), 400
     
-    presentation.topic = topic
-    presentation.template_id = template_id
-    presentation.slide_count = len(slides)
-    presentation.updated_at = datetime.now()
-    
-    Slide.query.filter_by(presentation_id=presentation.id).delete()
-    
-    for i, slide_data in enumerate(slides):
-        slide = Slide(
-            presentation_id=presentation.id,
-            slide_order=i,
-            layout=slide_data.get('layout'),
-            content=slide_data.get('content', {})
-        )
-        db.session.add(slide)
+    # Diffed against the stored slides, so unchanged rows are left alone
+    try:
+        replace_slides(user_id, presentation.id, slides, version=data.get('version'),
+                       topic=topic, template_id=template_id)
+    except VersionConflict as e:
+        return jsonify({'error': str(e), 'version': e.current_version}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    db.session.commit()
+    invalidate_user_analytics(user_id)
     
     return jsonify({
         'message': 'Presentation updated successfully',
@@ -815,7 +1089,12 @@ def edit_existing_presentation(presentation_id):
         return redirect(url_for('dashboard'))
 
 @app.route('/api/process-document', methods=['POST'])
+@login_required
 def process_document():
+    # Refuse oversized uploads from the Content-Length header, before reading the body
+    if request.content_length and request.content_length > MAX_UPLOAD_BYTES:
+        return request_too_large(None)
+    
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file provided'}), 400
@@ -825,21 +1104,21 @@ def process_document():
         if not file or not file.filename:
             return jsonify({'error': 'No file selected'}), 400
         
-        # Process the uploaded file
+        # Process the uploaded file; the text stays on the server behind a document handle
         with tempfile.TemporaryDirectory() as temp_dir:
             result, error = process_uploaded_file(file, temp_dir)
             
             if error:
                 return jsonify({'error': error}), 400
             
-            # Convert chunks generator to list once
-            chunks = list(chunk_text(result['text']))
+            analysis = result['analysis']
+            document = store_uploaded_document(session.get('user_id'), result)
             
             # Structure the content for slide generation
             structured_content = {
-                'full_text': result['text'],
-                'analysis': result['analysis'],
-                'chunks': chunks,
+                'document_id': document.id,
+                'preview': result['preview'],
+                'analysis': analysis,
                 'processing_method': 'document_upload',
                 'file_info': {
                     'original_filename': result['original_filename'],
@@ -849,29 +1128,38 @@ def process_document():
             
             return jsonify({
                 'success': True,
+                'document': {
+                    'id': document.id,
+                    'filename': result['original_filename'],
+                    'type': result['file_type'],
+                    'cached': result['cached']
+                },
                 'content': structured_content,
-                'extracted_text': result['text'],
                 # NOTE: Removed 'suggested_slides' - Ollama will determine this
                 'file_info': {
                     'filename': result['original_filename'],
                     'type': result['file_type']
                 },
                 'stats': {
-                    'characters': result['analysis']['chars'],
-                    'words': result['analysis']['words'],
-                    'sentences': result['analysis']['sentences'],
-                    'paragraphs': result['analysis']['paragraphs'],
-                    'chunks': len(chunks),
-                    'readability': result['analysis']['readability']
+                    'characters': analysis['chars'],
+                    'words': analysis['words'],
+                    'sentences': analysis['sentences'],
+                    'paragraphs': analysis['paragraphs'],
+                    'chunks': result['chunk_count'],
+                    'readability': analysis['readability'],
+                    'cached': result['cached']
                 },
                 'message': 'Document processed successfully. Ollama will determine optimal slide count.'
             })
             
+    except RequestEntityTooLarge as e:
+        return request_too_large(e)
     except Exception as e:
         logging.error(f"Error processing document: {e}")
         return jsonify({'error': f'Document processing failed: {str(e)}'}), 500
 
 @app.route('/api/process-text', methods=['POST'])
+@login_required
 def process_text_content():
     """Process pasted text content for presentation generation"""
     try:
@@ -884,17 +1172,14 @@ def process_text_content():
         if len(text_content) < 50:
             return jsonify({'error': 'Text content too short (minimum 50 characters)'}), 400
         
-        # Analyze the text
-        analysis = analyze_text_content(text_content)
-        
-        # Create chunks for better processing
-        chunks = list(chunk_text(text_content))
+        # Store the text once; generation requests refer to it by id
+        document, analysis = store_text_document(session.get('user_id'), text_content)
         
         # Structure the content for slide generation
         structured_content = {
-            'full_text': text_content,
+            'document_id': document.id,
+            'preview': text_content[:DOCUMENT_PREVIEW_CHARS],
             'analysis': analysis,
-            'chunks': chunks,
             'processing_method': 'text_input'
         }
         
@@ -907,7 +1192,7 @@ def process_text_content():
                 'words': analysis['words'],
                 'sentences': analysis['sentences'],
                 'paragraphs': analysis['paragraphs'],
-                'chunks': len(chunks),
+                'chunks': document.chunk_count,
                 'readability': analysis['readability']
             },
             'message': 'Text processed successfully. Ollama will determine optimal slide count.'
@@ -938,15 +1223,18 @@ def process_headings():
     method = data.get('method', 'text')
     processing_mode = data.get('processing_mode', 'preserve')
     
+    if method not in ('text', 'upload'):
+        return jsonify({'error': 'Invalid method'}), 400
+    
+    try:
+        if data.get('documentId'):
+            # Stored documents are split server-side instead of round-tripping the text
+            content = resolve_document(data['documentId'])['text']
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
-        if method == 'text':
-            # Process text and detect headings
-            slides_structure = detect_headings_and_structure(content)
-        elif method == 'upload':
-            # Process uploaded document
-            slides_structure = detect_headings_and_structure(content)
-        else:
-            return jsonify({'error': 'Invalid method'}), 400
+        slides_structure = detect_headings_and_structure_enhanced(content)
         
         return jsonify({
             'success': True,
@@ -961,9 +1249,41 @@ def process_headings():
         logging.error(f"Error processing headings: {e}")
         return jsonify({'error': str(e)}), 500
     
-with app.app_context():
-    db.create_all()
+_started = False
+_startup_lock = threading.Lock()
+
+
+def startup():
+    """Create and migrate the schema, purge expired documents and start the job workers
+
+    Kept out of module import because PDF extraction workers are spawned
+    processes that re-import the main module; they must not run migrations
+    or pick up queued jobs. Entry points may call this before serving, and
+    otherwise the first request runs it, so `flask run` and WSGI servers
+    serving app:app get the same setup.
+    """
+    global _started
+    if _started:
+        return
+    with _startup_lock:
+        if _started:
+            return
+
+        with app.app_context():
+            db.create_all()
+            run_migrations()
+            purge_expired_documents()
+
+        job_manager.init_app(app)
+        _started = True
+
+
+@app.before_request
+def ensure_started():
+    startup()
+
 
 if __name__ == '__main__':
+    startup()
     app.run(debug=True)
 
@@ -1,14 +1,24 @@
 # app_wrapper.py
 import webview
 import threading
+import multiprocessing
 import os
-from app import app  # Make sure app.py exposes the Flask app
+
+# Save exports through a native dialog; pywebview does not handle browser downloads
+os.environ.setdefault('PPT_DESKTOP_EXPORT', '1')
+
+from app import app, startup  # Make sure app.py exposes the Flask app
 
 def start_flask():
     # Run Flask in a separate thread so it doesn't block the GUI
     app.run(host='127.0.0.1', port=51285, debug=False, use_reloader=False)
 
 if __name__ == '__main__':
+    # In the frozen build, PDF extraction workers relaunch this executable;
+    # freeze_support() runs the worker and exits before any app startup
+    multiprocessing.freeze_support()
+    startup()
+
     # Start Flask in a background thread
     flask_thread = threading.Thread(target=start_flask)
     flask_thread.daemon = True
@@ -0,0 +1,74 @@
+"""Time iter_chunks on 1 MB and 10 MB inputs, including pathological ones,
+and check that the cost grows linearly with the input.
+
+    python benchmarks/chunking.py [--mb 10] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_extraction_utils import iter_chunks, CHUNK_SIZE, CHUNK_OVERLAP
+from headings import generate_document
+
+# Cost per MB may grow by at most this factor from the small to the large input
+MAX_SCALING = 1.5
+
+
+def inputs(size):
+    return {
+        'prose': lambda: generate_document(size),
+        'no boundaries': lambda: 'x' * size,
+        'sentence every 2 chars': lambda: '. ' * (size // 2),
+        'only newlines around words': lambda: 'word\n\n\n' * (size // 7),
+    }
+
+
+SETTINGS = {
+    'default sizes': (CHUNK_SIZE, CHUNK_OVERLAP),
+    'overlap > chunk size': (150, 400),
+}
+
+
+def time_chunking(text, chunk_size, overlap, repeat, piece_size=64 * 1024):
+    best = None
+    for _ in range(repeat):
+        pieces = (text[i:i + piece_size] for i in range(0, len(text), piece_size))
+        started = time.perf_counter()
+        count = sum(1 for _ in iter_chunks(pieces, chunk_size, overlap))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mb', type=float, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    large = int(args.mb * 1024 * 1024)
+    small = large // 10
+    failures = 0
+
+    print(f"{'input':<28} {'settings':<22} {'chunks':>9} {'MB/s':>8} {'scaling':>8}")
+    for input_name in inputs(0):
+        small_text = inputs(small)[input_name]()
+        large_text = inputs(large)[input_name]()
+        for settings_name, (chunk_size, overlap) in SETTINGS.items():
+            small_time, _ = time_chunking(small_text, chunk_size, overlap, args.repeat)
+            large_time, count = time_chunking(large_text, chunk_size, overlap, args.repeat)
+            # Per-byte cost of the large input relative to the small one; 1.0 is perfectly linear
+            scaling = (large_time / len(large_text)) / (small_time / len(small_text))
+            verdict = '' if scaling <= MAX_SCALING else '  NOT LINEAR'
+            failures += bool(verdict)
+            print(f"{input_name:<28} {settings_name:<22} {count:>9} "
+                  f"{len(large_text) / 1024 / 1024 / large_time:>8.1f} {scaling:>8.2f}{verdict}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Time the hot presentation/slide queries on a seeded SQLite database,
+before and after the index migration.
+
+    python benchmarks/db_indexes.py [--slides 100000] [--repeat 200]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+from models import db, Presentation, Slide
+from migrations import run_migrations
+
+USERS = 200
+SLIDES_PER_PRESENTATION = 10
+
+QUERIES = {
+    'dashboard page (user, updated_at desc)': (
+        "SELECT id, topic, template_id, slide_count, created_at, updated_at FROM presentations "
+        "WHERE user_id = :user_id ORDER BY updated_at DESC, id DESC LIMIT 24"
+    ),
+    'recent count (user, created_at)': (
+        "SELECT count(*) FROM presentations WHERE user_id = :user_id AND created_at >= :since"
+    ),
+    'slides of a deck (presentation, slide_order)': (
+        "SELECT id, layout, content_json FROM slides WHERE presentation_id = :presentation_id ORDER BY slide_order"
+    ),
+    'layout usage (join + group by)': (
+        "SELECT s.layout, count(s.id) FROM slides s JOIN presentations p ON s.presentation_id = p.id "
+        "WHERE p.user_id = :user_id GROUP BY s.layout"
+    ),
+}
+
+
+def seed(engine, slide_total):
+    presentation_total = slide_total // SLIDES_PER_PRESENTATION
+    now = datetime.now()
+    rng = random.Random(42)
+
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, password_hash, created_at) VALUES (:id, :u, 'x', :t)"),
+                     [{'id': u, 'u': f'user{u}', 't': now} for u in range(1, USERS + 1)])
+
+        presentations = []
+        slides = []
+        for pid in range(1, presentation_total + 1):
+            created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+            presentations.append({
+                'id': pid, 'user_id': rng.randint(1, USERS), 'topic': f'Deck {pid}', 'template_id': 'corporate',
+                'slide_count': SLIDES_PER_PRESENTATION, 'created_at': created,
+                'updated_at': created + timedelta(minutes=rng.randint(0, 600))
+            })
+            for order in range(SLIDES_PER_PRESENTATION):
+                slides.append({'presentation_id': pid, 'slide_order': order, 'layout': rng.choice(
+                    ['titleOnly', 'titleAndBullets', 'quote', 'imageAndParagraph']), 'content_json': '{}'})
+
+        conn.execute(Presentation.__table__.insert(), presentations)
+        conn.execute(Slide.__table__.insert(), slides)
+    return presentation_total
+
+
+def drop_indexes(engine):
+    with engine.begin() as conn:
+        for table in (Presentation.__table__, Slide.__table__):
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+
+def time_queries(engine, presentation_total, repeat):
+    rng = random.Random(7)
+    since = datetime.now() - timedelta(days=30)
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            params = [{'user_id': rng.randint(1, USERS), 'since': since,
+                       'presentation_id': rng.randint(1, presentation_total)} for _ in range(repeat)]
+            started = time.perf_counter()
+            for p in params:
+                conn.execute(text(sql), p).fetchall()
+            results[name] = (time.perf_counter() - started) / repeat * 1000
+    return results
+
+
+def query_plans(engine):
+    plans = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql),
+                                {'user_id': 1, 'since': datetime.now(), 'presentation_id': 1}).fetchall()
+            plans[name] = '; '.join(row[-1] for row in rows)
+    return plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--slides', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        db.metadata.create_all(engine)
+        drop_indexes(engine)
+
+        started = time.perf_counter()
+        presentation_total = seed(engine, args.slides)
+        print(f"Seeded {presentation_total} presentations / {args.slides} slides "
+              f"for {USERS} users in {time.perf_counter() - started:.1f}s")
+
+        before_plans = query_plans(engine)
+        before = time_queries(engine, presentation_total, args.repeat)
+
+        started = time.perf_counter()
+        run_migrations(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        print(f"Migrations applied in {time.perf_counter() - started:.2f}s\n")
+
+        after_plans = query_plans(engine)
+        after = time_queries(engine, presentation_total, args.repeat)
+
+        print(f"{'query':<46} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for name in QUERIES:
+            print(f"{name:<46} {before[name]:>10.3f} {after[name]:>10.3f} {before[name] / after[name]:>7.1f}x")
+
+        print("\nQuery plans")
+        for name in QUERIES:
+            print(f"  {name}\n    before: {before_plans[name]}\n    after:  {after_plans[name]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""Stand-in for Ollama's /api/generate, /api/tags and /api/pull with tunable
+latency, token rate and failure rates, for load tests without a GPU.
+
+    python benchmarks/fake_ollama.py [--port 11435] [--latency 0.5] [--token-rate 40]
+        [--parallel 4] [--error-rate 0.0] [--malformed-rate 0.0]
+
+Point the app at it with OLLAMA_HOST=http://127.0.0.1:11435.
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+LAYOUTS = ['titleOnly', 'titleAndBullets', 'imageAndParagraph', 'twoColumn', 'quote', 'timeline',
+           'imageWithFeatures', 'numberedFeatures', 'benefitsGrid', 'iconGrid', 'sideBySideComparison',
+           'conclusion']
+
+# Content that passes process_content_for_layout for every layout the app knows
+LAYOUT_CONTENT = {
+    'titleOnly': {'title': 'Building Better Systems', 'subtitle': 'What we learned and where we go next'},
+    'titleAndBullets': {'title': 'Key Points', 'bullets': [
+        'Throughput doubled after the pipeline rewrite', 'Latency is now dominated by generation',
+        'Caching removed most repeated work', 'Next quarter focuses on reliability']},
+    'imageAndParagraph': {'title': 'How It Works', 'imageDescription': 'A diagram of the request pipeline',
+                          'paragraph': 'Requests are parsed, enriched with context and sent to the model.'},
+    'twoColumn': {'title': 'Before and After', 'column1Title': 'Before', 'column1Content': 'Manual steps everywhere.',
+                  'column2Title': 'After', 'column2Content': 'One automated flow.'},
+    'quote': {'quote': 'Measure first, then optimise.', 'author': 'Engineering handbook'},
+    'timeline': {'title': 'Milestones', 'events': [
+        {'year': '2021', 'title': 'Prototype', 'description': 'First working version'},
+        {'year': '2023', 'title': 'Launch', 'description': 'Rolled out to every team'},
+        {'year': '2025', 'title': 'Scale', 'description': 'Serving the whole company'}]},
+    'imageWithFeatures': {'title': 'Features', 'imageDescription': 'Product screenshot', 'features': [
+        {'title': f'Feature {i}', 'description': f'What feature {i} does'} for i in range(1, 5)]},
+    'numberedFeatures': {'title': 'Four Steps', 'imageDescription': 'Process illustration', 'features': [
+        {'number': str(i), 'title': f'Step {i}', 'description': f'Details of step {i}'} for i in range(1, 5)]},
+    'benefitsGrid': {'title': 'Benefits', 'imageDescription': 'Happy users', 'benefits': [
+        {'title': f'Benefit {i}', 'description': f'Why benefit {i} matters'} for i in range(1, 5)]},
+    'iconGrid': {'title': 'Areas', 'categories': [
+        {'name': f'Area {i}', 'description': f'Scope of area {i}'} for i in range(1, 9)]},
+    'sideBySideComparison': {'title': 'Options', 'leftTitle': 'Build', 'rightTitle': 'Buy',
+                             'leftPoints': ['Full control', 'Longer lead time', 'Team upkeep'],
+                             'rightPoints': ['Fast start', 'Licence cost', 'Vendor roadmap']},
+    'conclusion': {'title': 'Takeaways', 'summary': 'Small, measured changes added up to a faster system.',
+                   'nextSteps': ['Share the results', 'Plan the next round', 'Keep measuring']},
+}
+
+SLIDE_COUNT = re.compile(r'exactly (\d+) slides')
+LAYOUT_NAME = re.compile(r'\b(' + '|'.join(LAYOUTS) + r')\b')
+
+
+@dataclass
+class FakeConfig:
+    latency: float = 0.5          # seconds before the first token
+    jitter: float = 0.1           # +/- fraction applied to latency
+    token_rate: float = 40.0      # tokens per second after the first; 0 sends everything at once
+    parallel: int = 4             # requests served at once, like OLLAMA_NUM_PARALLEL
+    error_rate: float = 0.0       # fraction of generate calls answered with HTTP 500
+    malformed_rate: float = 0.0   # fraction of answers whose JSON is cut short
+    models: tuple = ('llama3.1:8b',)
+    seed: int = None
+
+
+def outline_response(prompt):
+    match = SLIDE_COUNT.search(prompt)
+    count = int(match.group(1)) if match else 5
+    slides = []
+    for number in range(1, count + 1):
+        layout = 'titleOnly' if number == 1 else 'conclusion' if number == count else LAYOUTS[1 + number % 10]
+        slides.append({
+            'slide_number': number,
+            'layout': layout,
+            'title': f'Slide {number}',
+            'purpose': 'Move the story forward',
+            'key_points': ['First point', 'Second point'],
+            'context': 'Builds on the previous slide',
+            'transitions': {'from_previous': None if number == 1 else 'Continues',
+                            'to_next': None if number == count else 'Leads on'}
+        })
+    return {
+        'presentation_meta': {'title': 'Load Test Deck', 'objective': 'Exercise the pipeline',
+                              'target_audience': 'Engineers', 'key_message': 'It scales'},
+        'slide_structure': slides
+    }
+
+
+def slide_response(prompt):
+    # Slide prompts either show the exact JSON shape or name the layout
+    marker = prompt.find('Return ONLY this JSON')
+    if marker != -1:
+        start = prompt.find('{', marker)
+        try:
+            example, _ = json.JSONDecoder().raw_decode(prompt[start:])
+            if isinstance(example, dict):
+                return example
+        except ValueError:
+            pass
+    match = LAYOUT_NAME.search(prompt)
+    return LAYOUT_CONTENT[match.group(1) if match else 'titleAndBullets']
+
+
+def response_text(prompt):
+    data = outline_response(prompt) if '"slide_structure"' in prompt else slide_response(prompt)
+    return json.dumps(data)
+
+
+def split_tokens(text):
+    # Roughly one token per word piece, as far as pacing is concerned
+    return re.findall(r'\S+\s*|\s+', text)
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    # Keep-alive like the real server, so the app's connection pool is exercised
+    protocol_version = 'HTTP/1.1'
+    config = FakeConfig()
+    slots = None
+    rng = random.Random()
+    rng_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def chance(self, rate):
+        with self.rng_lock:
+            return self.rng.random() < rate
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_stream(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def send_line(self, data):
+        line = (json.dumps(data) + '\n').encode('utf-8')
+        self.wfile.write(f'{len(line):x}\r\n'.encode('ascii') + line + b'\r\n')
+        self.wfile.flush()
+
+    def end_stream(self):
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/api/tags':
+            self.send_json(200, {'models': [{'name': name, 'model': name, 'size': 4_900_000_000}
+                                            for name in self.config.models]})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        path = self.path.rstrip('/')
+        if path == '/api/generate':
+            self.generate(self.read_json())
+        elif path == '/api/pull':
+            self.pull(self.read_json())
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def pull(self, request):
+        if not request.get('stream', True):
+            self.send_json(200, {'status': 'success'})
+            return
+        total = 4_900_000_000
+        self.start_stream()
+        lines = [{'status': 'pulling manifest'}]
+        lines += [{'status': 'pulling model', 'total': total, 'completed': total * step // 5} for step in range(1, 6)]
+        lines += [{'status': 'verifying sha256 digest'}, {'status': 'success'}]
+        for line in lines:
+            self.send_line(line)
+            time.sleep(0.05)
+        self.end_stream()
+
+    def generate(self, request):
+        received = time.perf_counter()
+        config = self.config
+        with self.slots:
+            # Time spent waiting for a slot is reported the way Ollama does, inside load_duration
+            loaded = time.perf_counter()
+            if self.chance(config.error_rate):
+                self.send_json(500, {'error': 'simulated failure'})
+                return
+
+            prompt = request.get('prompt', '')
+            text = response_text(prompt)
+            if self.chance(config.malformed_rate):
+                text = text[:len(text) // 2]
+            tokens = split_tokens(text)
+
+            with self.rng_lock:
+                first_token = config.latency * (1 + self.rng.uniform(-config.jitter, config.jitter))
+            time.sleep(max(0.0, first_token))
+            evaluating = time.perf_counter()
+            per_token = 1 / config.token_rate if config.token_rate > 0 else 0
+
+            if request.get('stream'):
+                self.start_stream()
+                for token in tokens:
+                    self.send_line({'model': request.get('model'), 'response': token, 'done': False})
+                    if per_token:
+                        time.sleep(per_token)
+            elif per_token:
+                time.sleep(per_token * len(tokens))
+
+            finished = time.perf_counter()
+            final = {
+                'model': request.get('model'),
+                'done': True,
+                'total_duration': int((finished - received) * 1e9),
+                'load_duration': int((loaded - received) * 1e9),
+                'prompt_eval_count': len(split_tokens(prompt)),
+                'prompt_eval_duration': int((evaluating - loaded) * 1e9),
+                'eval_count': len(tokens),
+                'eval_duration': max(1, int((finished - evaluating) * 1e9))
+            }
+            if request.get('stream'):
+                final['response'] = ''
+                self.send_line(final)
+                self.end_stream()
+            else:
+                final['response'] = text
+                self.send_json(200, final)
+
+
+def make_server(host='127.0.0.1', port=11435, config=None):
+    """Build a threaded fake Ollama server; call serve_forever() on it"""
+    config = config or FakeConfig()
+    handler = type('ConfiguredFakeOllamaHandler', (FakeOllamaHandler,), {
+        'config': config,
+        'slots': threading.BoundedSemaphore(max(1, config.parallel)),
+        'rng': random.Random(config.seed),
+        'rng_lock': threading.Lock()
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def add_arguments(parser):
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds to first token')
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--token-rate', type=float, default=40.0, help='tokens/sec, 0 for instant')
+    parser.add_argument('--parallel', type=int, default=4, help='concurrent generations')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def config_from_args(args):
+    return FakeConfig(latency=args.latency, jitter=args.jitter, token_rate=args.token_rate,
+                      parallel=args.parallel, error_rate=args.error_rate,
+                      malformed_rate=args.malformed_rate, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, config_from_args(args))
+    print(f"Fake Ollama listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
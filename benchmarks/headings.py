@@ -0,0 +1,80 @@
+"""Time heading detection and slide splitting on generated multi-megabyte text.
+
+    python benchmarks/headings.py [--mb 4] [--repeat 5]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import textwrap
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_extraction_utils import detect_headings, detect_headings_and_structure_enhanced
+
+WORDS = ('market growth revenue customer platform strategy design model data analysis team '
+         'product launch quarter review risk budget plan system process result').split()
+
+
+def generate_document(target_bytes, seed=42):
+    """Sections with assorted heading styles, wrapped and unwrapped paragraphs"""
+    rng = random.Random(seed)
+    styles = [
+        lambda title, n: f"# {title}",
+        lambda title, n: f"{n}. {title}",
+        lambda title, n: title.upper(),
+        lambda title, n: f"{title}:",
+        lambda title, n: title,
+    ]
+    parts = []
+    size = 0
+    section = 0
+    while size < target_bytes:
+        section += 1
+        title = ' '.join(rng.choice(WORDS).title() for _ in range(rng.randint(2, 5)))
+        block = [rng.choice(styles)(title, section), '']
+        for _ in range(rng.randint(2, 6)):
+            paragraph = ' '.join(
+                ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + '.'
+                for _ in range(rng.randint(3, 8))
+            )
+            block.extend(textwrap.wrap(paragraph, 90) if section % 2 else [paragraph])
+            block.append('')
+        parts.extend(block)
+        size += sum(len(line) + 1 for line in block)
+    return '\n'.join(parts)
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mb', type=float, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    text = generate_document(int(args.mb * 1024 * 1024))
+    lines = text.split('\n')
+    print(f"Document: {len(text) / 1024 / 1024:.1f} MB, {len(lines)} lines\n")
+
+    cases = {
+        'detect_headings (list of lines)': lambda: detect_headings(lines),
+        'detect_headings (lazy line iterator)': lambda: detect_headings(iter(text.splitlines())),
+        'detect_headings_and_structure_enhanced': lambda: detect_headings_and_structure_enhanced(text),
+    }
+    for name, func in cases.items():
+        seconds, result = best_of(args.repeat, func)
+        print(f"{name:<42} {seconds * 1000:>9.1f} ms  {len(text) / 1024 / 1024 / seconds:>7.1f} MB/s  "
+              f"{len(result)} results")
+
+
+if __name__ == '__main__':
+    main()
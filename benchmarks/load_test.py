@@ -0,0 +1,231 @@
+"""Drive whole user flows through the app against a fake Ollama and report
+throughput and latency percentiles per endpoint.
+
+    python benchmarks/load_test.py [--users 4] [--flows 3] [--slides 5] [--doc-kb 20]
+        [--latency 0.5] [--token-rate 40] [--error-rate 0.0] [--malformed-rate 0.0] [--export]
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 ...
+
+Without --url the app and a fake Ollama are started in this process on a
+scratch database. With --url the target must already point at an Ollama
+(real or benchmarks/fake_ollama.py).
+
+Each flow: login, process-document, generate-outline, generate-from-outline,
+save and, with --export, export.
+"""
+import os
+import sys
+import math
+import time
+import uuid
+import socket
+import logging
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_ollama
+from headings import generate_document
+
+EXPORT_PATH = '/api/export'
+TEMPLATE_ID = 'corporate'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve_in_thread(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_local_stack(args, workdir):
+    """Start a fake Ollama and the app on free ports; returns the app's base URL"""
+    ollama_port = free_port()
+    serve_in_thread(fake_ollama.make_server('127.0.0.1', ollama_port, fake_ollama.config_from_args(args)))
+
+    # The app reads these at import time
+    os.environ['OLLAMA_HOST'] = f'http://127.0.0.1:{ollama_port}'
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    os.environ['PPT_CACHE_DIR'] = os.path.join(workdir, 'cache')
+    os.environ.setdefault('TRACE_FILE', '')
+    os.chdir(workdir)  # generation.log and friends land in the scratch directory
+
+    from werkzeug.serving import make_server
+    from app import app, startup
+    startup()
+    if not args.verbose:
+        # The app logs every slide at DEBUG; keep the report readable
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    app_port = free_port()
+    serve_in_thread(make_server('127.0.0.1', app_port, app, threaded=True))
+    return f'http://127.0.0.1:{app_port}'
+
+
+class FlowFailed(Exception):
+    """A step answered with an error status; the rest of the flow is skipped"""
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, ok):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+
+class VirtualUser:
+    def __init__(self, base_url, recorder, args, number):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.args = args
+        self.session = requests.Session()
+        self.username = f'load-{number}-{uuid.uuid4().hex[:8]}'
+        self.password = 'load-test-password'
+        self.document = generate_document(args.doc_kb * 1024, seed=number).encode('utf-8')
+
+    def call(self, name, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.args.timeout, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.recorder.record(name, time.perf_counter() - started, ok)
+        if not ok:
+            raise FlowFailed(name)
+        return response
+
+    def register(self):
+        self.call('register', 'POST', '/auth/register', json={'username': self.username, 'password': self.password})
+
+    def flow(self):
+        credentials = {'username': self.username, 'password': self.password}
+        self.call('login', 'POST', '/auth/login', json=credentials)
+
+        upload = self.call('process-document', 'POST', '/api/process-document',
+                           files={'file': ('report.txt', self.document, 'text/plain')}).json()
+        document_id = upload['document']['id']
+
+        outline = self.call('generate-outline', 'POST', '/api/generate-outline', json={
+            'topic': 'Quarterly report', 'slideCount': self.args.slides, 'inputMethod': 'upload',
+            'documentId': document_id, 'bypassCache': True
+        }).json()['outline']
+
+        slides = self.call('generate-from-outline', 'POST', '/api/generate-from-outline', json={
+            'outline': outline, 'template': TEMPLATE_ID, 'contentData': {'document_id': document_id},
+            'bypassCache': True
+        }).json()['slides']
+
+        self.call('save', 'POST', '/api/save', json={
+            'topic': 'Quarterly report', 'template': TEMPLATE_ID, 'slides': slides
+        })
+
+        if self.args.export:
+            self.call('export', 'POST', EXPORT_PATH, json={
+                'topic': 'Quarterly report', 'template': TEMPLATE_ID, 'slides': slides
+            })
+
+    def run(self):
+        try:
+            self.register()
+        except FlowFailed:
+            return
+        for _ in range(self.args.flows):
+            started = time.perf_counter()
+            try:
+                self.flow()
+                ok = True
+            except FlowFailed:
+                ok = False
+            except (KeyError, ValueError):
+                # A 2xx body without the expected fields
+                ok = False
+            self.recorder.record('flow', time.perf_counter() - started, ok)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    # Nearest rank
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def report(recorder, elapsed):
+    names = [name for name in recorder.latencies if name != 'flow'] + ['flow']
+    requests_made = sum(len(v) for name, v in recorder.latencies.items() if name != 'flow')
+    flows = len(recorder.latencies.get('flow', []))
+    print(f"\n{flows} flows, {requests_made} requests in {elapsed:.1f}s: "
+          f"{flows / elapsed:.2f} flows/s, {requests_made / elapsed:.2f} req/s\n")
+    print(f"{'endpoint':<24} {'count':>6} {'errors':>6} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'max s':>8}")
+    for name in names:
+        samples = sorted(recorder.latencies.get(name, []))
+        if not samples:
+            continue
+        print(f"{name:<24} {len(samples):>6} {recorder.errors.get(name, 0):>6} "
+              f"{percentile(samples, 0.50):>8.3f} {percentile(samples, 0.95):>8.3f} "
+              f"{percentile(samples, 0.99):>8.3f} {samples[-1]:>8.3f}")
+
+
+def report_fallbacks(base_url):
+    """Fallbacks hide model failures behind 200s; /metrics counts them"""
+    try:
+        text = requests.get(base_url + '/metrics', timeout=10).text
+    except requests.RequestException:
+        return
+    totals = defaultdict(float)
+    for line in text.splitlines():
+        for name in ('outline_fallbacks_total', 'slide_fallbacks_total', 'slide_retries_total'):
+            if line.startswith(name):
+                totals[name] += float(line.rsplit(' ', 1)[1])
+    if totals:
+        print('\n' + ', '.join(f"{name}={value:.0f}" for name, value in sorted(totals.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='base URL of a running app; default starts one in-process')
+    parser.add_argument('--users', type=int, default=4, help='concurrent virtual users')
+    parser.add_argument('--flows', type=int, default=3, help='flows per user')
+    parser.add_argument('--slides', type=int, default=5)
+    parser.add_argument('--doc-kb', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--export', action='store_true', help=f'include {EXPORT_PATH} in each flow')
+    parser.add_argument('--verbose', action='store_true', help="keep the in-process app's log output")
+    fake_ollama.add_arguments(parser)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        base_url = args.url.rstrip('/') if args.url else start_local_stack(args, workdir)
+        print(f"Target {base_url}: {args.users} users x {args.flows} flows, {args.slides} slides, "
+              f"{args.doc_kb}KB documents")
+
+        recorder = Recorder()
+        users = [VirtualUser(base_url, recorder, args, number) for number in range(args.users)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            list(pool.map(VirtualUser.run, users))
+        elapsed = time.perf_counter() - started
+
+        report(recorder, elapsed)
+        report_fallbacks(base_url)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Micro-benchmarks for the CPU-bound helpers, compared against a stored baseline.
+
+    python benchmarks/micro.py --save-baseline     # record this machine's numbers
+    python benchmarks/micro.py [--threshold 0.2]   # exit 1 if any case is >20% slower
+    python benchmarks/micro.py --filter chunk_text --max-mb 1
+
+Text helpers run on generated corpora from 1KB to 10MB, slide helpers on
+decks of 1 to 200 slides. Each case reports the best of --repeat runs, so
+baselines are only comparable on the same machine.
+"""
+import os
+import sys
+import json
+import time
+import timeit
+import logging
+import platform
+import argparse
+import tempfile
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from text_extraction_utils import chunk_text, analyze_text_content, detect_headings_and_structure_enhanced
+from ollama_client import extract_clean_json, validate_character_limits
+from content_utils import process_content_for_layout
+from pptx_export import create_presentation
+from models import db, User, Presentation, Slide
+from disk_cache import DiskLRUCache
+from fake_ollama import LAYOUT_CONTENT
+from headings import generate_document
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+CORPUS_SIZES = (('1KB', 1 << 10), ('100KB', 100 << 10), ('1MB', 1 << 20), ('10MB', 10 << 20))
+DECK_SIZES = (1, 20, 200)
+TEMPLATE_ID = 'corporate'
+
+
+def make_deck(slide_count):
+    layouts = list(LAYOUT_CONTENT)
+    return [
+        {'layout': layouts[i % len(layouts)], 'content': dict(LAYOUT_CONTENT[layouts[i % len(layouts)]])}
+        for i in range(slide_count)
+    ]
+
+
+def model_response(deck):
+    # What a chatty model sends back: prose around a fenced JSON object
+    return 'Here is the content you asked for:\n```json\n' + json.dumps({'slides': deck}) + '\n```\nLet me know!'
+
+
+def process_deck(deck):
+    for slide in deck:
+        process_content_for_layout(slide['content'], slide['layout'])
+
+
+def validate_deck(deck):
+    for slide in deck:
+        validate_character_limits(slide['content'], slide['layout'])
+
+
+def export_deck(deck, directory, slide_cache=None):
+    create_presentation(os.path.join(directory, 'bench.pptx'), deck, TEMPLATE_ID, slide_cache=slide_cache)
+
+
+def edited_export(deck, directory, slide_cache):
+    # One slide changes between exports, as when a user tweaks a title and exports again
+    deck[0]['content']['title'] = f"Edit {time.perf_counter_ns()}"
+    export_deck(deck, directory, slide_cache)
+
+
+def load_presentation(presentation_id):
+    # Start from an empty identity map so slides are loaded and parsed each time
+    db.session.expunge_all()
+    return db.session.get(Presentation, presentation_id).to_dict()
+
+
+def database_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.app_context().push()
+    db.create_all()
+    db.session.add(User(id=1, username='bench', password_hash='x'))
+    db.session.commit()
+    return app
+
+
+def seed_presentation(deck):
+    presentation = Presentation(user_id=1, topic='Benchmark', template_id=TEMPLATE_ID, slide_count=len(deck))
+    db.session.add(presentation)
+    db.session.flush()
+    for order, slide in enumerate(deck):
+        db.session.add(Slide(presentation_id=presentation.id, slide_order=order,
+                             layout=slide['layout'], content=slide['content']))
+    db.session.commit()
+    return presentation.id
+
+
+def build_cases(max_bytes, workdir):
+    """(name, callable) for every case, text helpers first"""
+    cases = []
+    for label, size in CORPUS_SIZES:
+        if size > max_bytes:
+            continue
+        text = generate_document(size, seed=size)
+        cases += [
+            (f'chunk_text[{label}]', partial(chunk_text, text)),
+            (f'analyze_text_content[{label}]', partial(analyze_text_content, text)),
+            (f'detect_headings_and_structure_enhanced[{label}]', partial(detect_headings_and_structure_enhanced, text)),
+        ]
+
+    database_app()
+    slide_cache = DiskLRUCache(os.path.join(workdir, 'slides'), 256 << 20)
+    for slide_count in DECK_SIZES:
+        deck = make_deck(slide_count)
+        label = f"{slide_count} slide{'s' if slide_count != 1 else ''}"
+        cases += [
+            (f'extract_clean_json[{label}]', partial(extract_clean_json, model_response(deck))),
+            (f'validate_character_limits[{label}]', partial(validate_deck, deck)),
+            (f'process_content_for_layout[{label}]', partial(process_deck, deck)),
+            (f'create_presentation[{label}]', partial(export_deck, deck, workdir)),
+            (f'create_presentation[{label}, 1 edited]', partial(edited_export, make_deck(slide_count), workdir, slide_cache)),
+            (f'Presentation.to_dict[{label}]', partial(load_presentation, seed_presentation(deck))),
+        ]
+    return cases
+
+
+def measure(fn, repeat):
+    """Best time per call in seconds; loops are sized so each run takes ~0.2s"""
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=loops)) / loops
+
+
+def format_seconds(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.3g}{unit}'
+    return f'{seconds / 1e-9:.3g}ns'
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(path, results):
+    # Merge so a filtered run only replaces the cases it measured
+    merged = dict(load_baseline(path), **results)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'results': dict(sorted(merged.items()))
+        }, f, indent=2)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='write these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown before failing (0.2 = 20%%)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-mb', type=float, default=10, help='skip corpora larger than this')
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this')
+    args = parser.parse_args()
+
+    # Helpers log per call; keep that out of both the timings and the report
+    logging.disable(logging.WARNING)
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = [(name, fn) for name, fn in build_cases(args.max_mb * (1 << 20), workdir) if args.filter in name]
+        print(f"{'case':<52} {'time':>9} {'baseline':>9} {'change':>8}")
+        for name, fn in cases:
+            seconds = measure(fn, args.repeat)
+            results[name] = seconds
+            line = f"{name:<52} {format_seconds(seconds):>9}"
+            if name in baseline:
+                change = seconds / baseline[name] - 1
+                line += f" {format_seconds(baseline[name]):>9} {change:>+7.1%}"
+                if change > args.threshold:
+                    regressions.append(name)
+                    line += '  REGRESSION'
+            print(line, flush=True)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\nBaseline written to {args.baseline}")
+    elif not baseline:
+        print(f"\nNo baseline at {args.baseline}; record one with --save-baseline")
+
+    if regressions and not args.save_baseline:
+        print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}: "
+              + ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
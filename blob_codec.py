@@ -0,0 +1,51 @@
+import os
+import json
+import zlib
+import logging
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Codec for stored document text and chunks; zstd when installed, zlib otherwise
+DOCUMENT_COMPRESSION = os.environ.get('DOCUMENT_COMPRESSION', 'zstd' if ZSTD_AVAILABLE else 'zlib')
+ZSTD_LEVEL = int(os.environ.get('DOCUMENT_ZSTD_LEVEL', 3))
+ZLIB_LEVEL = int(os.environ.get('DOCUMENT_ZLIB_LEVEL', 6))
+
+if DOCUMENT_COMPRESSION == 'zstd' and not ZSTD_AVAILABLE:
+    logger.warning("zstandard not installed, storing documents with zlib. Install with: pip install zstandard")
+    DOCUMENT_COMPRESSION = 'zlib'
+
+
+def compressobj(codec=DOCUMENT_COMPRESSION):
+    """Streaming compressor with compress(bytes) and flush() for the given codec"""
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return zlib.compressobj(ZLIB_LEVEL)
+
+
+def compress(data, codec=DOCUMENT_COMPRESSION):
+    compressor = compressobj(codec)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(blob, codec):
+    if codec == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise ValueError("Document was stored with zstd but zstandard is not installed")
+        # Streamed frames carry no content size, so use a decompressobj
+        return zstandard.ZstdDecompressor().decompressobj().decompress(blob)
+    return zlib.decompress(blob)
+
+
+def encode_lines(items):
+    """Serialise one JSON value per line, the stored format for document chunks"""
+    return ''.join(json.dumps(item) + '\n' for item in items).encode('utf-8')
+
+
+def decode_lines(data):
+    return [json.loads(line) for line in data.decode('utf-8').split('\n') if line]
@@ -0,0 +1,139 @@
+import os
+import time
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE_URL = 'sqlite:///pptgenerator.db'
+
+# Sized for threaded Flask/waitress plus the job workers; each request thread
+# holds at most one connection for the length of its session
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+
+SQLITE_PRAGMAS = (
+    # Readers no longer block the writer and vice versa
+    ('journal_mode', 'WAL'),
+    # Safe with WAL: a crash can lose the last commits but never corrupts
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', SQLITE_BUSY_TIMEOUT_MS),
+    ('mmap_size', SQLITE_MMAP_SIZE),
+    # Negative means KiB rather than pages
+    ('cache_size', -SQLITE_CACHE_SIZE_KB),
+    ('temp_store', 'MEMORY'),
+)
+
+
+def get_database_url():
+    """DATABASE_URL from the environment, with postgres:// spelled the way SQLAlchemy expects"""
+    url = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def is_sqlite_memory(url):
+    return make_url(url).database in (None, '', ':memory:')
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS for the given database URL"""
+    backend = make_url(url).get_backend_name()
+
+    if backend == 'sqlite':
+        if is_sqlite_memory(url):
+            # In-memory databases live in one connection; keep SQLAlchemy's default pool
+            return {'connect_args': {'check_same_thread': False}}
+        return {
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            'connect_args': {
+                'check_same_thread': False,
+                'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000
+            }
+        }
+
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        # Drop connections the server or a proxy may have closed while idle
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def register_sqlite_pragmas(engine):
+    """Run SQLITE_PRAGMAS on every new connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+    event.listen(engine, 'connect', apply_sqlite_pragmas)
+    if not is_sqlite_memory(str(engine.url)):
+        with engine.connect() as connection:
+            mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+        logger.info(f"🗄️ SQLite {engine.url.database} journal_mode={mode}")
+
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _observe_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else 'other'
+    if operation not in ('select', 'insert', 'update', 'delete'):
+        operation = 'other'
+    metrics.DB_QUERY_LATENCY.observe(time.perf_counter() - started, operation=operation)
+
+
+def _discard_query_timer(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is None:
+        return
+    started = context.connection.info.get('query_started')
+    if started:
+        started.pop()
+
+
+def register_query_metrics(engine):
+    """Time every statement into the db_query_duration_seconds histogram"""
+    event.listen(engine, 'before_cursor_execute', _start_query_timer)
+    event.listen(engine, 'after_cursor_execute', _observe_query)
+    event.listen(engine, 'handle_error', _discard_query_timer)
+
+
+def configure_database(app, db):
+    """Point Flask-SQLAlchemy at DATABASE_URL with a pool policy for threaded serving"""
+    url = get_database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    db.init_app(app)
+
+    with app.app_context():
+        register_sqlite_pragmas(db.engine)
+        register_query_metrics(db.engine)
+        logger.info(
+            f"🗄️ Database {db.engine.dialect.name}: pool_size={DB_POOL_SIZE}, "
+            f"max_overflow={DB_MAX_OVERFLOW}, timeout={DB_POOL_TIMEOUT}s"
+        )
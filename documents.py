@@ -0,0 +1,142 @@
+import os
+import uuid
+import json
+import hashlib
+import logging
+from datetime import datetime, timedelta
+
+import blob_codec
+import tracing
+from models import db, Document
+from text_extraction_utils import analyze_text_content, chunk_text
+from retrieval import get_document_index, has_document_index
+
+logger = logging.getLogger(__name__)
+
+# Stored documents unused for this long are removed at startup
+DOCUMENT_RETENTION_DAYS = int(os.environ.get('DOCUMENT_RETENTION_DAYS', 30))
+# last_used_at only feeds retention, so reads refresh it at most this often
+DOCUMENT_TOUCH_INTERVAL = timedelta(seconds=int(os.environ.get('DOCUMENT_TOUCH_INTERVAL_SECONDS', 24 * 3600)))
+
+
+class DocumentNotFound(ValueError):
+    """Raised when a document handle is unknown, expired or owned by someone else"""
+
+
+def find_document(user_id, content_hash):
+    return Document.query.filter_by(user_id=user_id, content_hash=content_hash).first()
+
+
+def touch_document(document):
+    now = datetime.now()
+    if document.last_used_at is None or now - document.last_used_at >= DOCUMENT_TOUCH_INTERVAL:
+        document.last_used_at = now
+        db.session.commit()
+    return document
+
+
+def index_document(document, chunks=None):
+    """Build the document's retrieval index now, so slide generation never has to"""
+    if has_document_index(document.id):
+        return document
+    if chunks is None:
+        chunks = blob_codec.decode_lines(blob_codec.decompress(document.chunks_blob, document.codec))
+    with tracing.span('document.index', chunks=len(chunks)):
+        get_document_index(document.id, chunks=chunks)
+    return document
+
+
+def store_document(user_id, content_hash, source, text_blob, chunks_blob, codec, analysis, chunk_count,
+                   filename=None, file_type=None):
+    """Insert a compressed document, reusing the user's existing copy of the same content"""
+    existing = find_document(user_id, content_hash)
+    if existing:
+        return touch_document(existing)
+
+    document = Document(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        content_hash=content_hash,
+        source=source,
+        filename=filename,
+        file_type=file_type,
+        codec=codec,
+        text_blob=text_blob,
+        chunks_blob=chunks_blob,
+        analysis_json=json.dumps(analysis),
+        chunk_count=chunk_count
+    )
+    db.session.add(document)
+    db.session.commit()
+    logger.info(f"📄 Stored {source} document {document.id}: {len(text_blob) + len(chunks_blob)} bytes ({codec})")
+    return document
+
+
+def store_uploaded_document(user_id, upload):
+    """Persist a processed upload (from process_uploaded_file) and return its Document"""
+    existing = find_document(user_id, upload['document_id'])
+    if existing:
+        return index_document(touch_document(existing))
+
+    document = store_document(
+        user_id, upload['document_id'], 'upload', upload['text_blob'], upload['chunks_blob'], upload['codec'],
+        upload['analysis'], upload['chunk_count'],
+        filename=upload['original_filename'], file_type=upload['file_type']
+    )
+    return index_document(document)
+
+
+def store_text_document(user_id, text):
+    """Analyze, chunk and persist pasted text, returning (Document, analysis)"""
+    content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    with tracing.span('document.analyze', chars=len(text)):
+        analysis = analyze_text_content(text)
+
+    existing = find_document(user_id, content_hash)
+    if existing:
+        return index_document(touch_document(existing)), analysis
+
+    with tracing.span('document.chunk') as span:
+        chunks = chunk_text(text)
+        span.set(chunks=len(chunks))
+    codec = blob_codec.DOCUMENT_COMPRESSION
+    document = store_document(
+        user_id, content_hash, 'text',
+        blob_codec.compress(text.encode('utf-8'), codec),
+        blob_codec.compress(blob_codec.encode_lines(chunks), codec),
+        codec, analysis, len(chunks)
+    )
+    return index_document(document, chunks), analysis
+
+
+def load_document(document_id, user_id):
+    """Return {id, text, chunks, analysis, ...} for a handle owned by user_id.
+
+    Documents belonging to anyone else, or to no one, are treated as missing.
+    """
+    document = db.session.get(Document, document_id) if isinstance(document_id, str) else None
+    if document is None or user_id is None or document.user_id != user_id:
+        raise DocumentNotFound('Document not found or expired, please add your content again')
+
+    text = blob_codec.decompress(document.text_blob, document.codec).decode('utf-8')
+    chunks = blob_codec.decode_lines(blob_codec.decompress(document.chunks_blob, document.codec))
+    touch_document(document)
+
+    return {
+        'id': document.id,
+        'source': document.source,
+        'filename': document.filename,
+        'file_type': document.file_type,
+        'analysis': document.analysis,
+        'text': text,
+        'chunks': chunks
+    }
+
+
+def purge_expired_documents(retention_days=DOCUMENT_RETENTION_DAYS):
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    removed = Document.query.filter(Document.last_used_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    if removed:
+        logger.info(f"🧹 Removed {removed} documents unused for {retention_days} days")
+    return removed
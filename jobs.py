@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import uuid
+import queue
+import socket
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import tracing
+from flask import g
+from sqlalchemy import func, insert, literal, or_, select
+
+from models import db, GenerationJob, User
+
+logger = logging.getLogger(__name__)
+
+# Worker pool and admission limits
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_MAX_ACTIVE = int(os.environ.get('JOB_MAX_ACTIVE', 50))
+JOB_MAX_ACTIVE_PER_USER = int(os.environ.get('JOB_MAX_ACTIVE_PER_USER', 2))
+# Active jobs are leased to one process, which renews the lease every third of
+# this; another process only requeues a job once its lease has run out
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 60))
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINAL_EVENTS = ('completed', 'failed')
+
+# Progress events kept per job for subscribers that connect late
+EVENT_HISTORY_JOBS = 200
+EVENT_HISTORY_PER_JOB = 100
+
+
+class JobQueueFull(Exception):
+    """Raised when the server-wide queue is at capacity"""
+
+
+class JobLimitExceeded(Exception):
+    """Raised when a user already has the maximum number of active jobs"""
+
+
+class JobManager:
+    """Runs generation jobs on a local worker pool with state kept in the database"""
+
+    def __init__(self):
+        self.app = None
+        self.executor = None
+        self.owner_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._listeners = defaultdict(list)
+        self._history = OrderedDict()
+
+    def init_app(self, app, workers=JOB_WORKERS):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='generation-job')
+        self.resume_pending()
+        threading.Thread(target=self._heartbeat, name='generation-job-lease', daemon=True).start()
+
+    def register(self, kind, handler, validate=None):
+        """Register handler(payload, emit) -> result dict for a job kind.
+
+        validate(payload) runs at submit time and raises ValueError on bad input,
+        so callers get a 400 instead of a job that fails later.
+        """
+        self._handlers[kind] = (handler, validate)
+
+    def submit(self, user_id, kind, payload):
+        if kind not in self._handlers:
+            raise ValueError(f'Unknown job type: {kind}')
+
+        _, validate = self._handlers[kind]
+        if validate:
+            validate(payload)
+
+        # The limits are checked by the INSERT itself, so concurrent submits cannot
+        # both slip under them; the user row lock serializes a user's submits where
+        # the database supports it
+        db.session.query(User.id).filter_by(id=user_id).with_for_update().first()
+        now = datetime.now()
+        job_id = uuid.uuid4().hex
+        active = GenerationJob.query.filter(GenerationJob.status.in_(ACTIVE_STATUSES))
+        row = select(
+            literal(job_id), literal(user_id), literal(kind), literal('queued'), literal(json.dumps(payload)),
+            literal(now), literal(self.owner_id), literal(now + timedelta(seconds=JOB_LEASE_SECONDS))
+        ).where(
+            _count(active) < JOB_MAX_ACTIVE,
+            _count(active.filter(GenerationJob.user_id == user_id)) < JOB_MAX_ACTIVE_PER_USER
+        )
+        inserted = db.session.execute(insert(GenerationJob).from_select(
+            ['id', 'user_id', 'kind', 'status', 'payload_json', 'created_at', 'owner', 'lease_expires_at'], row
+        )).rowcount
+        db.session.commit()
+
+        if not inserted:
+            if active.count() >= JOB_MAX_ACTIVE:
+                raise JobQueueFull('Generation queue is full, please try again shortly')
+            raise JobLimitExceeded(f'You already have {JOB_MAX_ACTIVE_PER_USER} generations in progress')
+
+        job = db.session.get(GenerationJob, job_id)
+        self.executor.submit(self._run, job.id)
+        logger.info(f"📥 Queued {kind} job {job.id} for user {user_id}")
+        return job
+
+    def queue_depth(self):
+        """Number of queued and running jobs, from the database"""
+        rows = db.session.query(GenerationJob.status, func.count(GenerationJob.id))\
+            .filter(GenerationJob.status.in_(ACTIVE_STATUSES))\
+            .group_by(GenerationJob.status).all()
+        depth = dict.fromkeys(ACTIVE_STATUSES, 0)
+        depth.update(rows)
+        return depth
+
+    def resume_pending(self):
+        """Take over and requeue active jobs whose owner stopped renewing their lease"""
+        with self.app.app_context():
+            now = datetime.now()
+            expired = GenerationJob.query.filter(
+                GenerationJob.status.in_(ACTIVE_STATUSES),
+                or_(GenerationJob.lease_expires_at.is_(None), GenerationJob.lease_expires_at < now)
+            )
+            candidates = [job_id for job_id, in expired.with_entities(GenerationJob.id)
+                          .order_by(GenerationJob.created_at).all()]
+
+            # Each takeover re-checks the lease, so two processes never adopt the same job
+            job_ids = []
+            for job_id in candidates:
+                adopted = expired.filter(GenerationJob.id == job_id).update({
+                    'status': 'queued',
+                    'started_at': None,
+                    'owner': self.owner_id,
+                    'lease_expires_at': now + timedelta(seconds=JOB_LEASE_SECONDS)
+                }, synchronize_session=False)
+                db.session.commit()
+                if adopted:
+                    job_ids.append(job_id)
+
+        for job_id in job_ids:
+            self.executor.submit(self._run, job_id)
+        if job_ids:
+            logger.info(f"🔄 Resumed {len(job_ids)} unfinished generation jobs")
+        return job_ids
+
+    def renew_leases(self):
+        """Extend the lease on every active job this process owns"""
+        with self.app.app_context():
+            renewed = GenerationJob.query.filter(
+                GenerationJob.owner == self.owner_id,
+                GenerationJob.status.in_(ACTIVE_STATUSES)
+            ).update({'lease_expires_at': datetime.now() + timedelta(seconds=JOB_LEASE_SECONDS)},
+                     synchronize_session=False)
+            db.session.commit()
+        return renewed
+
+    def _heartbeat(self):
+        # Keep our leases alive and pick up jobs from processes that died
+        while True:
+            time.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                self.renew_leases()
+                self.resume_pending()
+            except Exception as e:
+                logger.warning(f"Job lease heartbeat failed: {e}")
+
+    def _claim(self, job_id):
+        # Conditional update so a job is only ever picked up by one worker, and only by its owner
+        claimed = GenerationJob.query.filter_by(id=job_id, status='queued', owner=self.owner_id)\
+            .update({'status': 'running', 'started_at': datetime.now()}, synchronize_session=False)
+        db.session.commit()
+        return claimed == 1
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            if not self._claim(job_id):
+                return
+
+            job = db.session.get(GenerationJob, job_id)
+            kind = job.kind
+            user_id = job.user_id
+            payload = job.payload
+            handler, _ = self._handlers.get(kind, (None, None))
+            db.session.remove()  # don't hold a connection while the LLM works
+            g.job_user_id = user_id  # handlers load the user's documents on this thread
+
+            self.publish(job_id, 'running', {'id': job_id})
+            # Jobs are traced under their own id, so /api/traces/<job id> shows the run
+            try:
+                with tracing.traced(f'job {kind}', request_id=job_id, user_id=user_id):
+                    if handler is None:
+                        raise ValueError(f'No handler registered for job type: {kind}')
+                    result = handler(payload, lambda event, data: self.publish(job_id, event, data))
+                self._finish(job_id, 'completed', result=result)
+            except Exception as e:
+                logger.error(f"❌ Generation job {job_id} failed: {e}")
+                self._finish(job_id, 'failed', error=str(e))
+            finally:
+                db.session.remove()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        # A job whose lease was lost has been requeued elsewhere; leave it to the new owner
+        finished = GenerationJob.query.filter_by(id=job_id, status='running', owner=self.owner_id).update({
+            'status': status,
+            'result_json': json.dumps(result) if result is not None else None,
+            'error': error,
+            'finished_at': datetime.now()
+        }, synchronize_session=False)
+        db.session.commit()
+        if not finished:
+            logger.warning(f"⚠️ Job {job_id} was taken over by another process, dropping this result")
+            return
+        self.publish(job_id, status, db.session.get(GenerationJob, job_id).to_dict())
+
+    def publish(self, job_id, event, data):
+        with self._lock:
+            if event != 'token':
+                history = self._history.setdefault(job_id, [])
+                if len(history) < EVENT_HISTORY_PER_JOB or event in FINAL_EVENTS:
+                    history.append((event, data))
+                self._history.move_to_end(job_id)
+                while len(self._history) > EVENT_HISTORY_JOBS:
+                    self._history.popitem(last=False)
+            listeners = list(self._listeners.get(job_id, []))
+        for listener in listeners:
+            listener.put((event, data))
+
+    def subscribe(self, job, timeout=15):
+        """Yield (event, data) for a job until it finishes; yields None while idle
+
+        Progress events only reach subscribers in the process running the job, so
+        the database is re-checked while idle to catch jobs finished elsewhere.
+        """
+        if job.status not in ACTIVE_STATUSES:
+            yield (job.status, job.to_dict())
+            return
+
+        listener = queue.Queue()
+        with self._lock:
+            backlog = list(self._history.get(job.id, []))
+            self._listeners[job.id].append(listener)
+
+        try:
+            for item in backlog:
+                yield item
+                if item[0] in FINAL_EVENTS:
+                    return
+            while True:
+                try:
+                    item = listener.get(timeout=timeout)
+                except queue.Empty:
+                    item = self._final_event(job.id)
+                    if item is None:
+                        yield None
+                        continue
+                yield item
+                if item[0] in FINAL_EVENTS:
+                    return
+        finally:
+            with self._lock:
+                self._listeners[job.id].remove(listener)
+                if not self._listeners[job.id]:
+                    del self._listeners[job.id]
+
+    def _final_event(self, job_id):
+        # (status, job dict) once the job has finished, otherwise None
+        with self.app.app_context():
+            job = db.session.get(GenerationJob, job_id)
+            if job is None or job.status in ACTIVE_STATUSES:
+                return None
+            return (job.status, job.to_dict())
+
+
+def _count(query):
+    return query.with_entities(func.count(GenerationJob.id)).scalar_subquery()
+
+
+job_manager = JobManager()
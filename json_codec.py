@@ -0,0 +1,35 @@
+import os
+import json
+import logging
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Backend for slide content; orjson when installed, the stdlib otherwise
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'orjson' if ORJSON_AVAILABLE else 'json')
+
+if JSON_BACKEND == 'orjson' and not ORJSON_AVAILABLE:
+    logger.warning("orjson not installed, using the json module. Install with: pip install orjson")
+    JSON_BACKEND = 'json'
+
+
+def loads(data):
+    if JSON_BACKEND == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj):
+    """Serialise to a str; falls back to the json module for values orjson rejects"""
+    if JSON_BACKEND == 'orjson':
+        try:
+            return orjson.dumps(obj).decode('utf-8')
+        except TypeError:
+            # Non-str dict keys or integers beyond 64 bits
+            pass
+    return json.dumps(obj)
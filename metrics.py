@@ -0,0 +1,274 @@
+import time
+import logging
+import threading
+from bisect import bisect_left
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Bucket upper bounds in seconds for each kind of latency
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+EXPORT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Metric:
+    """One metric family; samples are keyed by their label values in labelnames order"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, tuple(zip(self.labelnames, key)), value
+
+    def render(self):
+        lines = self.header()
+        for name, labels, value in self.samples():
+            lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            # An unlabelled counter is reported from zero rather than left out
+            self._values[()] = 0
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=HTTP_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (not cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        bounds = self.buckets + (float('inf'),)
+        for key, (counts, total, count) in items:
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', labels + (('le', format_value(float(bound))),), cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Registry:
+    """Metric families plus collectors that report current values at scrape time"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """collect() returns (name, kind, help, [(labels dict, value), ...]) tuples"""
+        with self._lock:
+            self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collect in collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                # One broken collector should not take the whole scrape down
+                logger.warning(f"Metrics collector {getattr(collect, '__name__', collect)} failed: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{format_labels(sorted(labels.items()))} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=HTTP_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+HTTP_REQUESTS = counter('http_requests_total', 'HTTP requests by route, method and status.',
+                        ('route', 'method', 'status'))
+HTTP_LATENCY = histogram('http_request_duration_seconds',
+                         'Time until the response is returned by Flask; streamed bodies are not included.',
+                         ('route', 'method'))
+
+OLLAMA_CALLS = counter('ollama_calls_total', 'Ollama generate calls by outcome (ok, error, cached, cancelled).', ('outcome',))
+OLLAMA_LATENCY = histogram('ollama_call_duration_seconds', 'Wall time of Ollama generate calls that reached the server.',
+                           buckets=LLM_BUCKETS)
+OLLAMA_EVAL_TOKENS = counter('ollama_eval_tokens_total', 'Tokens generated by Ollama (eval_count).')
+
+SLIDES_GENERATED = counter('slides_generated_total', 'Slides generated by layout and outcome (ok, failed).',
+                           ('layout', 'outcome'))
+SLIDES_IN_FLIGHT = gauge('slides_in_flight', 'Slides currently being generated.')
+SLIDE_RETRIES = counter('slide_retries_total', 'Extra attempts made to generate a slide, by layout.', ('layout',))
+SLIDE_FALLBACKS = counter('slide_fallbacks_total', 'Slides filled with fallback content, by layout.', ('layout',))
+OUTLINE_FALLBACKS = counter('outline_fallbacks_total', 'Outlines built by the fallback generator.')
+
+EXPORT_LATENCY = histogram('pptx_export_duration_seconds', 'Time to build a PPTX file.', ('outcome',),
+                           buckets=EXPORT_BUCKETS)
+
+DB_QUERY_LATENCY = histogram('db_query_duration_seconds', 'Database statement execution time by operation.',
+                             ('operation',), buckets=DB_BUCKETS)
+
+PROCESS_START = gauge('process_start_time_seconds', 'Start time of the process since the epoch.')
+PROCESS_START.set(time.time())
+
+
+def render():
+    return REGISTRY.render()
+
+
+def register_collector(collect):
+    return REGISTRY.register_collector(collect)
+
+
+def cache_families(caches):
+    """Collector families for {name: stats dict} with hits and misses, as the app's caches report"""
+    lookups = []
+    ratios = []
+    for name, stats in caches.items():
+        lookups.append(({'cache': name, 'result': 'hit'}, stats['hits']))
+        lookups.append(({'cache': name, 'result': 'miss'}, stats['misses']))
+        ratios.append(({'cache': name}, stats['hit_ratio']))
+    return [
+        ('cache_lookups_total', 'counter', 'Cache lookups by cache and result.', lookups),
+        ('cache_hit_ratio', 'gauge', 'Hits over lookups since the process started.', ratios)
+    ]
+
+
+def init_app(app):
+    """Count and time every request by its route pattern"""
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # Route patterns rather than paths keep label cardinality bounded
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+            HTTP_LATENCY.observe(time.perf_counter() - started, route=route, method=request.method)
+        return response
@@ -0,0 +1,70 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import text, inspect
+
+from models import db, Presentation, Slide, GenerationJob
+
+logger = logging.getLogger(__name__)
+
+
+def add_hot_path_indexes(connection):
+    """Composite indexes for per-user listings and ordered slide loads"""
+    for table in (Presentation.__table__, Slide.__table__):
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def add_presentation_version(connection):
+    """Optimistic-lock counter used by the slide PATCH endpoint"""
+    columns = {column['name'] for column in inspect(connection).get_columns('presentations')}
+    if 'version' not in columns:
+        connection.execute(text("ALTER TABLE presentations ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+def add_job_leases(connection):
+    """Owner and lease columns so only jobs whose process died are requeued"""
+    columns = {column['name'] for column in inspect(connection).get_columns(GenerationJob.__tablename__)}
+    if 'owner' not in columns:
+        connection.execute(text("ALTER TABLE generation_jobs ADD COLUMN owner VARCHAR(64)"))
+    if 'lease_expires_at' not in columns:
+        connection.execute(text("ALTER TABLE generation_jobs ADD COLUMN lease_expires_at TIMESTAMP"))
+
+
+# (version, description, migrate(connection)); append only, never renumber
+MIGRATIONS = [
+    (1, 'Add presentation listing and slide order indexes', add_hot_path_indexes),
+    (2, 'Add presentation version column', add_presentation_version),
+    (3, 'Add generation job owner and lease columns', add_job_leases),
+]
+
+
+def applied_versions(engine):
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at TIMESTAMP)"
+        ))
+        return {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def run_migrations(engine=None):
+    """Apply pending migrations in order, each in its own transaction.
+
+    Tables themselves still come from db.create_all(); migrations cover the
+    changes create_all cannot make to an existing database, such as new indexes
+    or columns.
+    """
+    engine = engine or db.engine
+    applied = applied_versions(engine)
+
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as connection:
+            migrate(connection)
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {'v': version, 'd': description, 't': datetime.now()}
+            )
+        logger.info(f"🗃️ Applied migration {version}: {description}")
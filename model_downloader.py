@@ -6,6 +6,7 @@ import json
 import logging
 from pathlib import Path
 import subprocess
+from ollama_http import get_client, OLLAMA_MODEL
 
 # Configure logging
 logging.basicConfig(
@@ -26,7 +27,7 @@ download_status = {
     "eta": "--"         # Estimated time remaining
 }
 
-def check_model_presence(model_name="llama3.1:8b"):
+def check_model_presence(model_name=OLLAMA_MODEL):
     """Check if the model exists using ollama ls command."""
     try:
         # Execute ollama ls command
@@ -74,7 +75,7 @@ def download_model_task():
         logger.info("Testing connection to Ollama")
         # Check Ollama connection first
         try:
-            test_response = requests.get("http://localhost:11434/api/tags", timeout=5)
+            test_response = get_client().get("/api/tags", timeout=5)
             if test_response.status_code != 200:
                 logger.error(f"Ollama check failed: {test_response.status_code} - {test_response.text}")
                 download_status["status"] = "error"
@@ -99,9 +100,9 @@ def download_model_task():
         logger.info("Starting model download via Ollama")
         
         # Call Ollama API to pull the model
-        response = requests.post(
-            "http://localhost:11434/api/pull",
-            json={"name": "llama3.1:8b"},
+        response = get_client().post(
+            "/api/pull",
+            json={"name": OLLAMA_MODEL},
             stream=True
         )
         
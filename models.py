@@ -4,6 +4,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import json
 
+import json_codec
+
 db = SQLAlchemy()
 
 class User(db.Model):
@@ -31,6 +33,11 @@ class User(db.Model):
 
 class Presentation(db.Model):
     __tablename__ = 'presentations'
+    __table_args__ = (
+        # Every listing filters by owner and sorts by recency
+        db.Index('ix_presentations_user_updated', 'user_id', 'updated_at'),
+        db.Index('ix_presentations_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -39,6 +46,8 @@ class Presentation(db.Model):
     slide_count = db.Column(db.Integer, default=6)
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    # Bumped on every edit; clients send it back so stale writes are rejected
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     slides = db.relationship('Slide', backref='presentation', lazy=True, cascade="all, delete-orphan", order_by="Slide.slide_order")
     
@@ -51,11 +60,15 @@ class Presentation(db.Model):
             'slide_count': self.slide_count,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
+            'version': self.version,
             'slides': [slide.to_dict() for slide in self.slides]
         }
 
 class Slide(db.Model):
     __tablename__ = 'slides'
+    __table_args__ = (
+        db.Index('ix_slides_presentation_order', 'presentation_id', 'slide_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     presentation_id = db.Column(db.Integer, db.ForeignKey('presentations.id'), nullable=False)
@@ -63,13 +76,16 @@ class Slide(db.Model):
     layout = db.Column(db.String(50), nullable=False)
     content_json = db.Column(db.Text, nullable=False)
     
+    # content is parsed from content_json on every read (orjson when installed,
+    # see json_codec) and serialised on assignment. Each read is a fresh object,
+    # so edit it freely and assign it back to save.
     @property
     def content(self):
-        return json.loads(self.content_json)
+        return json_codec.loads(self.content_json)
     
     @content.setter
     def content(self, content_dict):
-        self.content_json = json.dumps(content_dict)
+        self.content_json = json_codec.dumps(content_dict)
     
     def to_dict(self):
         return {
@@ -78,4 +94,72 @@ class Slide(db.Model):
             'slide_order': self.slide_order,
             'layout': self.layout,
             'content': self.content
-        }
\ No newline at end of file
+        }
+
+class GenerationJob(db.Model):
+    __tablename__ = 'generation_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    payload_json = db.Column(db.Text, nullable=False)
+    result_json = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    owner = db.Column(db.String(64))  # process holding the job; see jobs.JobManager.owner_id
+    lease_expires_at = db.Column(db.DateTime)  # renewed by the owner's heartbeat while the job is active
+    
+    @property
+    def payload(self):
+        return json.loads(self.payload_json)
+    
+    @property
+    def result(self):
+        return json.loads(self.result_json) if self.result_json else None
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class Document(db.Model):
+    __tablename__ = 'documents'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    content_hash = db.Column(db.String(64), nullable=False, index=True)
+    source = db.Column(db.String(20), nullable=False)  # upload, text
+    filename = db.Column(db.String(255))
+    file_type = db.Column(db.String(20))
+    codec = db.Column(db.String(10), nullable=False)  # zlib, zstd
+    text_blob = db.Column(db.LargeBinary, nullable=False)
+    chunks_blob = db.Column(db.LargeBinary, nullable=False)
+    analysis_json = db.Column(db.Text, nullable=False)
+    chunk_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    last_used_at = db.Column(db.DateTime, default=datetime.now)
+    
+    @property
+    def analysis(self):
+        return json.loads(self.analysis_json)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'filename': self.filename,
+            'file_type': self.file_type,
+            'analysis': self.analysis,
+            'chunk_count': self.chunk_count,
+            'stored_bytes': len(self.text_blob) + len(self.chunks_blob),
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
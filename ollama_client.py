@@ -1,12 +1,17 @@
-import requests
 import json
 import logging
 import os
 import re  # ADD THIS MISSING IMPORT
+import time
 from datetime import datetime
+import metrics
+import tracing
 from content_utils import process_content_for_layout
+from ollama_http import get_client, GenerationCancelled
+from retrieval import get_document_index, build_slide_query, document_key
 import re
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 
 
@@ -21,7 +26,9 @@ debug_dir = "error_logs"
 os.makedirs(debug_dir, exist_ok=True)
 logger = logging.getLogger("ollama_client")
 
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
+# Upper bound on per-slide requests in flight at once. Match this to the
+# server's OLLAMA_NUM_PARALLEL; 1 restores one-slide-at-a-time generation.
+MAX_PARALLEL_SLIDES = int(os.environ.get('OLLAMA_MAX_PARALLEL_SLIDES', os.environ.get('OLLAMA_NUM_PARALLEL', 4)))
 
 PROCESSING_MODES = {
     'preserve': {
@@ -50,6 +57,13 @@ PROCESSING_MODES = {
     }
 }
 
+def accepts_json(validate):
+    """cache_if for format="json" calls: cache only answers that parse to an object validate() accepts"""
+    def accept(result):
+        parsed = json.loads(result.get("response", ""))
+        return isinstance(parsed, dict) and bool(validate(parsed))
+    return accept
+
 CONTENT_PRESERVATION_MODES = {
     'preserve': {
         'instruction': 'Format the following text into the required structure while preserving the original wording as much as possible. Keep key phrases, statistics, and important details exactly as written.',
@@ -220,50 +234,40 @@ Create appropriate {layout} content and return valid JSON only.
             temperature = 0.3  # More creative for generation
             top_p = 0.9
         
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": "llama3.1:8b",
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": temperature,
-                    "top_p": top_p,
-                    "repeat_penalty": 1.1
-                }
+        result = get_client().generate(
+            prompt,
+            options={
+                "temperature": temperature,
+                "top_p": top_p
             }
         )
         
-        if response.status_code == 200:
-            result = response.json()
-            generated_text = result.get("response", "")
-            
-            logger.debug(f"AI response length: {len(generated_text)} chars")
-            logger.debug(f"AI response preview: {generated_text[:200]}")
-            
-            # Extract JSON from response
-            content_result = extract_clean_json(generated_text, layout)
+        generated_text = result.get("response", "")
+        
+        logger.debug(f"AI response length: {len(generated_text)} chars")
+        logger.debug(f"AI response preview: {generated_text[:200]}")
+        
+        # Extract JSON from response
+        content_result = extract_clean_json(generated_text, layout)
+        
+        if content_result:
+            logger.info(f"Successfully parsed AI JSON for {layout}")
             
-            if content_result:
-                logger.info(f"Successfully parsed AI JSON for {layout}")
+            # Validate content quality
+            if validate_ai_content_quality(content_result, layout, source_text):
+                # Process through content utils
+                content_result['topic'] = topic
+                content_result['slide_index'] = slide_index
+                content_result['total_slides'] = total_slides
+                content_result['processing_mode'] = processing_mode
                 
-                # Validate content quality
-                if validate_ai_content_quality(content_result, layout, source_text):
-                    # Process through content utils
-                    content_result['topic'] = topic
-                    content_result['slide_index'] = slide_index
-                    content_result['total_slides'] = total_slides
-                    content_result['processing_mode'] = processing_mode
-                    
-                    return process_content_for_layout(content_result, layout)
-                else:
-                    logger.warning(f"AI content quality validation failed for {layout}")
+                return process_content_for_layout(content_result, layout)
             else:
-                logger.warning(f"Failed to parse AI JSON response for {layout}")
-                logger.debug(f"Raw response: {generated_text}")
+                logger.warning(f"AI content quality validation failed for {layout}")
         else:
-            logger.error(f"AI API error: {response.status_code}")
-            
+            logger.warning(f"Failed to parse AI JSON response for {layout}")
+            logger.debug(f"Raw response: {generated_text}")
+
     except Exception as e:
         logger.error(f"Error in AI generation: {e}")
     
@@ -875,6 +879,10 @@ def process_full_document_for_presentation(full_text, topic, processing_mode='pr
     
     mode_config = PROCESSING_MODES.get(processing_mode, PROCESSING_MODES['preserve'])
     
+    # Hash and index the document once; every slide and retry reuses the key
+    index_key = document_key(full_text)
+    get_document_index(index_key, full_text)
+    
     # Limit text to prevent token overflow (keep first and last parts for context)
     if len(full_text) > 4000:
         document_sample = full_text[:2000] + "\n\n[... CONTENT CONTINUES ...]\n\n" + full_text[-2000:]
@@ -953,57 +961,48 @@ Focus on creating a logical flow that effectively communicates the document's co
     try:
         logger.info(f"Starting document analysis in {processing_mode} mode")
         
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": "llama3.1:8b",
-                "prompt": analysis_prompt,
-                "stream": False,
-                "format": "json",  # Enable native JSON mode
-                "options": {
-                    "temperature": 0.1,  # Low temperature for consistent analysis
-                    "top_p": 0.8,
-                    "repeat_penalty": 1.1
-                }
-            }
+        result = get_client().generate(
+            analysis_prompt,
+            options={
+                "temperature": 0.1,  # Low temperature for consistent analysis
+                "top_p": 0.8
+            },
+            format="json",
+            cache_if=accepts_json(validate_document_analysis)
         )
         
-        if response.status_code == 200:
-            result = response.json()
-            generated_text = result.get("response", "")
+        generated_text = result.get("response", "")
+        
+        try:
+            # Parse JSON directly
+            analysis_result = json.loads(generated_text)
             
-            try:
-                # Parse JSON directly
-                analysis_result = json.loads(generated_text)
-                
-                # Validate the analysis structure
-                if validate_document_analysis(analysis_result):
-                    logger.info(f"✅ Successfully analyzed document: {analysis_result['presentation_plan']['recommended_slides']} slides planned")
-                    return {{
-                        'success': True,
-                        'analysis': analysis_result,
-                        'full_text': full_text,
-                        'processing_mode': processing_mode
-                    }}
-                else:
-                    logger.warning("⚠️ Document analysis validation failed")
-                    
-            except json.JSONDecodeError as e:
-                logger.warning(f"⚠️ JSON decode error in document analysis: {e}")
-                logger.debug(f"Raw analysis response: {generated_text[:300]}...")
+            # Validate the analysis structure
+            if validate_document_analysis(analysis_result):
+                logger.info(f"✅ Successfully analyzed document: {analysis_result['presentation_plan']['recommended_slides']} slides planned")
+                analysis_result['index_key'] = index_key
+                return {
+                    'success': True,
+                    'analysis': analysis_result,
+                    'full_text': full_text,
+                    'processing_mode': processing_mode
+                }
+            else:
+                logger.warning("⚠️ Document analysis validation failed")
                 
-        else:
-            logger.error(f"❌ Ollama API error in document analysis: {response.status_code}")
+        except json.JSONDecodeError as e:
+            logger.warning(f"⚠️ JSON decode error in document analysis: {e}")
+            logger.debug(f"Raw analysis response: {generated_text[:300]}...")
             
     except Exception as e:
         logger.error(f"❌ Exception in document analysis: {e}")
     
     # Fallback analysis
     logger.info("🔄 Using fallback document analysis")
-    return create_fallback_document_analysis(full_text, topic, processing_mode)
+    return create_fallback_document_analysis(full_text, topic, processing_mode, index_key=index_key)
 
 
-def create_fallback_document_analysis(full_text, topic, processing_mode):
+def create_fallback_document_analysis(full_text, topic, processing_mode, index_key=None):
     """
     Enhanced fallback analysis when Ollama analysis fails
     """
@@ -1095,7 +1094,8 @@ def create_fallback_document_analysis(full_text, topic, processing_mode):
                 'recommended_slides': slide_count,
                 'reasoning': f'Fallback structure based on {word_count} words and detected themes',
                 'slide_structure': slide_structure
-            }
+            },
+            'index_key': index_key or document_key(full_text)
         },
         'full_text': full_text,
         'processing_mode': processing_mode
@@ -1309,6 +1309,8 @@ def generate_slide_with_retry(slide_plan, full_document, document_analysis, proc
     logger.debug(f"✅ Layout confirmed as string: '{layout}'")
     
     for attempt in range(max_retries):
+        if attempt:
+            metrics.SLIDE_RETRIES.inc(layout=layout)
         try:
             logger.info(f"Generating slide {slide_number} ({layout}) - Attempt {attempt + 1}/{max_retries}")
             
@@ -1317,7 +1319,9 @@ def generate_slide_with_retry(slide_plan, full_document, document_analysis, proc
                 full_document, 
                 slide_plan.get('source_section', ''), 
                 slide_number, 
-                len(document_analysis['presentation_plan']['slide_structure'])
+                len(document_analysis['presentation_plan']['slide_structure']),
+                query=build_slide_query(slide_plan.get('purpose'), slide_plan.get('content_focus')),
+                index_key=document_analysis.get('index_key')
             )
             
             # Create the prompt
@@ -1337,42 +1341,32 @@ def generate_slide_with_retry(slide_plan, full_document, document_analysis, proc
             mode_config = PROCESSING_MODES.get(processing_mode, PROCESSING_MODES['preserve'])
             
             # Call Ollama with native JSON format
-            response = requests.post(
-                OLLAMA_API_URL,
-                json={
-                    "model": "llama3.1:8b",
-                    "prompt": prompt,
-                    "stream": False,
-                    "format": "json",  # Enable native JSON mode
-                    "options": {
-                        "temperature": mode_config['temperature'] + (attempt * 0.1),  # Slightly increase creativity on retries
-                        "top_p": mode_config['top_p'],
-                        "repeat_penalty": 1.1
-                    }
-                }
+            result = get_client().generate(
+                prompt,
+                options={
+                    "temperature": mode_config['temperature'] + (attempt * 0.1),  # Slightly increase creativity on retries
+                    "top_p": mode_config['top_p']
+                },
+                format="json",
+                cache_if=accepts_json(lambda content: validate_slide_content_enhanced(content, layout, slide_plan))
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                generated_content = result.get("response", "")
+            generated_content = result.get("response", "")
+            
+            try:
+                # Parse the JSON response directly
+                content_result = json.loads(generated_content)
                 
-                try:
-                    # Parse the JSON response directly
-                    content_result = json.loads(generated_content)
-                    
-                    # Validate the content - PASS layout as string and slide_plan as dict
-                    if validate_slide_content_enhanced(content_result, layout, slide_plan):
-                        logger.info(f"✅ Successfully generated slide {slide_number} on attempt {attempt + 1}")
-                        return content_result
-                    else:
-                        logger.warning(f"⚠️ Content validation failed for slide {slide_number}, attempt {attempt + 1}")
-                        
-                except json.JSONDecodeError as e:
-                    logger.warning(f"⚠️ JSON decode error for slide {slide_number}, attempt {attempt + 1}: {e}")
-                    logger.debug(f"Raw response: {generated_content[:200]}...")
+                # Validate the content - PASS layout as string and slide_plan as dict
+                if validate_slide_content_enhanced(content_result, layout, slide_plan):
+                    logger.info(f"✅ Successfully generated slide {slide_number} on attempt {attempt + 1}")
+                    return content_result
+                else:
+                    logger.warning(f"⚠️ Content validation failed for slide {slide_number}, attempt {attempt + 1}")
                     
-            else:
-                logger.error(f"❌ Ollama API error for slide {slide_number}, attempt {attempt + 1}: {response.status_code}")
+            except json.JSONDecodeError as e:
+                logger.warning(f"⚠️ JSON decode error for slide {slide_number}, attempt {attempt + 1}: {e}")
+                logger.debug(f"Raw response: {generated_content[:200]}...")
                 
         except Exception as e:
             logger.error(f"❌ Exception generating slide {slide_number}, attempt {attempt + 1}: {e}")
@@ -1381,6 +1375,7 @@ def generate_slide_with_retry(slide_plan, full_document, document_analysis, proc
     
     # All retries failed, use fallback
     logger.warning(f"🔄 All retries failed for slide {slide_number}, using intelligent fallback")
+    metrics.SLIDE_FALLBACKS.inc(layout=layout)
 
 def create_document_slide_prompt_json(layout, relevant_text, content_focus, purpose, processing_mode, document_context, attempt_number=1):
     """
@@ -1705,7 +1700,7 @@ Follow {processing_mode} mode principles and return valid JSON only.
 """)
 
 
-def extract_document_section(full_document, source_section, slide_number, total_slides):
+def extract_document_section(full_document, source_section, slide_number, total_slides, query=None, index_key=None):
     """Extract relevant section from full document based on slide plan"""
     
     if not full_document:
@@ -1719,6 +1714,12 @@ def extract_document_section(full_document, source_section, slide_number, total_
     elif source_section == "full":
         return full_document
     
+    # Prefer the passages that actually match what the slide is about
+    if query:
+        passages = get_document_index(index_key or document_key(full_document), full_document).top_chunks(query)
+        if passages:
+            return "\n\n".join(passages)
+    
     # For regular sections, divide document into parts
     if total_slides <= 3:
         # For short presentations, use larger sections
@@ -1814,43 +1815,37 @@ LAYOUT GUIDELINES:
 Create exactly {slide_count} slides with a compelling narrative flow."""
 
     try:
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": "llama3.1:8b",
-                "prompt": outline_prompt,
-                "stream": False,
-                "format": "json",
-                "options": {
-                    "temperature": 0.2,  # Lower temperature for consistent structure
-                    "top_p": 0.8,
-                    "repeat_penalty": 1.1
-                }
-            }
+        result = get_client().generate(
+            outline_prompt,
+            options={
+                "temperature": 0.2,  # Lower temperature for consistent structure
+                "top_p": 0.8
+            },
+            format="json",
+            cache_if=accepts_json(lambda outline: validate_outline_structure(outline, slide_count))
         )
         
-        if response.status_code == 200:
-            result = response.json()
-            generated_text = result.get("response", "")
+        generated_text = result.get("response", "")
+        
+        try:
+            outline = json.loads(generated_text)
             
-            try:
-                outline = json.loads(generated_text)
-                
-                # Validate outline structure
-                if validate_outline_structure(outline, slide_count):
-                    logger.info(f"✅ Successfully generated outline with {len(outline['slide_structure'])} slides")
-                    return outline
-                else:
-                    logger.warning("⚠️ Invalid outline structure, using fallback")
-                    
-            except json.JSONDecodeError as e:
-                logger.warning(f"⚠️ JSON decode error in outline generation: {e}")
+            # Validate outline structure
+            if validate_outline_structure(outline, slide_count):
+                logger.info(f"✅ Successfully generated outline with {len(outline['slide_structure'])} slides")
+                return outline
+            else:
+                logger.warning("⚠️ Invalid outline structure, using fallback")
                 
+        except json.JSONDecodeError as e:
+            logger.warning(f"⚠️ JSON decode error in outline generation: {e}")
+            
     except Exception as e:
         logger.error(f"❌ Error generating outline: {e}")
     
     # Fallback outline generation
     logger.info("🔄 Using fallback outline generation")
+    metrics.OUTLINE_FALLBACKS.inc()
 
 def validate_outline_structure(outline, expected_slides):
     """Validate the generated outline structure"""
@@ -1887,7 +1882,7 @@ def validate_outline_structure(outline, expected_slides):
         return False
 
 
-def generate_slide_with_context(slide_info, full_outline, template_id):
+def generate_slide_with_context(slide_info, full_outline, template_id, use_cache=True):
     """Generate individual slide with full presentation context"""
     
     layout = slide_info['layout']
@@ -1988,74 +1983,135 @@ Return valid JSON only.
 """)
     
     try:
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": "llama3.1:8b",
-                "prompt": prompt,
-                "stream": False,
-                "format": "json",
-                "options": {
-                    "temperature": 0.3,
-                    "top_p": 0.9,
-                    "repeat_penalty": 1.1
-                }
-            }
+        result = get_client().generate(
+            prompt,
+            options={
+                "temperature": 0.3,
+                "top_p": 0.9
+            },
+            format="json",
+            use_cache=use_cache,
+            cache_if=accepts_json(lambda content: validate_slide_content_enhanced(content, layout, slide_info))
         )
         
-        if response.status_code == 200:
-            result = response.json()
-            generated_text = result.get("response", "")
-            
-            try:
+        generated_text = result.get("response", "")
+        
+        try:
+            with tracing.span('slide.parse', chars=len(generated_text)):
                 content_result = json.loads(generated_text)
-                
-                # Process content
-                content_result['topic'] = full_outline['presentation_meta']['title']
-                content_result['slide_index'] = slide_number
-                content_result['total_slides'] = total_slides
-                
+            
+            # Process content
+            content_result['topic'] = full_outline['presentation_meta']['title']
+            content_result['slide_index'] = slide_number
+            content_result['total_slides'] = total_slides
+            
+            with tracing.span('slide.layout', layout=layout):
                 return process_content_for_layout(content_result, layout)
-                
-            except json.JSONDecodeError:
-                logger.warning(f"JSON decode error for slide {slide_number}")
-                
+            
+        except json.JSONDecodeError:
+            logger.warning(f"JSON decode error for slide {slide_number}")
+            
     except Exception as e:
         logger.error(f"Error generating slide {slide_number}: {e}")
     
-def generate_slides_from_outline(outline, template_id):
-    """Generate all slides using the outline context"""
-    
-    slides = []
-    slide_structure = outline['slide_structure']
+def generate_slides_concurrently(slide_structure, generate_fn, max_workers=None, on_event=None, cancelled=None):
+    """Run generate_fn for every slide, up to max_workers at a time, and return slides in slide_number order
     
-    logger.info(f"🎨 Generating {len(slide_structure)} slides with context")
+    on_event, when given, is called as on_event(name, data) with 'slide_started',
+    'slide_done' and 'slide_failed' progress events from the worker threads.
+    cancelled is an optional threading.Event; once set, slides not yet started are skipped.
+    """
     
-    for slide_info in slide_structure:
+    def emit(name, data):
+        if on_event:
+            try:
+                on_event(name, data)
+            except Exception as e:
+                logger.warning(f"Slide progress callback failed: {e}")
+    
+    if max_workers is None:
+        max_workers = MAX_PARALLEL_SLIDES
+    max_workers = max(1, min(int(max_workers), len(slide_structure) or 1))
+    
+    submitted = time.perf_counter()
+    
+    @tracing.bind
+    def run_one(slide_info):
+        slide_number = slide_info.get('slide_number')
+        if cancelled is not None and cancelled.is_set():
+            logger.info(f"🛑 Skipping slide {slide_number}, generation was cancelled")
+            return None
+        with tracing.span('slide.generate', slide_number=slide_number, layout=slide_info.get('layout'),
+                          queue_wait_ms=round((time.perf_counter() - submitted) * 1000, 1)) as span:
+            metrics.SLIDES_IN_FLIGHT.inc()
+            try:
+                slide = generate_one(slide_info)
+            finally:
+                metrics.SLIDES_IN_FLIGHT.dec()
+            span.set(ok=slide is not None)
+            metrics.SLIDES_GENERATED.inc(layout=slide_info.get('layout'), outcome='ok' if slide else 'failed')
+            return slide
+    
+    def generate_one(slide_info):
+        slide_number = slide_info.get('slide_number')
+        emit('slide_started', {'slide_number': slide_number, 'layout': slide_info.get('layout')})
         try:
-            content = generate_slide_with_context(slide_info, outline, template_id)
+            content = generate_fn(slide_info)
             
             if content:
-                slides.append({
+                logger.info(f"Generated slide {slide_info['slide_number']}: {slide_info['layout']}")
+                slide = {
                     'layout': slide_info['layout'],
                     'content': content
-                })
-                logger.info(f"Generated slide {slide_info['slide_number']}: {slide_info['layout']}")
-            else:
-                logger.warning(f"Failed to generate slide {slide_info['slide_number']}")
-                
+                }
+                emit('slide_done', {'slide_number': slide_number, 'slide': slide})
+                return slide
+            logger.warning(f"Failed to generate slide {slide_info['slide_number']}")
+            
         except Exception as e:
-            logger.error(f"Error generating slide {slide_info['slide_number']}: {e}")
-            continue
+            logger.error(f"Error generating slide {slide_number}: {e}")
+        
+        emit('slide_failed', {'slide_number': slide_number})
+        return None
+    
+    if max_workers == 1:
+        results = [run_one(slide_info) for slide_info in slide_structure]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='slide-gen') as executor:
+            results = list(executor.map(run_one, slide_structure))
+    
+    # executor.map keeps submission order; sort on slide_number in case the outline lists slides out of order
+    ordered = sorted(
+        zip(slide_structure, results),
+        key=lambda pair: pair[0].get('slide_number') or 0
+    )
+    return [slide for _, slide in ordered if slide]
+
+def generate_slides_from_outline(outline, template_id, max_workers=None, use_cache=True):
+    """Generate all slides using the outline context"""
+    
+    slide_structure = outline['slide_structure']
+    
+    logger.info(f"🎨 Generating {len(slide_structure)} slides with context")
+    
+    slides = generate_slides_concurrently(
+        slide_structure,
+        lambda slide_info: generate_slide_with_context(slide_info, outline, template_id, use_cache=use_cache),
+        max_workers=max_workers
+    )
     
     logger.info(f"✅ Successfully generated {len(slides)} slides with context")
     return slides
 
 
-def generate_presentation_outline_enhanced(topic, slide_count, input_method='topic', content_context=None, processing_mode='generate'):
-    """Enhanced outline generation with content context support"""
+def generate_presentation_outline_enhanced(topic, slide_count, input_method='topic', content_context=None, processing_mode='generate', on_token=None, use_cache=True, cancelled=None):
+    """Enhanced outline generation with content context support; on_token receives streamed model output
+
+    Setting cancelled (a threading.Event) stops the streamed request and returns None.
+    """
     
     logger.info(f"🎯 Generating enhanced outline: method={input_method}, mode={processing_mode}")
+    prompt_started = time.perf_counter()
     
     # Build context-aware prompt
     if input_method == 'topic':
@@ -2153,86 +2209,84 @@ Return ONLY this JSON structure:
 }}
 
 Focus on creating a presentation that flows naturally and engages the audience throughout."""
+    tracing.record('outline.prompt', time.perf_counter() - prompt_started, chars=len(outline_prompt))
 
     try:
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": "llama3.1:8b",
-                "prompt": outline_prompt,
-                "stream": False,
-                "format": "json",
-                "options": {
-                    "temperature": 0.2,
-                    "top_p": 0.8,
-                    "repeat_penalty": 1.1
-                }
-            }
+        result = get_client().generate(
+            outline_prompt,
+            options={
+                "temperature": 0.2,
+                "top_p": 0.8
+            },
+            format="json",
+            on_token=on_token,
+            use_cache=use_cache,
+            cache_if=accepts_json(lambda outline: validate_outline_structure_enhanced(outline, slide_count)),
+            cancelled=cancelled
         )
         
-        if response.status_code == 200:
-            result = response.json()
-            generated_text = result.get("response", "")
-            
-            try:
+        generated_text = result.get("response", "")
+        
+        try:
+            with tracing.span('outline.parse', chars=len(generated_text)):
                 outline = json.loads(generated_text)
+            
+            # Validate and enhance outline
+            if validate_outline_structure_enhanced(outline, slide_count):
+                logger.info(f"✅ Enhanced outline generated: {len(outline['slide_structure'])} slides")
+                return outline
+            else:
+                logger.warning("⚠️ Enhanced outline validation failed, using fallback")
                 
-                # Validate and enhance outline
-                if validate_outline_structure_enhanced(outline, slide_count):
-                    logger.info(f"✅ Enhanced outline generated: {len(outline['slide_structure'])} slides")
-                    return outline
-                else:
-                    logger.warning("⚠️ Enhanced outline validation failed, using fallback")
-                    
-            except json.JSONDecodeError as e:
-                logger.warning(f"⚠️ JSON decode error in enhanced outline: {e}")
-                
+        except json.JSONDecodeError as e:
+            logger.warning(f"⚠️ JSON decode error in enhanced outline: {e}")
+            
+    except GenerationCancelled:
+        logger.info("🛑 Outline generation cancelled")
+        return None
     except Exception as e:
         logger.error(f"❌ Error in enhanced outline generation: {e}")
     
     # Fallback outline generation
     logger.info("🔄 Using enhanced fallback outline generation")
+    metrics.OUTLINE_FALLBACKS.inc()
     return create_enhanced_fallback_outline(topic, slide_count, input_method, content_context)
 
-def generate_slides_from_outline_enhanced(outline, template_id, content_data=None, processing_mode='preserve'):
-    """Enhanced slide generation from outline with content context"""
+def generate_slides_from_outline_enhanced(outline, template_id, content_data=None, processing_mode='preserve', max_workers=None, on_event=None, cancelled=None, use_cache=True):
+    """Enhanced slide generation from outline with content context
+    
+    on_event receives per-slide progress events (see generate_slides_concurrently);
+    setting cancelled stops the slides that have not started yet.
+    """
     
-    slides = []
     slide_structure = outline['slide_structure']
     generation_metadata = outline.get('generation_metadata', {})
     input_method = generation_metadata.get('input_method', 'topic')
     
     logger.info(f"🎨 Generating {len(slide_structure)} slides with enhanced context (method: {input_method})")
     
-    for slide_info in slide_structure:
-        try:
-            # Generate slide with enhanced context
-            content = generate_slide_with_enhanced_context(
-                slide_info=slide_info,
-                full_outline=outline,
-                template_id=template_id,
-                content_data=content_data,
-                processing_mode=processing_mode,
-                input_method=input_method
-            )
-            
-            if content:
-                slides.append({
-                    'layout': slide_info['layout'],
-                    'content': content
-                })
-                logger.info(f"Generated slide {slide_info['slide_number']}: {slide_info['layout']}")
-            else:
-                logger.warning(f"Failed to generate slide {slide_info['slide_number']}")
-                
-        except Exception as e:
-            logger.error(f"Error generating slide {slide_info['slide_number']}: {e}")
-            continue
+    # Each slide falls back on its own inside generate_slide_with_enhanced_context,
+    # so one failed request never holds up the rest of the deck
+    slides = generate_slides_concurrently(
+        slide_structure,
+        lambda slide_info: generate_slide_with_enhanced_context(
+            slide_info=slide_info,
+            full_outline=outline,
+            template_id=template_id,
+            content_data=content_data,
+            processing_mode=processing_mode,
+            input_method=input_method,
+            use_cache=use_cache
+        ),
+        max_workers=max_workers,
+        on_event=on_event,
+        cancelled=cancelled
+    )
     
     logger.info(f"✅ Successfully generated {len(slides)} enhanced slides")
     return slides
 
-def generate_slide_with_enhanced_context(slide_info, full_outline, template_id, content_data=None, processing_mode='preserve', input_method='topic'):
+def generate_slide_with_enhanced_context(slide_info, full_outline, template_id, content_data=None, processing_mode='preserve', input_method='topic', on_token=None, use_cache=True):
     """Generate individual slide with enhanced context from outline and source content"""
     
     layout = slide_info['layout']
@@ -2261,7 +2315,7 @@ Next Transition: {slide_info['transitions']['to_next'] or 'Closing slide'}
 """
 
     # Add content context if available
-    if content_data and input_method in ['text', 'document']:
+    if content_data and input_method in ['text', 'document', 'upload']:
         # Extract relevant content section for this slide
         relevant_content = extract_relevant_content_for_slide(
             content_data, slide_info, slide_number, total_slides
@@ -2390,43 +2444,41 @@ Return valid JSON only.
 """)
     
     try:
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": "llama3.1:8b",
-                "prompt": prompt,
-                "stream": False,
-                "format": "json",
-                "options": {
-                    "temperature": 0.3,
-                    "top_p": 0.9,
-                    "repeat_penalty": 1.1
-                }
-            }
+        result = get_client().generate(
+            prompt,
+            options={
+                "temperature": 0.3,
+                "top_p": 0.9
+            },
+            format="json",
+            on_token=on_token,
+            use_cache=use_cache,
+            cache_if=accepts_json(lambda content: validate_slide_content_enhanced(content, layout, slide_info))
         )
         
-        if response.status_code == 200:
-            result = response.json()
-            generated_text = result.get("response", "")
-            
-            try:
+        generated_text = result.get("response", "")
+        
+        try:
+            with tracing.span('slide.parse', chars=len(generated_text)):
                 content_result = json.loads(generated_text)
-                
-                # Process content with enhanced context
-                content_result['topic'] = full_outline['presentation_meta']['title']
-                content_result['slide_index'] = slide_number
-                content_result['total_slides'] = total_slides
-                content_result['processing_mode'] = processing_mode
-                
+            
+            # Process content with enhanced context
+            content_result['topic'] = full_outline['presentation_meta']['title']
+            content_result['slide_index'] = slide_number
+            content_result['total_slides'] = total_slides
+            content_result['processing_mode'] = processing_mode
+            
+            with tracing.span('slide.layout', layout=layout):
                 return process_content_for_layout(content_result, layout)
-                
-            except json.JSONDecodeError:
-                logger.warning(f"JSON decode error for enhanced slide {slide_number}")
-                
+            
+        except json.JSONDecodeError:
+            logger.warning(f"JSON decode error for enhanced slide {slide_number}")
+            
     except Exception as e:
         logger.error(f"Error generating enhanced slide {slide_number}: {e}")
     
     # Enhanced fallback content generation
+    metrics.SLIDE_FALLBACKS.inc(layout=layout)
     return generate_enhanced_fallback_content(layout, slide_info, content_data, processing_mode)
 
 def extract_relevant_content_for_slide(content_data, slide_info, slide_number, total_slides):
@@ -2437,7 +2489,23 @@ def extract_relevant_content_for_slide(content_data, slide_info, slide_number, t
     
     full_text = content_data['full_text']
     
-    # Simple content sectioning based on slide position
+    # Content slides get the best-matching passages from the document index;
+    # the title slide still opens on the document's own introduction
+    if slide_number != 1:
+        query = build_slide_query(
+            slide_info.get('title'),
+            slide_info.get('key_points'),
+            slide_info.get('content_focus'),
+            slide_info.get('purpose')
+        )
+        # Stored documents are indexed under their id when saved; raw text carries a key hashed once per request
+        key = content_data.get('document_id') or content_data.get('index_key') or document_key(full_text)
+        index = get_document_index(key, full_text, chunks=content_data.get('chunks'))
+        passages = index.top_chunks(query) if query else []
+        if passages:
+            return "\n\n".join(passages)
+    
+    # Fall back to sectioning based on slide position
     if total_slides <= 3:
         # For short presentations, use larger sections
         if slide_number == 1:
@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+import tracing
+from response_cache import ResponseCache, make_cache_key
+
+logger = logging.getLogger("ollama_http")
+
+# Connection and model settings, overridable per deployment
+OLLAMA_BASE_URL = os.environ.get('OLLAMA_HOST', 'http://localhost:11434').rstrip('/')
+OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3.1:8b')
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get('OLLAMA_CONNECT_TIMEOUT', 5))
+OLLAMA_READ_TIMEOUT = float(os.environ.get('OLLAMA_READ_TIMEOUT', 300))
+OLLAMA_POOL_SIZE = int(os.environ.get('OLLAMA_POOL_SIZE', 10))
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
+
+# Sampling options applied to every call; call sites only pass what differs
+DEFAULT_OPTIONS = {
+    'repeat_penalty': 1.1
+}
+DEFAULT_OPTIONS.update(json.loads(os.environ.get('OLLAMA_OPTIONS', '{}')))
+
+# Only near-deterministic calls are cached; Ollama samples at 0.8 when no temperature is given
+CACHE_MAX_TEMPERATURE = float(os.environ.get('OLLAMA_CACHE_MAX_TEMPERATURE', 0.3))
+OLLAMA_DEFAULT_TEMPERATURE = 0.8
+
+LATENCY_WINDOW = 200
+
+
+class OllamaError(Exception):
+    """Raised when Ollama answers with a non-200 status"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class GenerationCancelled(Exception):
+    """Raised when the caller's cancelled event is set while a response streams in"""
+
+
+class OllamaClient:
+    """Pooled keep-alive HTTP client shared by every Ollama call in the app"""
+
+    def __init__(self, base_url=OLLAMA_BASE_URL, model=OLLAMA_MODEL,
+                 connect_timeout=OLLAMA_CONNECT_TIMEOUT, read_timeout=OLLAMA_READ_TIMEOUT,
+                 pool_size=OLLAMA_POOL_SIZE, default_options=None, keep_alive=OLLAMA_KEEP_ALIVE,
+                 cache=None):
+        self.base_url = base_url
+        self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.keep_alive = keep_alive
+        self.default_options = dict(DEFAULT_OPTIONS if default_options is None else default_options)
+        self.cache = cache if cache is not None else ResponseCache()
+
+        # One session means one connection pool; the adapter keeps up to pool_size
+        # sockets alive so concurrent slide requests reuse connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._call_count = 0
+        self._error_count = 0
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def build_payload(self, prompt, options=None, format=None, model=None, stream=False):
+        """Build an /api/generate payload with config defaults merged under per-call options"""
+        merged_options = dict(self.default_options)
+        if options:
+            merged_options.update(options)
+
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": merged_options
+        }
+        if format:
+            payload["format"] = format
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def generate(self, prompt, options=None, format=None, model=None, on_token=None, use_cache=True,
+                 cache_if=None, cancelled=None):
+        """Call /api/generate and return Ollama's decoded JSON body
+
+        With on_token the request is streamed: each NDJSON fragment is passed to
+        on_token as it arrives and the fragments are joined into 'response', so
+        callers see the same result shape either way.
+
+        Caching is opt-in: with cache_if, responses are cached by (model, prompt,
+        options, format) and a fresh answer is stored only when cache_if(result)
+        is true, so answers the caller would reject are never replayed. Calls
+        sampled above CACHE_MAX_TEMPERATURE are never cached. use_cache=False
+        skips the lookup and forces a fresh answer, which then replaces the entry.
+
+        cancelled is an optional threading.Event checked between streamed
+        fragments; once it is set the upstream response is closed, so Ollama
+        stops generating, and GenerationCancelled is raised.
+        """
+        payload = self.build_payload(prompt, options=options, format=format, model=model,
+                                     stream=on_token is not None)
+        temperature = payload['options'].get('temperature', OLLAMA_DEFAULT_TEMPERATURE)
+        cacheable = cache_if is not None and temperature <= CACHE_MAX_TEMPERATURE
+        cache_key = make_cache_key(payload['model'], prompt, payload['options'], format) if cacheable else None
+
+        with tracing.span('ollama.generate', model=payload['model'], stream=payload['stream'],
+                          prompt_chars=len(prompt)) as span:
+            if cacheable and use_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.debug("Ollama response served from cache")
+                    span.set(cached=True)
+                    metrics.OLLAMA_CALLS.inc(outcome='cached')
+                    if on_token and cached.get('response'):
+                        on_token(cached['response'])
+                    return dict(cached)
+
+            started = time.perf_counter()
+            first_token = []
+
+            def forward(token):
+                if not first_token:
+                    first_token.append(time.perf_counter() - started)
+                on_token(token)
+
+            result = self._call(payload, forward if on_token else None, cancelled)
+            span.set(cached=False, **call_timings(result, time.perf_counter() - started,
+                                                  first_token[0] if first_token else None))
+        if result.get('eval_count'):
+            metrics.OLLAMA_EVAL_TOKENS.inc(result['eval_count'])
+        if cacheable and self._accepted(cache_if, result):
+            self.cache.put(cache_key, result)
+        return result
+
+    def _accepted(self, cache_if, result):
+        try:
+            return bool(cache_if(result))
+        except Exception as e:
+            logger.debug(f"Not caching Ollama response: {e}")
+            return False
+
+    def _call(self, payload, on_token, cancelled=None):
+        """POST one generate payload, streaming through on_token when given"""
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = self.session.post(self.url('/api/generate'), json=payload, timeout=self.timeout,
+                                         stream=on_token is not None)
+            if response.status_code != 200:
+                raise OllamaError(f"Ollama API error: {response.status_code}", response.status_code)
+
+            if on_token is None:
+                result = response.json()
+            else:
+                result = self._read_stream(response, on_token, cancelled)
+            outcome = 'ok'
+            return result
+        except GenerationCancelled:
+            outcome = 'cancelled'
+            raise
+        finally:
+            self._record(time.perf_counter() - start, outcome)
+
+    def _read_stream(self, response, on_token, cancelled=None):
+        """Consume a streaming /api/generate response, forwarding each token"""
+        pieces = []
+        final = {}
+        with response:
+            for line in response.iter_lines():
+                if cancelled is not None and cancelled.is_set():
+                    # Leaving the with block closes the connection mid-stream
+                    raise GenerationCancelled('Generation cancelled by the caller')
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise OllamaError(f"Ollama stream error: {chunk['error']}")
+
+                token = chunk.get('response', '')
+                if token:
+                    pieces.append(token)
+                    on_token(token)
+
+                if chunk.get('done'):
+                    final = chunk
+                    break
+
+        final = dict(final)
+        final['response'] = ''.join(pieces)
+        return final
+
+    def get(self, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(self.url(path), **kwargs)
+
+    def post(self, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(self.url(path), **kwargs)
+
+    def _record(self, elapsed, outcome):
+        with self._lock:
+            self._call_count += 1
+            if outcome == 'error':
+                self._error_count += 1
+            self._latencies.append(elapsed)
+        metrics.OLLAMA_CALLS.inc(outcome=outcome)
+        metrics.OLLAMA_LATENCY.observe(elapsed)
+        logger.debug(f"Ollama call {outcome} in {elapsed:.2f}s")
+
+    def latency_stats(self):
+        """Summary of recent per-call latency in seconds"""
+        with self._lock:
+            samples = sorted(self._latencies)
+            calls = self._call_count
+            errors = self._error_count
+
+        if not samples:
+            return {'calls': calls, 'errors': errors, 'window': 0}
+
+        return {
+            'calls': calls,
+            'errors': errors,
+            'window': len(samples),
+            'avg': round(sum(samples) / len(samples), 3),
+            'p50': round(samples[len(samples) // 2], 3),
+            'p95': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            'max': round(samples[-1], 3)
+        }
+
+
+def call_timings(result, elapsed, ttft=None):
+    """Span attributes for one generate call from its wall time and Ollama's own counters
+
+    Ollama reports durations in nanoseconds. Its load_duration also covers time
+    spent waiting for the scheduler, so queue_wait_ms is that plus whatever the
+    client saw beyond total_duration (connection and network). Without a
+    streamed first token, time-to-first-token is everything before eval began.
+    """
+    def ms(key):
+        return result.get(key, 0) / 1e6
+
+    elapsed_ms = elapsed * 1000
+    timings = {'total_ms': round(elapsed_ms, 1)}
+    if 'total_duration' in result:
+        timings['queue_wait_ms'] = round(max(0.0, elapsed_ms - ms('total_duration')) + ms('load_duration'), 1)
+        timings['prompt_eval_ms'] = round(ms('prompt_eval_duration'), 1)
+        timings['prompt_tokens'] = result.get('prompt_eval_count', 0)
+    if ttft is not None:
+        timings['ttft_ms'] = round(ttft * 1000, 1)
+    elif 'eval_duration' in result:
+        timings['ttft_ms'] = round(max(0.0, elapsed_ms - ms('eval_duration')), 1)
+    if result.get('eval_count') and result.get('eval_duration'):
+        timings['eval_tokens'] = result['eval_count']
+        timings['tokens_per_sec'] = round(result['eval_count'] / (result['eval_duration'] / 1e9), 1)
+    return timings
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide Ollama client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OllamaClient()
+    return _client
@@ -0,0 +1,89 @@
+import os
+import base64
+import logging
+from datetime import datetime
+
+from sqlalchemy import or_, and_
+
+from models import db, Presentation
+
+logger = logging.getLogger(__name__)
+
+PRESENTATION_PAGE_SIZE = int(os.environ.get('PRESENTATION_PAGE_SIZE', 24))
+MAX_PAGE_SIZE = int(os.environ.get('PRESENTATION_MAX_PAGE_SIZE', 100))
+
+SUMMARY_COLUMNS = (
+    Presentation.id,
+    Presentation.topic,
+    Presentation.template_id,
+    Presentation.slide_count,
+    Presentation.created_at,
+    Presentation.updated_at
+)
+
+
+def encode_cursor(updated_at, presentation_id):
+    # Older rows may have no updated_at; an empty timestamp stands for NULL
+    raw = f"{updated_at.isoformat() if updated_at else ''}|{presentation_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Return (updated_at or None, id) from an opaque cursor. Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        updated_at, presentation_id = raw.rsplit('|', 1)
+        return (datetime.fromisoformat(updated_at) if updated_at else None), int(presentation_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError('Invalid page cursor') from e
+
+
+def clamp_page_size(limit):
+    try:
+        limit = int(limit) if limit is not None else PRESENTATION_PAGE_SIZE
+    except (TypeError, ValueError):
+        raise ValueError('limit must be a number')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def presentation_summary_page(user_id, limit=None, cursor=None):
+    """One page of a user's presentations, newest first, without slides.
+
+    Uses keyset pagination on (updated_at, id) so every page costs the same
+    index range scan no matter how deep it is. Rows without updated_at sort
+    last on every backend. Returns (items, next_cursor); next_cursor is None
+    on the last page.
+    """
+    limit = clamp_page_size(limit)
+    query = db.session.query(*SUMMARY_COLUMNS).filter(Presentation.user_id == user_id)
+
+    if cursor:
+        updated_at, presentation_id = decode_cursor(cursor)
+        if updated_at is None:
+            query = query.filter(Presentation.updated_at.is_(None), Presentation.id < presentation_id)
+        else:
+            query = query.filter(or_(
+                Presentation.updated_at < updated_at,
+                and_(Presentation.updated_at == updated_at, Presentation.id < presentation_id),
+                Presentation.updated_at.is_(None)
+            ))
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.order_by(Presentation.updated_at.desc().nulls_last(), Presentation.id.desc())\
+        .limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [
+        {
+            'id': row.id,
+            'topic': row.topic,
+            'template_id': row.template_id,
+            'slide_count': row.slide_count,
+            'created_at': row.created_at,
+            'updated_at': row.updated_at
+        }
+        for row in rows
+    ]
+    next_cursor = encode_cursor(rows[-1].updated_at, rows[-1].id) if has_more else None
+    return items, next_cursor
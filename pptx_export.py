@@ -6,10 +6,39 @@ from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.dml.color import RGBColor
 from pptx.enum.shapes import MSO_SHAPE
 from pptx.enum.text import MSO_AUTO_SIZE
-import tkinter as tk
-from tkinter import filedialog
-from pptx.enum.text import MSO_AUTO_SIZE
+from pptx.oxml import parse_xml
+from lxml import etree
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+import json
+import hashlib
 import textwrap
+import threading
+import time
+import metrics
+import tracing
+from disk_cache import DiskLRUCache, CACHE_ROOT
+
+# Renders run on a small pool so a burst of exports cannot starve request threads
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 2))
+EXPORT_MAX_PENDING = int(os.environ.get('EXPORT_MAX_PENDING', 8))
+
+# Opt-in for the pywebview wrapper: ask where to save with a native dialog instead of downloading
+DESKTOP_EXPORT = os.environ.get('PPT_DESKTOP_EXPORT', '').lower() in ('1', 'true', 'yes')
+
+# Finished decks are cached by a hash of everything that shapes the file; bump the
+# version whenever create_presentation's output changes so old files stop matching
+EXPORTER_VERSION = 1
+EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR', os.path.join(CACHE_ROOT, 'exports'))
+EXPORT_CACHE_MAX_MB = int(os.environ.get('EXPORT_CACHE_MAX_MB', 256))
+
+# Each rendered slide's XML is kept too, so an edited deck only re-renders the slides that changed
+SLIDE_CACHE_DIR = os.environ.get('SLIDE_CACHE_DIR', os.path.join(CACHE_ROOT, 'slides'))
+SLIDE_CACHE_MAX_MB = int(os.environ.get('SLIDE_CACHE_MAX_MB', 128))
+
+PPTX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
 
 def hex_to_rgb(hex_color):
     """Convert hex color string to RGB tuple for PowerPoint"""
@@ -371,8 +400,81 @@ def create_image_with_features_slide(presentation, content, template):
         )
     return slide
 
-def create_presentation(filename, slides, template_id):
-    """Create a PowerPoint presentation with improved layout matching"""
+_slide_cache = None
+
+
+def get_slide_cache():
+    """Return the shared on-disk cache of rendered slide parts, creating it on first use"""
+    global _slide_cache
+    if _slide_cache is None:
+        _slide_cache = DiskLRUCache(SLIDE_CACHE_DIR, SLIDE_CACHE_MAX_MB * 1024 * 1024)
+    return _slide_cache
+
+
+def slide_cache_key(layout, content, template_id):
+    material = json.dumps([EXPORTER_VERSION, template_id, layout, content], sort_keys=True,
+                          separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def pack_slide(presentation, slide):
+    """Serialise a rendered slide as its layout index and <p:sld> XML, or None if it can't be reused"""
+    # Only the slide layout relationship survives a splice; images or links would dangle
+    if len(slide.part.rels) != 1:
+        return None
+    layout_index = list(presentation.slide_layouts).index(slide.slide_layout)
+    return b'%d\n' % layout_index + etree.tostring(slide._element)
+
+
+def splice_slide(presentation, blob):
+    """Add a slide whose shapes and background come from a packed slide part"""
+    layout_index, xml = blob.split(b'\n', 1)
+    slide = presentation.slides.add_slide(presentation.slide_layouts[int(layout_index)])
+    # Swap the contents in place so the Slide object python-pptx holds stays valid
+    element, cached = slide._element, parse_xml(xml)
+    for child in list(element):
+        element.remove(child)
+    element.attrib.update(cached.attrib)
+    element.extend(list(cached))
+    return slide
+
+
+def render_slide(prs, layout, content, template):
+    """Add one slide built from scratch; returns None for an unknown layout"""
+    if layout == 'titleOnly':
+        return create_title_only_slide(prs, content, template)
+    elif layout == 'titleAndBullets':
+        return create_title_and_bullets_slide(prs, content, template)
+    elif layout == 'quote':
+        return create_quote_slide(prs, content, template)
+    elif layout == 'imageAndParagraph':
+        return create_image_and_paragraph_slide(prs, content, template)
+    elif layout == 'twoColumn':
+        return create_two_column_slide(prs, content, template)
+    elif layout == 'imageWithFeatures':
+        return create_image_with_features_slide(prs, content, template)
+    elif layout == 'numberedFeatures':
+        return create_numbered_features_slide(prs, content, template)
+    elif layout == 'benefitsGrid':
+        return create_benefits_grid_slide(prs, content, template)
+    elif layout == 'iconGrid':
+        return create_icon_grid_slide(prs, content, template)
+    elif layout == 'sideBySideComparison':
+        return create_side_by_side_comparison_slide(prs, content, template)
+    elif layout == 'timeline':
+        return create_timeline_slide(prs, content, template)
+    elif layout == 'conclusion':
+        return create_conclusion_slide(prs, content, template)
+    return None
+
+
+def create_presentation(filename, slides, template_id, slide_cache=None):
+    """Create a PowerPoint presentation with improved layout matching
+
+    With a slide_cache (a DiskLRUCache), slides whose layout, content and
+    template were rendered before are spliced in from their cached XML and
+    only the rest are built shape by shape.
+    """
     prs = Presentation()
     
     # Set the slide size to 16:9 aspect ratio
@@ -383,34 +485,26 @@ def create_presentation(filename, slides, template_id):
     template = parse_template_colors(template_id)
     
     # Create slides based on their layout type
-    for slide_data in slides:
-        layout = slide_data.get('layout')
-        content = slide_data.get('content', {})
-        
-        if layout == 'titleOnly':
-            create_title_only_slide(prs, content, template)
-        elif layout == 'titleAndBullets':
-            create_title_and_bullets_slide(prs, content, template)
-        elif layout == 'quote':
-            create_quote_slide(prs, content, template)
-        elif layout == 'imageAndParagraph':
-            create_image_and_paragraph_slide(prs, content, template)
-        elif layout == 'twoColumn':
-            create_two_column_slide(prs, content, template)
-        elif layout == 'imageWithFeatures':
-            create_image_with_features_slide(prs, content, template)
-        elif layout == 'numberedFeatures':
-            create_numbered_features_slide(prs, content, template)
-        elif layout == 'benefitsGrid':
-            create_benefits_grid_slide(prs, content, template)
-        elif layout == 'iconGrid':
-            create_icon_grid_slide(prs, content, template)
-        elif layout == 'sideBySideComparison':
-            create_side_by_side_comparison_slide(prs, content, template)
-        elif layout == 'timeline':
-            create_timeline_slide(prs, content, template)
-        elif layout == 'conclusion':
-            create_conclusion_slide(prs, content, template)
+    reused = rendered = 0
+    with tracing.span('export.slides', slides=len(slides)) as span:
+        for slide_data in slides:
+            layout = slide_data.get('layout')
+            content = slide_data.get('content', {})
+
+            key = slide_cache_key(layout, content, template_id) if slide_cache is not None else None
+            blob = slide_cache.get(key) if key else None
+            if blob is not None:
+                splice_slide(prs, blob)
+                reused += 1
+                continue
+
+            slide = render_slide(prs, layout, content, template)
+            rendered += 1
+            if slide is not None and key:
+                packed = pack_slide(prs, slide)
+                if packed is not None:
+                    slide_cache.put(key, packed)
+        span.set(reused=reused, rendered=rendered)
     
     # Save the presentation
     prs.save(filename)
@@ -1816,40 +1910,182 @@ def create_two_column_slide(presentation, content, template):
 
 
 
-def export_pptx_local():
-    data = request.json
-    slides = data.get('slides', [])
-    template_id = data.get('template')
-    topic = data.get('topic', 'presentation')
+class ExportQueueFull(Exception):
+    """Raised when every export worker is busy and the backlog is full"""
+
+
+class ExportPool:
+    """Bounded worker pool that renders decks to PPTX bytes"""
+
+    def __init__(self, workers=EXPORT_WORKERS, max_pending=EXPORT_MAX_PENDING):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pptx-export')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def render(self, slides, template_id):
+        """Render on a worker and wait for the bytes; raises ExportQueueFull when saturated"""
+        if not self._slots.acquire(blocking=False):
+            raise ExportQueueFull('Too many exports in progress, please try again shortly')
+        submitted = time.perf_counter()
+        try:
+            future = self.executor.submit(tracing.bind(render_pptx), slides, template_id, submitted)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+
+_export_pool = None
+_export_pool_lock = threading.Lock()
+
+
+def get_export_pool():
+    """Return the process-wide export pool, creating it on first use"""
+    global _export_pool
+    if _export_pool is None:
+        with _export_pool_lock:
+            if _export_pool is None:
+                _export_pool = ExportPool()
+    return _export_pool
+
+
+def render_pptx(slides, template_id, submitted=None):
+    """Build the deck in memory and return the .pptx bytes"""
+    queue_wait_ms = round((time.perf_counter() - submitted) * 1000, 1) if submitted else 0
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        with tracing.span('export.pptx', template_id=template_id, slides=len(slides), queue_wait_ms=queue_wait_ms):
+            buffer = BytesIO()
+            create_presentation(buffer, slides, template_id, slide_cache=get_slide_cache())
+        outcome = 'ok'
+        return buffer.getvalue()
+    finally:
+        metrics.EXPORT_LATENCY.observe(time.perf_counter() - started, outcome=outcome)
+
+
+_export_cache = None
+
+
+def get_export_cache():
+    """Return the shared on-disk cache of rendered decks, creating it on first use"""
+    global _export_cache
+    if _export_cache is None:
+        _export_cache = DiskLRUCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_MB * 1024 * 1024)
+    return _export_cache
+
+
+def export_cache_key(slides, template_id):
+    """Hash of the exporter version, template and the slide fields create_presentation reads"""
+    deck = [{'layout': slide.get('layout'), 'content': slide.get('content', {})} for slide in slides]
+    material = json.dumps([EXPORTER_VERSION, template_id, deck], sort_keys=True, separators=(',', ':'),
+                          ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def export_bytes(slides, template_id):
+    """PPTX bytes for the deck, from the export cache or rendered on the export pool"""
+    cache = get_export_cache()
+    key = export_cache_key(slides, template_id)
+    with tracing.span('export.cache') as span:
+        content = cache.get(key)
+        span.set(hit=content is not None)
+    if content is not None:
+        return content
+
+    content = get_export_pool().render(slides, template_id)
+    cache.put(key, content)
+    return content
+
+
+def export_filename(topic):
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', topic or 'presentation').strip('_')[:100] + '.pptx'
+
+
+def read_export_request():
+    data = request.get_json(silent=True) or {}
+    slides = data.get('slides')
+    if not isinstance(slides, list) or not slides:
+        raise ValueError('No slides to export')
+    return slides, data.get('template'), data.get('topic') or 'presentation'
+
+
+def export_pptx():
+    """Render the posted deck and send it back as a .pptx download"""
+    if DESKTOP_EXPORT:
+        return export_pptx_local()
 
     try:
+        slides, template_id, topic = read_export_request()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        content = export_bytes(slides, template_id)
+    except ExportQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Export failed: {str(e)}'}), 500
+
+    return send_file(BytesIO(content), mimetype=PPTX_MIMETYPE, as_attachment=True,
+                     download_name=export_filename(topic))
+
+
+# Tk is not thread-safe; only one save dialog may be open at a time
+_dialog_lock = threading.Lock()
+
+
+def ask_save_path(topic):
+    import tkinter as tk
+    from tkinter import filedialog
+
+    with _dialog_lock:
         root = tk.Tk()
         root.withdraw()  # Hide the main window
-        
+
         # Bring the dialog to the front on Windows
         root.attributes('-topmost', True)
-        
-        filename = filedialog.asksaveasfilename(
-            defaultextension=".pptx",
-            filetypes=[("PowerPoint files", "*.pptx")],
-            initialfile=f"{topic.replace(' ', '_')}.pptx",
-            title="Save Presentation As"
-        )
-        
-        # Destroy the root to clean up Tkinter resources
-        root.destroy()
 
+        try:
+            return filedialog.asksaveasfilename(
+                defaultextension=".pptx",
+                filetypes=[("PowerPoint files", "*.pptx")],
+                initialfile=export_filename(topic),
+                title="Save Presentation As"
+            )
+        finally:
+            # Destroy the root to clean up Tkinter resources
+            root.destroy()
+
+
+def export_pptx_local():
+    """Desktop mode: ask for a path with a native dialog and save the deck there"""
+    if not DESKTOP_EXPORT:
+        return jsonify({'error': 'Saving to a local path is only available in the desktop app'}), 404
+
+    try:
+        slides, template_id, topic = read_export_request()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        filename = ask_save_path(topic)
         if not filename:
             return jsonify({'error': 'Export cancelled by user'}), 400
 
-        # Generate the PPTX file
-        create_presentation(filename, slides, template_id)
+        content = export_bytes(slides, template_id)
+        with open(filename, 'wb') as f:
+            f.write(content)
 
         return jsonify({
             'message': f'Presentation saved to {filename}'
         })
-        
+
+    except ExportQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return jsonify({'error': f'Export failed: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Export failed: {str(e)}'}), 500
@@ -0,0 +1,152 @@
+import os
+import re
+import math
+import heapq
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, Counter
+from operator import itemgetter
+
+from text_extraction_utils import chunk_text
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', 3))
+INDEX_CACHE_SIZE = int(os.environ.get('RETRIEVAL_INDEX_CACHE_SIZE', 32))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours yourself yourselves slide
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of text chunks, using an inverted index"""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = list(chunks)
+        self.k1 = k1
+        self.b = b
+
+        # term -> [(chunk index, term frequency), ...]
+        postings = {}
+        doc_lengths = []
+        for index, chunk in enumerate(self.chunks):
+            counts = Counter(tokenize(chunk))
+            doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((index, tf))
+
+        total_docs = len(self.chunks)
+        avg_length = (sum(doc_lengths) / total_docs) if total_docs else 0.0
+
+        # A term's BM25 weight in a chunk does not depend on the query, so each
+        # posting stores its final weight and search only has to add them up
+        norms = [k1 * (1 - b + b * (length / avg_length)) if avg_length else k1 for length in doc_lengths]
+        k1_plus_1 = k1 + 1
+        self._postings = {}
+        for term, plist in postings.items():
+            idf = math.log(1 + (total_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            self._postings[term] = [(index, idf * tf * k1_plus_1 / (tf + norms[index])) for index, tf in plist]
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def search(self, query, k=RETRIEVAL_TOP_K):
+        """Return up to k (score, chunk index) pairs, best first"""
+        scores = {}
+        for term in set(tokenize(query)):
+            for index, weight in self._postings.get(term, ()):
+                scores[index] = scores.get(index, 0.0) + weight
+
+        if not scores:
+            return []
+
+        # Partial selection: O(n log k) rather than sorting every scored chunk
+        best = heapq.nlargest(k, scores.items(), key=itemgetter(1))
+        return [(score, index) for index, score in best]
+
+    def top_chunks(self, query, k=RETRIEVAL_TOP_K):
+        """Return the text of the k best-matching chunks, best first"""
+        return [self.chunks[index] for _, index in self.search(query, k)]
+
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+_build_locks = {}
+
+
+def document_key(full_text):
+    """Index key for text that has no stored document id; hash it once per request"""
+    return hashlib.sha256(full_text.encode('utf-8')).hexdigest()
+
+
+def has_document_index(key):
+    with _index_lock:
+        return key in _index_cache
+
+
+def get_document_index(key, full_text=None, chunks=None):
+    """Return the BM25 index for a document, building it from chunks (or full_text) on first use
+
+    Indexes are kept in a small LRU keyed by document id, so the index built
+    when a document is stored is reused by every slide generated from it.
+    Only one thread builds a given key; the others wait and reuse its index.
+    Returns None when the key is unknown and there is nothing to build from.
+    """
+    if not key:
+        return None
+
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+
+    with build_lock:
+        with _index_lock:
+            index = _index_cache.get(key)
+            if index is not None:
+                _index_cache.move_to_end(key)
+                return index
+
+        try:
+            if chunks is None:
+                if not full_text:
+                    return None
+                chunks = chunk_text(full_text)
+            index = BM25Index(chunks or [full_text or ''])
+            logger.debug(f"Built retrieval index for {key[:12]} over {len(index)} chunks")
+
+            with _index_lock:
+                _index_cache[key] = index
+                while len(_index_cache) > INDEX_CACHE_SIZE:
+                    _index_cache.popitem(last=False)
+        finally:
+            with _index_lock:
+                _build_locks.pop(key, None)
+    return index
+
+
+def build_slide_query(*parts):
+    """Join slide plan fields (strings or lists of strings) into one query string"""
+    terms = []
+    for part in parts:
+        if isinstance(part, (list, tuple)):
+            terms.extend(str(item) for item in part if item)
+        elif part:
+            terms.append(str(part))
+    return ' '.join(terms)
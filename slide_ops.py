@@ -0,0 +1,221 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import case
+
+from models import db, Presentation, Slide
+
+logger = logging.getLogger(__name__)
+
+SLIDE_OPS = ('update', 'insert', 'delete', 'reorder')
+
+
+class PresentationNotFound(Exception):
+    """Raised when the presentation does not exist or belongs to another user"""
+
+
+class VersionConflict(Exception):
+    """Raised when the client's version is stale; carries the current version"""
+
+    def __init__(self, current_version):
+        super().__init__(f'Presentation was changed elsewhere (now at version {current_version})')
+        self.current_version = current_version
+
+
+def apply_slide_ops(user_id, presentation_id, version, ops, topic=None, template_id=None):
+    """Apply slide-level operations to a presentation in one transaction.
+
+    ops is a list of dicts, applied in order:
+      {'op': 'update', 'slide_id': id, 'layout'?: str, 'content'?: dict}
+      {'op': 'insert', 'position'?: int, 'layout': str, 'content'?: dict, 'ref'?: str}
+      {'op': 'delete', 'slide_id': id}
+      {'op': 'reorder', 'order': [id, ...]}
+    slide_id and order entries may name a slide inserted earlier in the same
+    patch by its 'ref'. Only rows whose layout, content or position actually
+    change are written. version must match the stored one (optimistic lock).
+
+    Raises PresentationNotFound, VersionConflict, or ValueError for malformed ops.
+    """
+    if not isinstance(ops, list):
+        raise ValueError('ops must be a list')
+
+    try:
+        # Bump the version first: the conditional UPDATE is the lock, and it
+        # takes the write lock so concurrent patches serialise here
+        changes = {'version': Presentation.version + 1, 'updated_at': datetime.now()}
+        if topic:
+            changes['topic'] = topic
+        if template_id:
+            changes['template_id'] = template_id
+        bumped = Presentation.query.filter_by(id=presentation_id, user_id=user_id, version=version)\
+            .update(changes, synchronize_session=False)
+        if not bumped:
+            current = db.session.query(Presentation.version).filter_by(id=presentation_id, user_id=user_id).scalar()
+            if current is None:
+                raise PresentationNotFound(f'Presentation {presentation_id} not found')
+            raise VersionConflict(current)
+
+        rows = db.session.query(Slide.id, Slide.slide_order)\
+            .filter_by(presentation_id=presentation_id)\
+            .order_by(Slide.slide_order, Slide.id).all()
+        original_positions = {row.id: row.slide_order for row in rows}
+        order = [row.id for row in rows]   # existing slide ids and new Slide objects
+        inserted = {}                      # ref -> new Slide
+        deleted = []
+        loaded = {}
+
+        def resolve(key):
+            if isinstance(key, str) and key in inserted:
+                return inserted[key]
+            if isinstance(key, int) and key in original_positions and key not in deleted:
+                return key
+            raise ValueError(f'Unknown slide: {key}')
+
+        def load(slide_id):
+            if slide_id not in loaded:
+                loaded[slide_id] = db.session.get(Slide, slide_id)
+            return loaded[slide_id]
+
+        updated = 0
+        for op in ops:
+            kind = op.get('op') if isinstance(op, dict) else None
+            if kind not in SLIDE_OPS:
+                raise ValueError(f'Unsupported slide operation: {kind}')
+
+            if kind == 'update':
+                target = resolve(op.get('slide_id'))
+                slide = target if isinstance(target, Slide) else load(target)
+                if op.get('layout') and op['layout'] != slide.layout:
+                    slide.layout = op['layout']
+                    updated += 1
+                if 'content' in op:
+                    content = op['content'] or {}
+                    if content != slide.content:
+                        slide.content = content
+                        updated += 1
+
+            elif kind == 'insert':
+                if not op.get('layout'):
+                    raise ValueError('Inserted slides need a layout')
+                ref = op.get('ref')
+                if ref is not None and (not isinstance(ref, str) or ref in inserted):
+                    raise ValueError(f'Invalid or duplicate ref: {ref}')
+                slide = Slide(presentation_id=presentation_id, layout=op['layout'], content=op.get('content') or {})
+                position = op.get('position', len(order))
+                if not isinstance(position, int) or not 0 <= position <= len(order):
+                    raise ValueError(f'Invalid insert position: {position}')
+                order.insert(position, slide)
+                if ref is not None:
+                    inserted[ref] = slide
+
+            elif kind == 'delete':
+                target = resolve(op.get('slide_id'))
+                order.remove(target)
+                if isinstance(target, Slide):
+                    inserted = {ref: s for ref, s in inserted.items() if s is not target}
+                else:
+                    deleted.append(target)
+
+            elif kind == 'reorder':
+                new_order = [resolve(key) for key in op.get('order') or []]
+                if len(new_order) != len(order) or set(map(id, new_order)) != set(map(id, order)):
+                    raise ValueError('reorder must list every slide exactly once')
+                order = new_order
+
+        if deleted:
+            Slide.query.filter(Slide.presentation_id == presentation_id, Slide.id.in_(deleted))\
+                .delete(synchronize_session=False)
+
+        # Rewrite slide_order only where it moved, in a single UPDATE
+        moved = {}
+        new_slides = []
+        for position, entry in enumerate(order):
+            if isinstance(entry, Slide):
+                entry.slide_order = position
+                new_slides.append(entry)
+            elif original_positions[entry] != position:
+                if entry in loaded:
+                    loaded[entry].slide_order = position
+                else:
+                    moved[entry] = position
+        if moved:
+            Slide.query.filter(Slide.id.in_(list(moved)))\
+                .update({'slide_order': case(moved, value=Slide.id)}, synchronize_session=False)
+
+        db.session.add_all(new_slides)
+        Presentation.query.filter_by(id=presentation_id).update({'slide_count': len(order)}, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logger.info(
+        f"🩹 Patched presentation {presentation_id}: {updated} field updates, {len(new_slides)} inserted, "
+        f"{len(deleted)} deleted, {len(moved)} moved"
+    )
+
+    return {
+        'version': version + 1,
+        'slide_count': len(order),
+        'slide_ids': [entry.id if isinstance(entry, Slide) else entry for entry in order],
+        'inserted': {ref: slide.id for ref, slide in inserted.items()}
+    }
+
+
+def slide_list_ops(existing_ids, slides):
+    """Ops that turn the stored slides (existing_ids, in order) into the full list slides.
+
+    Slides carrying the id of a stored slide become updates, which only write
+    when something changed; the rest are inserted. Stored slides missing from
+    the list are deleted, and a single reorder follows if positions moved.
+    """
+    if not isinstance(slides, list):
+        raise ValueError('slides must be a list')
+
+    existing = set(existing_ids)
+    seen = set()
+    ops = []
+    order = []
+    for index, slide in enumerate(slides):
+        if not isinstance(slide, dict):
+            raise ValueError('Each slide must be an object')
+        slide_id = slide.get('id')
+        # Copies of a stored slide keep its id; only the first one owns it
+        if slide_id in existing and slide_id not in seen:
+            seen.add(slide_id)
+            op = {'op': 'update', 'slide_id': slide_id, 'content': slide.get('content') or {}}
+            if slide.get('layout'):
+                op['layout'] = slide['layout']
+            ops.append(op)
+            order.append(slide_id)
+        else:
+            ref = f'new-{index}'
+            ops.append({'op': 'insert', 'layout': slide.get('layout'), 'content': slide.get('content') or {}, 'ref': ref})
+            order.append(ref)
+
+    ops.extend({'op': 'delete', 'slide_id': slide_id} for slide_id in existing_ids if slide_id not in seen)
+
+    # Inserts land at the end; one reorder fixes positions if anything moved
+    expected = [slide_id for slide_id in existing_ids if slide_id in seen]
+    expected += [key for key in order if isinstance(key, str)]
+    if order != expected:
+        ops.append({'op': 'reorder', 'order': order})
+    return ops
+
+
+def replace_slides(user_id, presentation_id, slides, version=None, topic=None, template_id=None):
+    """Save a full slide list through apply_slide_ops, touching only what changed.
+
+    Without a version the stored one is used, so the save still fails with
+    VersionConflict rather than overwriting a change that lands meanwhile.
+    """
+    if version is None:
+        version = db.session.query(Presentation.version).filter_by(id=presentation_id, user_id=user_id).scalar()
+        if version is None:
+            raise PresentationNotFound(f'Presentation {presentation_id} not found')
+
+    existing_ids = [slide_id for slide_id, in db.session.query(Slide.id)
+                    .filter_by(presentation_id=presentation_id)
+                    .order_by(Slide.slide_order, Slide.id).all()]
+    return apply_slide_ops(user_id, presentation_id, version, slide_list_ops(existing_ids, slides),
+                           topic=topic, template_id=template_id)
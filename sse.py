@@ -0,0 +1,77 @@
+import json
+import queue
+import logging
+import threading
+
+from flask import Response
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15
+
+_DONE = object()
+
+
+def format_sse(event, data):
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_worker_events(work):
+    """Run work(emit, cancelled) on a background thread and yield everything it emits as SSE frames
+
+    The worker calls emit(event, data) from any thread. Exceptions become an
+    'error' event, and a comment line is sent while the worker is quiet so
+    proxies do not drop the connection. The worker runs in the caller's trace.
+    cancelled is a threading.Event set once the client goes away; long workers
+    should check it between steps and stop early.
+    """
+    return _stream(tracing.bind(work))
+
+
+def _stream(work):
+    events = queue.Queue()
+    cancelled = threading.Event()
+
+    def emit(event, data):
+        if not cancelled.is_set():
+            events.put((event, data))
+
+    def run():
+        try:
+            work(emit, cancelled)
+        except Exception as e:
+            logger.error(f"❌ Streaming worker failed: {e}")
+            events.put(('error', {'error': str(e)}))
+        finally:
+            events.put(_DONE)
+
+    threading.Thread(target=run, daemon=True).start()
+
+    item = None
+    try:
+        while True:
+            try:
+                item = events.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+
+            if item is _DONE:
+                break
+            yield format_sse(*item)
+    finally:
+        # The server closes this generator when the client disconnects
+        if item is not _DONE:
+            logger.info("🛑 Stream client disconnected, cancelling worker")
+        cancelled.set()
+
+
+def sse_response(frames):
+    """Wrap an iterator of SSE frames in an unbuffered streaming response"""
+    return Response(frames, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -11,6 +11,8 @@ document.addEventListener('DOMContentLoaded', function () {
         currentSlideIndex: 0,
         editMode: false,
         presentationId: null,
+        presentationVersion: null,
+        savedSlides: null,
         isModified: false,
         isGenerating: false
     };
@@ -226,9 +228,11 @@ document.addEventListener('DOMContentLoaded', function () {
         appState.topic = presentation.topic || 'Untitled';
         appState.templateId = presentation.template_id || 'corporate';
         appState.slides = presentation.slides.map(slide => ({
+            id: slide.id,
             layout: slide.layout,
             content: slide.content
         }));
+        rememberSavedSlides(presentation.version);
 
         // Update form fields
         document.getElementById('topic').value = appState.topic;
@@ -346,11 +350,12 @@ document.addEventListener('DOMContentLoaded', function () {
 
     // Helper function: Extract topic from content (no changes needed)
     function extractTopicFromContent(content) {
-        if (!content || !content.full_text) {
+        // Uploaded documents only come back with a preview of their text
+        const text = content && (content.full_text || content.preview);
+        if (!text) {
             return null;
         }
 
-        const text = content.full_text;
         const firstLine = text.split('\n')[0].trim();
 
         if (firstLine.length < 100 && !firstLine.endsWith('.')) {
@@ -470,7 +475,7 @@ document.addEventListener('DOMContentLoaded', function () {
 
                     contentData = processedContent;
                     topic = document.getElementById('topic').value.trim() || extractTopicFromContent(contentData) || 'Document Presentation';
-                    slideCount = estimateSlideCount(contentData.full_text);
+                    slideCount = estimateSlideCount(contentData.full_text, contentData.analysis?.words);
                     break;
             }
 
@@ -590,27 +595,26 @@ document.addEventListener('DOMContentLoaded', function () {
 
     // 4. NEW: Generate outline for topic
     async function generateOutlineForTopic(topic, slideCount) {
-        const response = await fetch('/api/generate-outline', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                topic: topic,
-                slideCount: slideCount,
-                inputMethod: 'topic'
-            })
-        });
-
-        if (!response.ok) {
-            const errorData = await response.json().catch(() => ({}));
-            throw new Error(errorData.error || `Server error: ${response.status}`);
-        }
+        outlineStreamChars = 0;
+        const result = await postEventStream('/api/generate-outline/stream', {
+            topic: topic,
+            slideCount: slideCount,
+            inputMethod: 'topic'
+        }, { token: showOutlineStreamProgress }, 'outline');
 
-        const result = await response.json();
         return result.outline;
     }
 
+    // Show how much of the outline has streamed in so the modal never looks frozen
+    let outlineStreamChars = 0;
+    function showOutlineStreamProgress(data) {
+        outlineStreamChars += data.text.length;
+        const message = document.querySelector('.outline-loading p');
+        if (message) {
+            message.textContent = `Writing your outline... (${outlineStreamChars.toLocaleString()} characters so far)`;
+        }
+    }
+
     // 7. NEW: Generate outline from any input type
     async function generateOutlineFromInput(topic, slideCount, inputMethod, contentData = null) {
         const requestData = {
@@ -622,29 +626,28 @@ document.addEventListener('DOMContentLoaded', function () {
         // Add content data for text/document methods
         if (contentData) {
             if (inputMethod === 'text') {
-                requestData.textContent = contentData.full_text;
+                if (contentData.document_id) {
+                    requestData.documentId = contentData.document_id;
+                } else {
+                    requestData.textContent = contentData.full_text;
+                }
                 requestData.textStats = contentData.analysis;
             } else if (inputMethod === 'document') {
-                requestData.documentContent = contentData.full_text;
+                if (contentData.document_id) {
+                    requestData.documentId = contentData.document_id;
+                } else {
+                    requestData.documentContent = contentData.full_text;
+                }
                 requestData.documentStats = contentData.analysis;
                 requestData.processingMode = window.inputMethodsHandler.getProcessingMode();
             }
         }
 
-        const response = await fetch('/api/generate-outline', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(requestData)
-        });
-
-        if (!response.ok) {
-            const errorData = await response.json().catch(() => ({}));
-            throw new Error(errorData.error || `Server error: ${response.status}`);
-        }
+        outlineStreamChars = 0;
+        const result = await postEventStream('/api/generate-outline/stream', requestData, {
+            token: showOutlineStreamProgress
+        }, 'outline');
 
-        const result = await response.json();
         return result.outline;
     }
 
@@ -801,10 +804,10 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 
     // 10. NEW: Estimate slide count based on content
-    function estimateSlideCount(text) {
-        if (!text) return 5;
+    function estimateSlideCount(text, knownWordCount = null) {
+        if (!text && !knownWordCount) return 5;
 
-        const wordCount = text.split(' ').length;
+        const wordCount = knownWordCount || text.split(' ').length;
 
         if (wordCount < 200) return 3;
         if (wordCount < 500) return 4;
@@ -905,6 +908,7 @@ document.addEventListener('DOMContentLoaded', function () {
 
         const inputMethod = window.currentInputMethod || 'topic';
         const contentData = window.currentContentData;
+        const outline = window.currentOutline;
 
         const modalContent = document.querySelector('.outline-modal .outline-modal-body');
 
@@ -923,20 +927,43 @@ document.addEventListener('DOMContentLoaded', function () {
         </div>
     `;
 
+        // Slides are shown as soon as each one arrives; the first closes the modal
+        const streamed = [];
+        const showStreamedSlide = (slideNumber, slide) => {
+            if (!streamed.length) {
+                window.appState.slides = [];
+                window.appState.templateId = window.selectedTemplateId;
+                window.appState.currentSlideIndex = 0;
+                window.appState.editMode = false;
+                closeOutlineModal();
+            }
+            const position = streamed.filter(number => number < slideNumber).length;
+            streamed.splice(position, 0, slideNumber);
+            window.appState.slides.splice(position, 0, slide);
+            if (position <= window.appState.currentSlideIndex && streamed.length > 1) {
+                window.appState.currentSlideIndex += 1;
+            }
+            renderSlidesList();
+            renderCurrentSlide();
+        };
+
+        window.appState.isGenerating = true;
         try {
             // Generate slides from outline with content context
-            const result = await generateSlidesFromApprovedOutline(window.currentOutline, contentData);
+            const result = await generateSlidesFromApprovedOutline(outline, contentData, showStreamedSlide);
 
-            // Update application state
-            window.appState.slides = result.slides;
+            // Update application state; streamed slides are already in place, and may have been edited
+            if (!streamed.length) {
+                window.appState.slides = result.slides;
+                window.appState.editMode = false;
+            }
             window.appState.templateId = window.selectedTemplateId;
-            window.appState.topic = window.currentOutline.presentation_meta?.title ||
+            window.appState.topic = outline.presentation_meta?.title ||
                 document.getElementById('topic').value.trim();
-            window.appState.currentSlideIndex = 0;
-            window.appState.editMode = false;
+            window.appState.currentSlideIndex = Math.min(window.appState.currentSlideIndex, window.appState.slides.length - 1);
             window.appState.isModified = true;
             window.appState.generationMethod = `${inputMethod}-with-outline`;
-            window.appState.outline = window.currentOutline;
+            window.appState.outline = outline;
             window.appState.inputMethod = inputMethod;
 
             // Add content data to state for reference
@@ -973,11 +1000,20 @@ document.addEventListener('DOMContentLoaded', function () {
 
         } catch (error) {
             console.error('Error generating slides from outline:', error);
-            showOutlineError(modalContent, error.message || 'Failed to generate slides from outline', inputMethod, contentData);
+            if (streamed.length) {
+                showNotification(
+                    `${error.message || 'Slide generation stopped'} (${streamed.length} slides were generated)`,
+                    'error'
+                );
+            } else {
+                showOutlineError(modalContent, error.message || 'Failed to generate slides from outline', inputMethod, contentData);
+            }
+        } finally {
+            window.appState.isGenerating = false;
         }
     }
 
-    async function generateSlidesFromApprovedOutline(outline, contentData = null) {
+    async function generateSlidesFromApprovedOutline(outline, contentData = null, onSlide = null) {
         const requestData = {
             outline: outline,
             template: window.selectedTemplateId
@@ -989,20 +1025,31 @@ document.addEventListener('DOMContentLoaded', function () {
             requestData.processingMode = window.inputMethodsHandler?.getProcessingMode() || 'preserve';
         }
 
-        const response = await fetch('/api/generate-from-outline', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(requestData)
-        });
-
-        if (!response.ok) {
-            const errorData = await response.json().catch(() => ({}));
-            throw new Error(errorData.error || `Server error: ${response.status}`);
-        }
+        // Stream per-slide progress into the modal's progress bar
+        let totalSlides = outline.slide_structure?.length || 1;
+        let finishedSlides = 0;
+        const showProgress = (text) => {
+            const fill = document.getElementById('generation-progress-fill');
+            const label = document.getElementById('generation-progress-text');
+            if (fill) fill.style.width = `${Math.round(100 * finishedSlides / totalSlides)}%`;
+            if (label) label.textContent = text;
+        };
+        const slideFinished = (data, status) => {
+            finishedSlides += 1;
+            showProgress(`Slide ${data.slide_number} ${status} (${finishedSlides} of ${totalSlides})`);
+        };
 
-        return await response.json();
+        return await postEventStream('/api/generate-from-outline/stream', requestData, {
+            outline: (data) => { totalSlides = data.slide_count || totalSlides; },
+            slide_started: (data) => {
+                if (finishedSlides === 0) showProgress(`Writing slide ${data.slide_number}...`);
+            },
+            slide_done: (data) => {
+                slideFinished(data, 'ready');
+                if (onSlide) onSlide(data.slide_number, data.slide);
+            },
+            slide_failed: (data) => slideFinished(data, 'failed')
+        }, 'complete');
     }
     function addOutlinePreferenceIndicators() {
         const methodTabs = document.querySelectorAll('.method-tab');
@@ -1063,7 +1110,7 @@ document.addEventListener('DOMContentLoaded', function () {
                 topic = document.getElementById('topic').value.trim() ||
                     extractTopicFromContent(contentData) ||
                     `${getInputMethodDisplayName(inputMethod)} Presentation`;
-                slideCount = estimateSlideCount(contentData?.full_text || '');
+                slideCount = estimateSlideCount(contentData?.full_text || '', contentData?.analysis?.words);
                 break;
         }
 
@@ -1144,12 +1191,12 @@ document.addEventListener('DOMContentLoaded', function () {
 
 
     function extractTopicFromContent(content) {
-        if (!content || !content.full_text) {
+        const text = content && (content.full_text || content.preview);
+        if (!text) {
             return null;
         }
 
         // Simple topic extraction from first sentence or title-like content
-        const text = content.full_text;
         const firstLine = text.split('\n')[0].trim();
 
         // If first line looks like a title (short and doesn't end with period)
@@ -1470,6 +1517,81 @@ document.addEventListener('DOMContentLoaded', function () {
                 : 'Save as a new presentation';
         }
     }
+    // Snapshot of what the server holds, so saves can send only the changed slides
+    function rememberSavedSlides(version) {
+        appState.presentationVersion = version ?? null;
+        appState.savedSlides = new Map(appState.slides
+            .filter(slide => slide.id)
+            .map(slide => [slide.id, JSON.stringify([slide.layout, slide.content])]));
+    }
+
+    function buildSlideOps() {
+        const saved = appState.savedSlides || new Map();
+        const seen = new Set();
+        const ops = [];
+        const order = appState.slides.map((slide, index) => {
+            // Copies of a saved slide keep its id; only the first one owns it
+            if (slide.id && saved.has(slide.id) && !seen.has(slide.id)) {
+                seen.add(slide.id);
+                if (saved.get(slide.id) !== JSON.stringify([slide.layout, slide.content])) {
+                    ops.push({ op: 'update', slide_id: slide.id, layout: slide.layout, content: slide.content });
+                }
+                return slide.id;
+            }
+            delete slide.id;
+            const ref = `new-${index}`;
+            ops.push({ op: 'insert', layout: slide.layout, content: slide.content || {}, ref });
+            return ref;
+        });
+
+        const survivors = [];
+        for (const id of saved.keys()) {
+            if (seen.has(id)) {
+                survivors.push(id);
+            } else {
+                ops.push({ op: 'delete', slide_id: id });
+            }
+        }
+
+        // Inserts land at the end; one reorder fixes positions if anything moved
+        const expected = survivors.concat(order.filter(key => typeof key === 'string'));
+        if (expected.some((key, i) => key !== order[i])) {
+            ops.push({ op: 'reorder', order });
+        }
+        return { ops, order };
+    }
+
+    async function patchSlides() {
+        const { ops, order } = buildSlideOps();
+        const response = await fetch(`/api/presentations/${appState.presentationId}/slides`, {
+            method: 'PATCH',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                version: appState.presentationVersion,
+                topic: appState.topic,
+                template: appState.templateId,
+                ops
+            })
+        });
+
+        const data = await response.json().catch(() => ({}));
+        if (response.status === 409) {
+            throw new Error('This presentation was changed elsewhere. Reload the page to get the latest version.');
+        }
+        if (!response.ok) {
+            throw new Error(data.error || `Server error: ${response.status}`);
+        }
+
+        order.forEach((key, index) => {
+            if (typeof key === 'string') {
+                appState.slides[index].id = data.inserted[key];
+            }
+        });
+        rememberSavedSlides(data.version);
+    }
+
     async function handleSave() {
         if (appState.editMode) {
             saveCurrentEdit();
@@ -1500,6 +1622,13 @@ document.addEventListener('DOMContentLoaded', function () {
             : '/api/save';
 
         try {
+            if (appState.presentationId && appState.presentationVersion !== null) {
+                await patchSlides();
+                appState.isModified = false;
+                showNotification('Presentation updated successfully!', 'success');
+                return;
+            }
+
             const response = await fetch(url, {
                 method: 'POST',
                 headers: {
@@ -1515,6 +1644,11 @@ document.addEventListener('DOMContentLoaded', function () {
 
             const data = await response.json();
 
+            data.presentation.slides.forEach((slide, index) => {
+                appState.slides[index].id = slide.id;
+            });
+            rememberSavedSlides(data.presentation.version);
+
             if (!appState.presentationId) {
                 appState.presentationId = data.presentation.id;
                 window.history.pushState(
@@ -1551,7 +1685,7 @@ document.addEventListener('DOMContentLoaded', function () {
         exportBtn.disabled = true;
 
         try {
-            const response = await fetch('/api/export-local', {
+            const response = await fetch('/api/export', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -1567,6 +1701,13 @@ document.addEventListener('DOMContentLoaded', function () {
                 throw new Error(`Server responded with status: ${response.status}`);
             }
 
+            // The desktop app saves through a native dialog and answers with JSON
+            if ((response.headers.get('Content-Type') || '').includes('application/json')) {
+                const result = await response.json();
+                showNotification(result.message || 'Presentation exported successfully!', 'success');
+                return;
+            }
+
             const blob = await response.blob();
             const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
@@ -426,24 +426,21 @@ async function handleGenerateOutline() {
             
         } else if (method === 'upload') {
             requestData.topic = window.generateState.inputData.topic;
-            requestData.documentContent = window.generateState.processedContent.full_text;
+            requestData.documentId = window.generateState.processedContent.document_id;
             requestData.documentStats = window.generateState.processedContent.analysis;
             requestData.processingMode = window.generateState.inputData.processingMode;
         }
         
-        const response = await fetch('/api/generate-outline', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(requestData)
-        });
+        // Stream the outline so the user sees the model working instead of a frozen spinner
+        let receivedChars = 0;
+        const loadingMessage = document.getElementById('outline-loading-message');
         
-        const result = await response.json();
-        
-        if (!response.ok) {
-            throw new Error(result.error || 'Failed to generate outline');
-        }
+        const result = await postEventStream('/api/generate-outline/stream', requestData, {
+            token: (data) => {
+                receivedChars += data.text.length;
+                loadingMessage.textContent = `Writing your outline... (${receivedChars.toLocaleString()} characters so far)`;
+            }
+        }, 'outline');
         
         console.log('✅ Outline generated successfully:', result);
         
@@ -691,23 +688,31 @@ async function handleCreateSlides() {
             requestData.processingMode = window.generateState.inputData.processingMode || 'preserve';
         }
         
-        updateGenerationProgress(20, 'Generating slides from outline...');
-        
-        const response = await fetch('/api/generate-from-outline', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
+        updateGenerationProgress(10, 'Generating slides from outline...');
+        
+        // Slides are generated in parallel on the server; report each one as it lands
+        let totalSlides = window.generateState.outline.slide_structure?.length || 1;
+        let finishedSlides = 0;
+        const slideFinished = (data, label) => {
+            finishedSlides += 1;
+            updateGenerationProgress(
+                10 + Math.round(85 * finishedSlides / totalSlides),
+                `Slide ${data.slide_number} ${label} (${finishedSlides} of ${totalSlides})`
+            );
+            showGeneratedSlide(data);
+        };
+        document.getElementById('generation-slide-list').innerHTML = '';
+        
+        const result = await postEventStream('/api/generate-from-outline/stream', requestData, {
+            outline: (data) => { totalSlides = data.slide_count || totalSlides; },
+            slide_started: (data) => {
+                if (finishedSlides === 0) {
+                    updateGenerationProgress(10, `Writing slide ${data.slide_number}...`);
+                }
             },
-            body: JSON.stringify(requestData)
-        });
-        
-        updateGenerationProgress(70, 'Processing slide content...');
-        
-        const result = await response.json();
-        
-        if (!response.ok) {
-            throw new Error(result.error || 'Failed to generate slides');
-        }
+            slide_done: (data) => slideFinished(data, 'ready'),
+            slide_failed: (data) => slideFinished(data, 'failed')
+        }, 'complete');
         
         updateGenerationProgress(100, 'Finalizing presentation...');
         
@@ -729,6 +734,24 @@ async function handleCreateSlides() {
     }
 }
 
+// List a finished (or failed) slide under the progress bar, in slide order
+function showGeneratedSlide(data) {
+    const list = document.getElementById('generation-slide-list');
+    const item = document.createElement('li');
+    item.dataset.slideNumber = data.slide_number;
+    item.className = data.slide ? 'ready' : 'failed';
+
+    const icon = document.createElement('i');
+    icon.className = data.slide ? 'fas fa-check-circle' : 'fas fa-exclamation-circle';
+    const label = document.createElement('span');
+    const title = data.slide?.content?.title;
+    label.textContent = `Slide ${data.slide_number}: ${title || (data.slide ? getLayoutDisplayName(data.slide.layout) : 'could not be generated')}`;
+    item.append(icon, label);
+
+    const next = Array.from(list.children).find(li => Number(li.dataset.slideNumber) > data.slide_number);
+    list.insertBefore(item, next || null);
+}
+
 function updateGenerationProgress(percentage, message) {
     const progressFill = document.getElementById('generation-progress-fill');
     const progressText = document.getElementById('generation-progress-text');
@@ -247,7 +247,7 @@ class InputMethodsHandler {
             console.log('Document processed successfully:', result);
 
             this.processedContent = result.content;
-            this.extractedText = result.extracted_text || result.content.full_text || '';
+            this.extractedText = result.content.preview || '';
             
             // Show processing mode selection dropdown
             this.showProcessingModeSelection();
@@ -0,0 +1,85 @@
+// Client for the POST-based Server-Sent Events endpoints (/api/.../stream).
+// EventSource only supports GET, so the stream is read through fetch instead.
+
+function parseEventFrame(frame) {
+    let event = 'message';
+    const dataLines = [];
+
+    frame.split('\n').forEach(line => {
+        if (line.startsWith(':')) return; // keep-alive comment
+        if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            dataLines.push(line.slice(5).trim());
+        }
+    });
+
+    if (!dataLines.length) return null;
+
+    try {
+        return { event, data: JSON.parse(dataLines.join('\n')) };
+    } catch (e) {
+        console.warn('Could not parse stream event:', frame);
+        return null;
+    }
+}
+
+// POST `body` to `url`, dispatch each event to handlers[eventName] and resolve
+// with the data of `finalEvent`. An 'error' event rejects the promise.
+async function postEventStream(url, body, handlers = {}, finalEvent = 'complete') {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+        },
+        body: JSON.stringify(body)
+    });
+
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.error || `Server error: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let finalData = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const parsed = parseEventFrame(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+            if (!parsed) continue;
+
+            if (parsed.event === 'error') {
+                throw new Error(parsed.data.error || 'Generation failed');
+            }
+            if (parsed.event === finalEvent) {
+                finalData = parsed.data;
+            }
+
+            const handler = handlers[parsed.event];
+            if (handler) {
+                try {
+                    handler(parsed.data);
+                } catch (e) {
+                    console.warn(`Stream handler for '${parsed.event}' failed:`, e);
+                }
+            }
+        }
+    }
+
+    if (!finalData) {
+        throw new Error('Connection closed before generation finished');
+    }
+    return finalData;
+}
+
+window.postEventStream = postEventStream;
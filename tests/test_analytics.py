@@ -0,0 +1,149 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+import analytics
+from models import db, Presentation, Slide, User
+
+TEMPLATES = ['modern', 'classic', 'minimal']
+LAYOUTS = ['titleOnly', 'titleAndBullets', 'quote', 'timeline', 'conclusion']
+
+
+def legacy_analytics(user_id):
+    """The per-row loops the analytics page used before it moved to SQL"""
+    presentation_count = Presentation.query.filter_by(user_id=user_id).count()
+
+    thirty_days_ago = datetime.now().replace(tzinfo=None) - timedelta(days=30)
+    recent_presentations = Presentation.query.filter_by(user_id=user_id)\
+        .filter(Presentation.created_at >= thirty_days_ago)\
+        .order_by(Presentation.created_at.desc()).all()
+
+    all_presentations = Presentation.query.filter_by(user_id=user_id).all()
+
+    template_usage = {}
+    for p in all_presentations:
+        template_usage[p.template_id] = template_usage.get(p.template_id, 0) + 1
+
+    avg_slides = sum(p.slide_count for p in all_presentations) / presentation_count if presentation_count else 0
+
+    days_data = [0] * 7
+    for p in all_presentations:
+        if p.created_at:
+            days_data[(p.created_at.weekday() + 1) % 7] += 1
+
+    layout_usage = {}
+    for pres in all_presentations:
+        for slide in pres.slides:
+            layout_usage[slide.layout] = layout_usage.get(slide.layout, 0) + 1
+
+    twelve_months_ago = datetime.now().replace(tzinfo=None) - timedelta(days=365)
+    current_date = datetime.now()
+    months_labels = []
+    monthly_counts = {}
+    for i in range(11, -1, -1):
+        month_label = (current_date - timedelta(days=30 * i)).strftime('%b %Y')
+        months_labels.append(month_label)
+        monthly_counts[month_label] = 0
+    for p in all_presentations:
+        if p.created_at and p.created_at >= twelve_months_ago:
+            month_label = p.created_at.strftime('%b %Y')
+            if month_label in monthly_counts:
+                monthly_counts[month_label] += 1
+
+    edit_frequency = []
+    for p in all_presentations:
+        if p.created_at and p.updated_at:
+            hours_since_creation = (p.updated_at - p.created_at).total_seconds() / 3600
+            if hours_since_creation > 0:
+                edit_frequency.append({'id': p.id, 'topic': p.topic,
+                                       'edits_per_hour': p.slide_count / hours_since_creation})
+    edit_frequency.sort(key=lambda x: x['edits_per_hour'], reverse=True)
+
+    return {
+        'presentation_count': presentation_count,
+        'avg_slides': round(avg_slides, 1),
+        'template_usage': template_usage,
+        'layout_usage': layout_usage,
+        'days_data': days_data,
+        'months_labels': months_labels,
+        'months_data': [monthly_counts[label] for label in months_labels],
+        'recent_presentations': recent_presentations,
+        'top_edited': edit_frequency[:5]
+    }
+
+
+def seed(user_id, count, rng):
+    now = datetime.now()
+    for number in range(count):
+        # Stay clear of the 30- and 365-day cut-offs so both sides agree on edge rows
+        age = timedelta(days=rng.choice([rng.uniform(0, 28), rng.uniform(32, 360), rng.uniform(370, 700)]))
+        created_at = None if number % 17 == 0 else now - age
+        updated_at = None
+        if created_at and number % 5:
+            updated_at = created_at + timedelta(minutes=rng.uniform(1, 5000))
+        slide_count = rng.randint(1, 12)
+        presentation = Presentation(user_id=user_id, topic=f'Deck {user_id}-{number}',
+                                    template_id=rng.choice(TEMPLATES), slide_count=slide_count)
+        db.session.add(presentation)
+        db.session.flush()
+        # Rows from before created_at/updated_at were always set
+        presentation.created_at = created_at
+        presentation.updated_at = updated_at
+        for order in range(rng.randint(0, slide_count)):
+            db.session.add(Slide(presentation_id=presentation.id, slide_order=order,
+                                 layout=rng.choice(LAYOUTS), content_json='{}'))
+    db.session.commit()
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'analytics.db'}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(id=1, username='owner', password_hash='x'),
+                            User(id=2, username='other', password_hash='x'),
+                            User(id=3, username='empty', password_hash='x')])
+        rng = random.Random(7)
+        seed(1, 120, rng)
+        seed(2, 30, rng)
+        yield app
+
+
+@pytest.mark.parametrize('user_id', [1, 2, 3])
+def test_sql_aggregates_match_the_per_row_loops(app, user_id):
+    expected = legacy_analytics(user_id)
+    actual = analytics.compute_user_analytics(user_id)
+
+    for key in ('presentation_count', 'avg_slides', 'template_usage', 'layout_usage', 'days_data',
+                'months_labels', 'months_data'):
+        assert actual[key] == expected[key], key
+
+    assert actual['recent_count'] == len(expected['recent_presentations'])
+    assert [row['id'] for row in actual['recent_presentations']] == \
+        [p.id for p in expected['recent_presentations'][:analytics.RECENT_LIMIT]]
+
+    assert [row['id'] for row in actual['top_edited']] == [row['id'] for row in expected['top_edited']]
+    for got, want in zip(actual['top_edited'], expected['top_edited']):
+        assert got['edits_per_hour'] == pytest.approx(want['edits_per_hour'], rel=1e-6)
+
+
+def test_query_count_does_not_grow_with_presentations(app):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        analytics.compute_user_analytics(2)
+        few = len(statements)
+        statements.clear()
+        analytics.compute_user_analytics(1)
+        many = len(statements)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert few == many
@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from benchmarks.headings import generate_document
+from text_extraction_utils import chunk_text, iter_chunks
+
+TEN_MB = 10 * 1024 * 1024
+
+INPUTS = {
+    'prose': generate_document,
+    'no boundaries': lambda size: 'x' * size,
+    'sentence every 2 chars': lambda size: '. ' * (size // 2),
+    'only newlines around words': lambda size: 'word\n\n\n' * (size // 7),
+}
+
+
+def pieces(text, size):
+    return (text[i:i + size] for i in range(0, len(text), size))
+
+
+def best_time(text, repeat=2):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in iter_chunks(pieces(text, 64 * 1024)):
+            pass
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+@pytest.mark.parametrize('name', INPUTS)
+def test_streamed_chunks_match_whole_text_on_10mb(name):
+    text = INPUTS[name](TEN_MB)
+    whole = chunk_text(text)
+
+    # Piece sizes that do and do not line up with chunk boundaries
+    assert list(iter_chunks(pieces(text, 64 * 1024))) == whole
+    assert list(iter_chunks(pieces(text, 4093))) == whole
+
+
+@pytest.mark.parametrize('name', INPUTS)
+def test_chunking_time_grows_linearly(name):
+    small = INPUTS[name](TEN_MB // 10)
+    large = INPUTS[name](TEN_MB)
+
+    small_time = best_time(small)
+    large_time = best_time(large)
+
+    # Per-byte cost on 10 MB against 1 MB; 1.0 is perfectly linear, quadratic would be ~10
+    scaling = (large_time / len(large)) / (small_time / len(small))
+    assert scaling < 2.5
+    assert large_time < 10
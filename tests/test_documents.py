@@ -0,0 +1,117 @@
+import hashlib
+import io
+
+import pytest
+from flask import Flask
+from werkzeug.datastructures import FileStorage
+
+import text_extraction_utils
+from disk_cache import DiskLRUCache
+from documents import DocumentNotFound, load_document, store_text_document, store_uploaded_document
+from models import db, Document, User
+from text_extraction_utils import chunk_text, process_uploaded_file
+
+TEXT = '\n\n'.join(
+    f"Section {number}. Solar panels turn sunlight into electricity. Costs fell by {number * 7} percent "
+    f"over the decade, and storage is the next problem to solve." for number in range(1, 60)
+)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_extraction_utils, '_extraction_cache',
+                        DiskLRUCache(str(tmp_path / 'extraction'), 16 * 1024 * 1024))
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'documents.db'}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(id=1, username='owner', password_hash='x'),
+                            User(id=2, username='other', password_hash='x')])
+        db.session.commit()
+        yield app
+
+
+def test_pasted_text_round_trips_through_the_store(app):
+    document, analysis = store_text_document(1, TEXT)
+    again, _ = store_text_document(1, TEXT)
+
+    assert again.id == document.id
+    assert Document.query.count() == 1
+
+    db.session.expire_all()
+    loaded = load_document(document.id, 1)
+    assert loaded['text'] == TEXT
+    assert loaded['chunks'] == chunk_text(TEXT)
+    assert loaded['analysis'] == analysis
+    assert loaded['source'] == 'text'
+
+
+def test_uploaded_file_round_trips_through_the_store(app, tmp_path):
+    def upload():
+        return FileStorage(stream=io.BytesIO(TEXT.encode('utf-8')), filename='notes.txt')
+
+    first, error = process_uploaded_file(upload(), str(tmp_path / 'uploads'))
+    assert error is None
+    second, _ = process_uploaded_file(upload(), str(tmp_path / 'uploads'))
+    assert (first['cached'], second['cached']) == (False, True)
+
+    document = store_uploaded_document(1, second)
+    loaded = load_document(document.id, 1)
+    assert loaded['text'] == TEXT
+    assert loaded['chunks'] == chunk_text(TEXT)
+    assert (loaded['filename'], loaded['file_type']) == ('notes.txt', 'text')
+
+
+@pytest.mark.parametrize('user_id', [2, None])
+def test_documents_are_only_loaded_by_their_owner(app, user_id):
+    document, _ = store_text_document(1, TEXT)
+
+    with pytest.raises(DocumentNotFound):
+        load_document(document.id, user_id)
+
+
+@pytest.mark.parametrize('document_id', ['missing', None, 42])
+def test_unknown_handles_are_not_found(app, document_id):
+    with pytest.raises(DocumentNotFound):
+        load_document(document_id, 1)
+
+
+class CountingStream(io.RawIOBase):
+    """An endless upload body that records how much of it was read"""
+
+    def __init__(self):
+        self.read_bytes = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        self.read_bytes += len(buffer)
+        buffer[:] = b'x' * len(buffer)
+        return len(buffer)
+
+
+def test_oversized_uploads_stop_at_the_limit(tmp_path):
+    stream = CountingStream()
+    path = tmp_path / 'upload.txt'
+    limit = 3 * text_extraction_utils.UPLOAD_BLOCK_SIZE
+
+    digest, error = text_extraction_utils.save_upload(FileStorage(stream=stream, filename='big.txt'), str(path), limit)
+
+    assert digest is None and 'limit' in error
+    assert stream.read_bytes <= limit + text_extraction_utils.UPLOAD_BLOCK_SIZE
+    assert not path.exists()
+
+
+def test_saved_uploads_hash_what_was_written(tmp_path):
+    path = tmp_path / 'upload.txt'
+    data = TEXT.encode('utf-8') * 100
+
+    digest, error = text_extraction_utils.save_upload(FileStorage(stream=io.BytesIO(data), filename='notes.txt'),
+                                                      str(path), len(data))
+
+    assert error is None
+    assert path.read_bytes() == data
+    assert digest == hashlib.sha256(data).hexdigest()
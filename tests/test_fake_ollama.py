@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+import metrics
+import ollama_client
+from benchmarks.fake_ollama import FakeConfig, make_server
+from ollama_http import OllamaClient, OllamaError
+
+
+def start(config):
+    server = make_server(port=0, config=config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, OllamaClient(base_url=f'http://127.0.0.1:{server.server_address[1]}')
+
+
+@pytest.fixture
+def client(monkeypatch):
+    server, client = start(FakeConfig(latency=0, jitter=0, token_rate=0, seed=1))
+    monkeypatch.setattr(ollama_client, 'get_client', lambda: client)
+    yield client
+    server.shutdown()
+
+
+def fallbacks():
+    return sum(value for _, _, value in metrics.OUTLINE_FALLBACKS.samples()) + \
+        sum(value for _, _, value in metrics.SLIDE_FALLBACKS.samples())
+
+
+def test_fake_answers_pass_the_real_pipeline_without_fallbacks(client):
+    before = fallbacks()
+
+    outline = ollama_client.generate_presentation_outline_enhanced('Solar power', 6, use_cache=False)
+    slides = ollama_client.generate_slides_from_outline(outline, 'corporate', use_cache=False)
+
+    assert len(outline['slide_structure']) == 6
+    assert [slide['layout'] for slide in slides] == [info['layout'] for info in outline['slide_structure']]
+    assert fallbacks() == before
+
+
+def test_streamed_answers_report_ollama_timings(client):
+    tokens = []
+    result = client.generate('Create an outline with exactly 3 slides and "slide_structure"', on_token=tokens.append)
+
+    assert ''.join(tokens) == result['response']
+    assert result['eval_count'] == len(tokens)
+    assert result['total_duration'] >= result['load_duration'] >= 0
+
+
+def test_error_rate_answers_with_server_errors():
+    server, client = start(FakeConfig(latency=0, error_rate=1.0))
+    try:
+        with pytest.raises(OllamaError) as error:
+            client.generate('Write the quote slide')
+        assert error.value.status_code == 500
+    finally:
+        server.shutdown()
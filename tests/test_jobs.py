@@ -0,0 +1,87 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+import jobs
+from models import db, GenerationJob, User
+
+
+@pytest.fixture
+def manager(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'jobs.db'}"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username='owner', password_hash='x'))
+        db.session.commit()
+
+    release = threading.Event()
+    job_manager = jobs.JobManager()
+    job_manager.app = app
+    job_manager.executor = ThreadPoolExecutor(max_workers=2)
+    job_manager.register('wait', lambda payload, emit: release.wait(5) and {'ok': True})
+    yield job_manager
+    release.set()
+    job_manager.executor.shutdown(wait=True)
+
+
+def add_job(job_id, status, owner, lease_expires_at):
+    db.session.add(GenerationJob(id=job_id, user_id=1, kind='wait', status=status, payload_json='{}',
+                                 owner=owner, lease_expires_at=lease_expires_at))
+    db.session.commit()
+
+
+def test_resume_only_takes_jobs_with_expired_leases(manager):
+    now = datetime.now()
+    with manager.app.app_context():
+        add_job('live', 'running', 'other-process', now + timedelta(minutes=5))
+        add_job('dead', 'running', 'other-process', now - timedelta(minutes=5))
+
+    assert manager.resume_pending() == ['dead']
+    # A second process starting now finds nothing left to take
+    assert jobs.JobManager.resume_pending(manager) == []
+
+    with manager.app.app_context():
+        assert db.session.get(GenerationJob, 'live').owner == 'other-process'
+        assert db.session.get(GenerationJob, 'dead').owner == manager.owner_id
+
+
+def test_concurrent_submits_respect_the_per_user_limit(manager):
+    outcomes = []
+
+    def submit():
+        with manager.app.app_context():
+            try:
+                manager.submit(1, 'wait', {})
+                outcomes.append('queued')
+            except jobs.JobLimitExceeded:
+                outcomes.append('limited')
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes.count('queued') == jobs.JOB_MAX_ACTIVE_PER_USER
+    with manager.app.app_context():
+        assert GenerationJob.query.count() == jobs.JOB_MAX_ACTIVE_PER_USER
+
+
+def test_subscribe_sees_jobs_finished_by_another_process(manager):
+    with manager.app.app_context():
+        add_job('remote', 'running', 'other-process', datetime.now() + timedelta(minutes=5))
+        job = db.session.get(GenerationJob, 'remote')
+        events = manager.subscribe(job, timeout=0.05)
+
+        assert next(events) is None
+        GenerationJob.query.filter_by(id='remote').update({'status': 'completed'})
+        db.session.commit()
+
+        event, data = next(events)
+        assert (event, data['status']) == ('completed', 'completed')
@@ -0,0 +1,73 @@
+import pytest
+from flask import Flask
+
+import metrics
+
+
+def sample_values(metric):
+    return {(name, labels): value for name, labels, value in metric.samples()}
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = metrics.Histogram('work_seconds', 'Work time.', ('kind',), buckets=(0.1, 1))
+
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, kind='a')
+
+    lines = histogram.render()
+    assert 'work_seconds_bucket{kind="a",le="0.1"} 2' in lines
+    assert 'work_seconds_bucket{kind="a",le="1"} 3' in lines
+    assert 'work_seconds_bucket{kind="a",le="+Inf"} 4' in lines
+    assert 'work_seconds_sum{kind="a"} 3.65' in lines
+    assert 'work_seconds_count{kind="a"} 4' in lines
+
+
+def test_labels_must_match_and_are_escaped():
+    counter = metrics.Counter('things_total', 'Things.', ('name',))
+
+    with pytest.raises(ValueError):
+        counter.inc(other='x')
+    counter.inc(name='say "hi"\n')
+
+    assert 'things_total{name="say \\"hi\\"\\n"} 1' in counter.render()
+
+
+def test_a_failing_collector_does_not_break_the_scrape():
+    registry = metrics.Registry()
+    registry.register(metrics.Counter('kept_total', 'Kept.')).inc()
+
+    @registry.register_collector
+    def broken():
+        raise RuntimeError('no stats today')
+
+    @registry.register_collector
+    def queue():
+        yield 'queue_depth', 'gauge', 'Queued jobs.', [({'kind': 'export'}, 3)]
+
+    text = registry.render()
+    assert 'kept_total 1' in text
+    assert 'queue_depth{kind="export"} 3' in text
+
+
+def test_requests_are_counted_by_route_pattern():
+    app = Flask(__name__)
+    metrics.init_app(app)
+
+    @app.route('/items/<int:item_id>')
+    def item(item_id):
+        return 'ok'
+
+    before = sample_values(metrics.HTTP_REQUESTS)
+    client = app.test_client()
+    for item_id in range(3):
+        client.get(f'/items/{item_id}')
+    client.get('/nowhere')
+    after = sample_values(metrics.HTTP_REQUESTS)
+
+    def added(route, status):
+        key = ('http_requests_total', (('route', route), ('method', 'GET'), ('status', status)))
+        return after.get(key, 0) - before.get(key, 0)
+
+    assert added('/items/<int:item_id>', '200') == 3
+    assert added('unmatched', '404') == 1
+    assert not any('/items/1' in str(labels) for _, labels in after)
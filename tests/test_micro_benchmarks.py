@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CASE = 'extract_clean_json[1 slide]'
+
+
+def run_micro(baseline, *args):
+    return subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'benchmarks', 'micro.py'), '--filter', CASE, '--repeat', '1',
+         '--max-mb', '0', '--baseline', str(baseline), *args],
+        capture_output=True, text=True, timeout=120
+    )
+
+
+def write_baseline(path, results):
+    path.write_text(json.dumps({'results': results}))
+
+
+def test_save_baseline_merges_with_existing_cases(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    write_baseline(baseline, {'chunk_text[1KB]': 0.5})
+
+    result = run_micro(baseline, '--save-baseline')
+
+    assert result.returncode == 0, result.stderr
+    results = json.loads(baseline.read_text())['results']
+    assert results['chunk_text[1KB]'] == 0.5
+    assert 0 < results[CASE] < 0.1
+
+
+def test_regressions_past_the_threshold_fail_the_run(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+
+    write_baseline(baseline, {CASE: 1e-12})
+    slower = run_micro(baseline)
+    assert slower.returncode == 1
+    assert 'REGRESSION' in slower.stdout
+
+    write_baseline(baseline, {CASE: 10.0})
+    faster = run_micro(baseline)
+    assert faster.returncode == 0, faster.stdout + faster.stderr
+    assert 'REGRESSION' not in faster.stdout
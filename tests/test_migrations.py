@@ -0,0 +1,104 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+from flask import Flask
+from sqlalchemy import inspect, text
+
+from migrations import MIGRATIONS, run_migrations
+from models import db, GenerationJob, Presentation, Slide
+
+BASELINE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'pptgenerator.db')
+
+# The schema as it stood before migrations existed, with the first jobs table
+BASELINE_SCHEMA = """
+CREATE TABLE users (id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, password_hash VARCHAR(256) NOT NULL,
+    created_at DATETIME, PRIMARY KEY (id), UNIQUE (username));
+CREATE TABLE presentations (id INTEGER NOT NULL, user_id INTEGER NOT NULL, topic VARCHAR(200) NOT NULL,
+    template_id VARCHAR(50) NOT NULL, slide_count INTEGER, created_at DATETIME, updated_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id));
+CREATE TABLE slides (id INTEGER NOT NULL, presentation_id INTEGER NOT NULL, slide_order INTEGER NOT NULL,
+    layout VARCHAR(50) NOT NULL, content_json TEXT NOT NULL, PRIMARY KEY (id),
+    FOREIGN KEY(presentation_id) REFERENCES presentations (id));
+CREATE TABLE generation_jobs (id VARCHAR(32) NOT NULL, user_id INTEGER NOT NULL, kind VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL, payload_json TEXT NOT NULL, result_json TEXT, error TEXT, created_at DATETIME,
+    started_at DATETIME, finished_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id));
+INSERT INTO users VALUES (1, 'owner', 'x', '2024-01-01 00:00:00');
+INSERT INTO presentations VALUES (1, 1, 'Old deck', 'modern', 2, '2024-01-01 00:00:00', '2024-01-02 00:00:00');
+INSERT INTO slides VALUES (1, 1, 0, 'titleOnly', '{"title": "Hello"}');
+INSERT INTO slides VALUES (2, 1, 1, 'conclusion', '{"title": "Bye"}');
+INSERT INTO generation_jobs VALUES ('job1', 1, 'generate-outline', 'running', '{}', NULL, NULL,
+    '2024-01-01 00:00:00', '2024-01-01 00:00:01', NULL);
+"""
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    return app
+
+
+def migrate(app):
+    # What startup() does
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+
+
+def test_migrations_upgrade_a_baseline_schema(tmp_path):
+    path = tmp_path / 'baseline.db'
+    with sqlite3.connect(path) as connection:
+        connection.executescript(BASELINE_SCHEMA)
+    app = make_app(path)
+
+    migrate(app)
+
+    with app.app_context():
+        inspector = inspect(db.engine)
+        assert 'version' in {column['name'] for column in inspector.get_columns('presentations')}
+        assert {'owner', 'lease_expires_at'} <= {column['name'] for column in inspector.get_columns('generation_jobs')}
+        assert {index['name'] for index in inspector.get_indexes('presentations')} >= \
+            {'ix_presentations_user_updated', 'ix_presentations_user_created'}
+        assert 'ix_slides_presentation_order' in {index['name'] for index in inspector.get_indexes('slides')}
+
+        applied = [row[0] for row in db.session.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+        assert applied == [version for version, _, _ in MIGRATIONS]
+
+        # Existing rows survive and load through the current models
+        presentation = db.session.get(Presentation, 1)
+        assert (presentation.topic, presentation.version) == ('Old deck', 1)
+        slides = Slide.query.filter_by(presentation_id=1).order_by(Slide.slide_order).all()
+        assert [slide.content['title'] for slide in slides] == ['Hello', 'Bye']
+        job = db.session.get(GenerationJob, 'job1')
+        assert (job.status, job.owner, job.lease_expires_at) == ('running', None, None)
+
+
+def test_migrations_run_once(tmp_path):
+    path = tmp_path / 'baseline.db'
+    with sqlite3.connect(path) as connection:
+        connection.executescript(BASELINE_SCHEMA)
+    app = make_app(path)
+
+    migrate(app)
+    migrate(app)
+
+    with app.app_context():
+        count = db.session.execute(text("SELECT COUNT(*) FROM schema_migrations")).scalar()
+        assert count == len(MIGRATIONS)
+
+
+@pytest.mark.skipif(not os.path.exists(BASELINE_DB), reason='no shipped database')
+def test_migrations_upgrade_the_shipped_database(tmp_path):
+    path = tmp_path / 'pptgenerator.db'
+    shutil.copyfile(BASELINE_DB, path)
+    with sqlite3.connect(path) as connection:
+        before = connection.execute("SELECT COUNT(*) FROM presentations").fetchone()[0]
+    app = make_app(path)
+
+    migrate(app)
+
+    with app.app_context():
+        assert Presentation.query.count() == before
+        assert Presentation.query.filter(Presentation.version != 1).count() == 0
@@ -0,0 +1,50 @@
+import pytest
+from flask import Flask
+
+from models import db, Presentation, Slide, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'slides.db'}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username='owner', password_hash='x'))
+        db.session.add(Presentation(id=1, user_id=1, topic='Deck', template_id='modern'))
+        db.session.add(Slide(id=1, presentation_id=1, slide_order=0, layout='titleAndBullets',
+                             content_json='{"title": "Old", "bullets": ["a"]}'))
+        db.session.commit()
+        yield app
+
+
+def test_slide_content_edits_stay_local_until_assigned(app):
+    with app.app_context():
+        slide = db.session.get(Slide, 1)
+        content = slide.content
+        content['title'] = 'Edited'
+        content['bullets'].append('b')
+        # Another reader of the same instance still sees the stored content
+        assert slide.content == {'title': 'Old', 'bullets': ['a']}
+
+        slide.content = content
+        content['bullets'].append('not saved')
+        db.session.commit()
+        db.session.expire_all()
+
+        assert db.session.get(Slide, 1).content == {'title': 'Edited', 'bullets': ['a', 'b']}
+
+
+def test_slide_content_assignment_survives_an_expired_instance(app):
+    with app.app_context():
+        slide = db.session.get(Slide, 1)
+        slide.content = {'a': 1}
+        db.session.commit()  # expires the slide
+
+        slide.content = {'a': 2}
+        db.session.commit()
+        db.session.expire_all()
+
+        assert db.session.get(Slide, 1).content == {'a': 2}
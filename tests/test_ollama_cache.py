@@ -0,0 +1,57 @@
+import json
+
+from ollama_http import OllamaClient
+from response_cache import ResponseCache
+
+
+def make_client(answers):
+    client = OllamaClient(base_url='http://ollama.invalid', cache=ResponseCache(db_path=None))
+    calls = []
+
+    def fake_call(payload, on_token, cancelled=None):
+        calls.append(payload)
+        return {'response': json.dumps(answers[min(len(calls), len(answers)) - 1]), 'done': True}
+
+    client._call = fake_call
+    return client, calls
+
+
+def has_title(answer):
+    return bool(answer.get('title'))
+
+
+def accept_titled(result):
+    return has_title(json.loads(result['response']))
+
+
+def test_rejected_answers_are_not_replayed():
+    client, calls = make_client([{'oops': True}, {'title': 'Fixed'}])
+    options = {'temperature': 0.2}
+
+    client.generate('outline please', options=options, format='json', cache_if=accept_titled)
+    second = client.generate('outline please', options=options, format='json', cache_if=accept_titled)
+
+    assert len(calls) == 2
+    assert json.loads(second['response']) == {'title': 'Fixed'}
+
+
+def test_accepted_answers_are_served_from_cache():
+    client, calls = make_client([{'title': 'Deck'}])
+    options = {'temperature': 0.2}
+
+    client.generate('outline please', options=options, format='json', cache_if=accept_titled)
+    client.generate('outline please', options=options, format='json', cache_if=accept_titled)
+
+    assert len(calls) == 1
+
+
+def test_only_low_temperature_calls_with_cache_if_are_cached():
+    client, calls = make_client([{'title': 'Deck'}])
+
+    client.generate('creative', options={'temperature': 0.7}, format='json', cache_if=accept_titled)
+    client.generate('creative', options={'temperature': 0.7}, format='json', cache_if=accept_titled)
+    client.generate('free text', options={'temperature': 0.1})
+    client.generate('free text', options={'temperature': 0.1})
+
+    assert len(calls) == 4
+    assert client.cache.stats()['hits'] == 0
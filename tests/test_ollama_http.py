@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import ollama_http
+from benchmarks.fake_ollama import FakeConfig, make_server
+from ollama_http import OllamaClient
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def server():
+    server = make_server(port=0, config=FakeConfig(latency=0.05, jitter=0, token_rate=0, parallel=4))
+    connections = []
+    accept = server.get_request
+
+    def counted_accept():
+        request = accept()
+        connections.append(request[1])
+        return request
+
+    server.get_request = counted_accept
+    server.connections = connections
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def make_client(server, **kwargs):
+    return OllamaClient(base_url=f'http://127.0.0.1:{server.server_address[1]}',
+                        cache=ResponseCache(db_path=None), **kwargs)
+
+
+def test_sequential_calls_reuse_one_connection(server):
+    client = make_client(server)
+
+    for _ in range(5):
+        client.generate('Write the titleAndBullets slide', options={'temperature': 0.7})
+
+    assert len(server.connections) == 1
+    assert client.latency_stats()['calls'] == 5
+
+
+def test_concurrent_calls_stay_within_the_pool(server):
+    client = make_client(server, pool_size=4)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for _ in range(3):
+            list(executor.map(lambda _: client.generate('Write the quote slide'), range(4)))
+
+    # Three rounds of four calls share the four pooled sockets
+    assert len(server.connections) <= 4
+    assert client.latency_stats()['errors'] == 0
+
+
+def test_defaults_merge_under_per_call_options():
+    client = OllamaClient(base_url='http://ollama.invalid', default_options={'repeat_penalty': 1.1, 'top_p': 0.9},
+                          keep_alive='5m', cache=ResponseCache(db_path=None))
+
+    payload = client.build_payload('hi', options={'top_p': 0.5, 'temperature': 0.2}, format='json')
+
+    assert payload['options'] == {'repeat_penalty': 1.1, 'top_p': 0.5, 'temperature': 0.2}
+    assert (payload['format'], payload['keep_alive'], payload['stream']) == ('json', '5m', False)
+
+
+def test_get_client_is_shared(monkeypatch):
+    monkeypatch.setattr(ollama_http, '_client', None)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = set(map(id, executor.map(lambda _: ollama_http.get_client(), range(8))))
+
+    assert len(clients) == 1
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import update
+
+from models import db, Presentation, User
+from pagination import presentation_summary_page
+
+
+def test_pages_include_presentations_without_updated_at(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'pages.db'}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username='owner', password_hash='x'))
+        start = datetime(2025, 1, 1)
+        for presentation_id in range(1, 8):
+            db.session.add(Presentation(id=presentation_id, user_id=1, topic=f'Deck {presentation_id}',
+                                        template_id='modern', updated_at=start + timedelta(days=presentation_id)))
+        db.session.commit()
+        # Rows from before updated_at was always set
+        db.session.execute(update(Presentation).where(Presentation.id.in_([2, 5, 6])).values(updated_at=None))
+        db.session.commit()
+
+        seen = []
+        cursor = None
+        while True:
+            items, cursor = presentation_summary_page(1, limit=2, cursor=cursor)
+            seen += [item['id'] for item in items]
+            if cursor is None:
+                break
+
+        # Newest first, then the undated rows by id
+        assert seen == [7, 4, 3, 1, 6, 5, 2]
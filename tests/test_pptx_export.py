@@ -0,0 +1,134 @@
+import copy
+import zipfile
+from io import BytesIO
+
+import pytest
+from lxml import etree
+from flask import Flask
+from pptx import Presentation
+
+import pptx_export
+from benchmarks.fake_ollama import LAYOUT_CONTENT
+from disk_cache import DiskLRUCache
+
+SLIDES = [{'layout': layout, 'content': content} for layout, content in LAYOUT_CONTENT.items()]
+
+
+def export(slides, template_id, slide_cache=None):
+    buffer = BytesIO()
+    pptx_export.create_presentation(buffer, slides, template_id, slide_cache=slide_cache)
+    return buffer.getvalue()
+
+
+def deck_parts(data):
+    """Everything about a deck that rendering decides, minus save timestamps"""
+    prs = Presentation(BytesIO(data))
+    slides = [
+        (slide.slide_layout.name, etree.tostring(slide._element, method='c14n'),
+         sorted((rel.reltype, rel.target_ref) for rel in slide.part.rels.values()))
+        for slide in prs.slides
+    ]
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        names = sorted(name for name in archive.namelist() if not name.startswith('docProps/'))
+        presentation_xml = archive.read('ppt/presentation.xml')
+    return names, presentation_xml, slides
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(pptx_export, '_export_cache', DiskLRUCache(str(tmp_path / 'exports'), 64 * 1024 * 1024))
+    monkeypatch.setattr(pptx_export, '_slide_cache', DiskLRUCache(str(tmp_path / 'slides'), 64 * 1024 * 1024))
+    app = Flask(__name__)
+    app.route('/api/export', methods=['POST'])(pptx_export.export_pptx)
+    return app.test_client()
+
+
+@pytest.fixture
+def slide_cache(tmp_path):
+    return DiskLRUCache(str(tmp_path / 'slides'), 64 * 1024 * 1024)
+
+
+@pytest.fixture
+def render_count(monkeypatch):
+    calls = []
+    render_slide = pptx_export.render_slide
+
+    def counted(prs, layout, content, template):
+        calls.append(layout)
+        return render_slide(prs, layout, content, template)
+
+    monkeypatch.setattr(pptx_export, 'render_slide', counted)
+    return calls
+
+
+@pytest.mark.parametrize('template_id', ['corporate', 'creative'])
+def test_spliced_deck_matches_a_fresh_export(slide_cache, render_count, template_id):
+    fresh = export(SLIDES, template_id)
+    export(SLIDES, template_id, slide_cache)
+    del render_count[:]
+
+    spliced = export(SLIDES, template_id, slide_cache)
+
+    assert render_count == []
+    assert deck_parts(spliced) == deck_parts(fresh)
+
+
+def test_edited_deck_only_rerenders_changed_slides(slide_cache, render_count):
+    export(SLIDES, 'corporate', slide_cache)
+    edited = copy.deepcopy(SLIDES)
+    edited[1]['content']['title'] = 'Edited title'
+    edited[2], edited[3] = edited[3], edited[2]
+    del render_count[:]
+
+    spliced = export(edited, 'corporate', slide_cache)
+
+    assert render_count == ['titleAndBullets']
+    assert deck_parts(spliced) == deck_parts(export(edited, 'corporate'))
+    # The same content under another template is not served from the cache
+    del render_count[:]
+    export(SLIDES[:1], 'creative', slide_cache)
+    assert render_count == ['titleOnly']
+
+
+def test_export_is_sent_as_a_download(client):
+    response = client.post('/api/export', json={'slides': SLIDES, 'template': 'corporate',
+                                                'topic': 'Solar power: 2025/26'})
+
+    assert response.status_code == 200
+    assert response.mimetype == pptx_export.PPTX_MIMETYPE
+    assert response.headers['Content-Disposition'] == 'attachment; filename=Solar_power_2025_26.pptx'
+    assert len(Presentation(BytesIO(response.data)).slides) == len(SLIDES)
+
+
+def test_export_rejects_empty_decks_and_a_full_queue(client, monkeypatch):
+    assert client.post('/api/export', json={'slides': []}).status_code == 400
+    assert client.post('/api/export', data='not json').status_code == 400
+
+    pool = pptx_export.ExportPool(workers=1, max_pending=0)
+    monkeypatch.setattr(pptx_export, '_export_pool', pool)
+    pool._slots.acquire()  # another export holds the only slot
+
+    response = client.post('/api/export', json={'slides': SLIDES[:1], 'template': 'corporate'})
+    assert response.status_code == 503
+
+
+def test_repeated_exports_come_from_the_deck_cache(client, monkeypatch):
+    renders = []
+    pool = pptx_export.get_export_pool()
+    render = pool.render
+
+    def counted(slides, template_id):
+        renders.append(template_id)
+        return render(slides, template_id)
+
+    monkeypatch.setattr(pool, 'render', counted)
+    deck = {'slides': SLIDES, 'template': 'corporate', 'topic': 'Deck'}
+
+    first = client.post('/api/export', json=deck).data
+    # Fields the exporter does not read leave the key unchanged
+    second = client.post('/api/export', json={**deck, 'topic': 'Renamed',
+                                              'slides': [dict(slide, id=index) for index, slide in enumerate(SLIDES)]}).data
+    client.post('/api/export', json={**deck, 'template': 'creative'})
+
+    assert first == second
+    assert renders == ['corporate', 'creative']
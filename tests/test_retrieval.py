@@ -0,0 +1,122 @@
+import random
+import threading
+import time
+
+import ollama_client
+import retrieval
+
+DOCUMENT = (
+    "Our onboarding programme pairs every new engineer with a mentor for the first month. "
+    "Mentors review pull requests and run weekly check-ins.\n\n"
+    "The data platform migrated from nightly batches to streaming ingestion. "
+    "Streaming cut dashboard latency from hours to seconds.\n\n"
+    "Hiring plans for next year focus on site reliability and security roles."
+)
+
+OUTLINE = {
+    'presentation_meta': {'title': 'Engineering Review', 'objective': 'Share progress', 'key_message': 'We improved'},
+    'slide_structure': [
+        {'slide_number': 1, 'layout': 'titleOnly', 'title': 'Engineering Review', 'purpose': 'Open',
+         'context': 'Opening', 'key_points': [], 'transitions': {'from_previous': None, 'to_next': 'Data'}},
+        {'slide_number': 2, 'layout': 'titleAndBullets', 'title': 'Streaming ingestion', 'purpose': 'Explain the migration',
+         'context': 'Platform work', 'key_points': ['streaming', 'dashboard latency'],
+         'transitions': {'from_previous': 'Intro', 'to_next': None}}
+    ]
+}
+
+
+class RecordingClient:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return {'response': '{"title": "Streaming ingestion", "bullets": ["Latency fell from hours to seconds"]}'}
+
+
+def test_upload_slides_use_retrieved_passages(monkeypatch):
+    client = RecordingClient()
+    monkeypatch.setattr(ollama_client, 'get_client', lambda: client)
+    content_data = {'document_id': 'upload-doc', 'full_text': DOCUMENT, 'chunks': DOCUMENT.split('\n\n')}
+
+    ollama_client.generate_slide_with_enhanced_context(
+        OUTLINE['slide_structure'][1], OUTLINE, 'corporate', content_data=content_data,
+        input_method='upload', use_cache=False
+    )
+
+    prompt = client.prompts[0]
+    assert 'SOURCE CONTENT SECTION' in prompt
+    assert 'Streaming cut dashboard latency' in prompt
+
+
+def test_index_is_keyed_by_document_id():
+    chunks = DOCUMENT.split('\n\n')
+    built = retrieval.get_document_index('doc-by-id', chunks=chunks)
+
+    # Later lookups need neither the text nor the chunks
+    assert retrieval.get_document_index('doc-by-id') is built
+    assert retrieval.get_document_index('never-stored') is None
+
+
+def test_concurrent_lookups_build_once(monkeypatch):
+    builds = []
+    real_index = retrieval.BM25Index
+
+    def counting_index(chunks):
+        builds.append(1)
+        return real_index(chunks)
+
+    monkeypatch.setattr(retrieval, 'BM25Index', counting_index)
+    start = threading.Barrier(8)
+
+    def lookup():
+        start.wait()
+        retrieval.get_document_index('shared-doc', DOCUMENT)
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+
+
+def test_document_slides_reuse_the_analysis_index_key(monkeypatch):
+    monkeypatch.setattr(ollama_client, 'get_client', lambda: RecordingClient())
+    hashes = []
+    real_key = ollama_client.document_key
+
+    def counting_key(text):
+        hashes.append(1)
+        return real_key(text)
+
+    monkeypatch.setattr(ollama_client, 'document_key', counting_key)
+    text = DOCUMENT * 20
+
+    result = ollama_client.process_full_document_for_presentation(text, 'Engineering Review')
+    analysis = result['analysis']
+    assert analysis['index_key'] == real_key(text)
+
+    for slide_plan in analysis['presentation_plan']['slide_structure']:
+        slide_plan = dict(slide_plan, source_section='middle', purpose='Explain streaming', content_focus='latency')
+        ollama_client.generate_slide_with_retry(slide_plan, text, analysis, 'preserve')
+
+    assert len(hashes) == 1
+
+
+def test_search_on_ten_thousand_chunks_is_fast():
+    rng = random.Random(7)
+    vocabulary = [f'term{i}' for i in range(5000)] + ['streaming', 'latency', 'platform', 'data'] * 40
+    index = retrieval.BM25Index(' '.join(rng.choice(vocabulary) for _ in range(80)) for _ in range(10000))
+
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        results = index.search('streaming data platform latency', k=5)
+        timings.append(time.perf_counter() - started)
+
+    assert [score for score, _ in results] == sorted((score for score, _ in results), reverse=True)
+    assert len(results) == 5
+    # Every query term appears in most chunks here, the worst case for scoring
+    assert min(timings) < 0.02
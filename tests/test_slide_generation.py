@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from ollama_client import generate_slides_concurrently
+
+
+def outline(count):
+    # Listed out of order, as some model outlines are
+    return [{'slide_number': number, 'layout': 'titleAndBullets'} for number in reversed(range(1, count + 1))]
+
+
+def test_slides_run_concurrently_up_to_the_limit():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def generate(slide_info):
+        with lock:
+            active.append(slide_info['slide_number'])
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(slide_info['slide_number'])
+        return {'title': f"Slide {slide_info['slide_number']}"}
+
+    started = time.perf_counter()
+    slides = generate_slides_concurrently(outline(8), generate, max_workers=4)
+
+    assert max(peak) == 4
+    assert time.perf_counter() - started < 8 * 0.05
+    assert [slide['content']['title'] for slide in slides] == [f'Slide {number}' for number in range(1, 9)]
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_failed_slides_are_dropped_and_reported(max_workers):
+    events = []
+
+    def generate(slide_info):
+        if slide_info['slide_number'] == 2:
+            raise ValueError('model returned nonsense')
+        if slide_info['slide_number'] == 3:
+            return None
+        return {'title': f"Slide {slide_info['slide_number']}"}
+
+    slides = generate_slides_concurrently(outline(4), generate, max_workers=max_workers,
+                                          on_event=lambda name, data: events.append((name, data['slide_number'])))
+
+    assert [slide['content']['title'] for slide in slides] == ['Slide 1', 'Slide 4']
+    assert sorted(number for name, number in events if name == 'slide_failed') == [2, 3]
+    assert sorted(number for name, number in events if name == 'slide_done') == [1, 4]
+
+
+def test_cancelled_skips_slides_not_yet_started():
+    cancelled = threading.Event()
+    calls = []
+
+    def generate(slide_info):
+        calls.append(slide_info['slide_number'])
+        cancelled.set()
+        return {'title': 'Only one'}
+
+    slides = generate_slides_concurrently(outline(5), generate, max_workers=1, cancelled=cancelled)
+
+    assert len(calls) == 1 and len(slides) == 1
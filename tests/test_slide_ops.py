@@ -0,0 +1,49 @@
+import pytest
+from flask import Flask
+
+from models import db, Presentation, Slide, User
+from slide_ops import VersionConflict, replace_slides
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'slides.db'}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username='owner', password_hash='x'))
+        db.session.add(Presentation(id=1, user_id=1, topic='Deck', template_id='modern', slide_count=3))
+        for order, title in enumerate(['One', 'Two', 'Three']):
+            db.session.add(Slide(id=order + 1, presentation_id=1, slide_order=order, layout='titleOnly',
+                                 content={'title': title}))
+        db.session.commit()
+        yield app
+
+
+def stored_slides():
+    return [(slide.id, slide.content['title']) for slide in
+            Slide.query.filter_by(presentation_id=1).order_by(Slide.slide_order).all()]
+
+
+def test_full_save_updates_rows_in_place(app):
+    with app.app_context():
+        result = replace_slides(1, 1, [
+            {'id': 3, 'layout': 'titleOnly', 'content': {'title': 'Three'}},
+            {'id': 1, 'layout': 'titleOnly', 'content': {'title': 'One, edited'}},
+            {'layout': 'titleOnly', 'content': {'title': 'New'}}
+        ], topic='Renamed')
+
+        assert result['version'] == 2
+        new_id = result['inserted']['new-2']
+        assert stored_slides() == [(3, 'Three'), (1, 'One, edited'), (new_id, 'New')]
+        presentation = db.session.get(Presentation, 1)
+        assert (presentation.topic, presentation.slide_count, presentation.version) == ('Renamed', 3, 2)
+
+
+def test_full_save_checks_the_version(app):
+    with app.app_context():
+        with pytest.raises(VersionConflict):
+            replace_slides(1, 1, [{'id': 1, 'layout': 'titleOnly', 'content': {'title': 'Stale'}}], version=7)
+        assert stored_slides() == [(1, 'One'), (2, 'Two'), (3, 'Three')]
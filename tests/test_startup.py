@@ -0,0 +1,36 @@
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports app the way `flask run` or waitress would, without calling startup()
+SCRIPT = """
+import logging
+logging.disable(logging.CRITICAL)
+import app
+
+assert app.job_manager.executor is None
+client = app.app.test_client()
+with app.app.app_context():
+    user_id = app.User.query.first().id
+with client.session_transaction() as session:
+    session['user_id'] = user_id
+
+assert client.get('/dashboard').status_code == 200
+assert client.post('/api/jobs/generate-outline', json={'topic': 'Solar', 'slideCount': 3}).status_code == 202
+assert app.job_manager.executor is not None
+"""
+
+
+def test_first_request_migrates_and_starts_jobs(tmp_path):
+    database = tmp_path / 'pptgenerator.db'
+    shutil.copy(os.path.join(ROOT, 'instance', 'pptgenerator.db'), database)
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', OLLAMA_HOST='http://127.0.0.1:9',
+               TRACE_FILE='', PPT_CACHE_DIR=str(tmp_path / 'cache'))
+
+    result = subprocess.run([sys.executable, '-c', SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=120)
+
+    assert result.returncode == 0, result.stderr
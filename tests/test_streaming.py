@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+import ollama_client
+import sse
+from benchmarks.fake_ollama import FakeConfig, make_server
+from ollama_http import GenerationCancelled, OllamaClient
+
+
+@pytest.fixture
+def client():
+    # Slow enough that a full outline takes seconds to stream
+    server = make_server(port=0, config=FakeConfig(latency=0, token_rate=50))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield OllamaClient(base_url=f'http://127.0.0.1:{server.server_address[1]}')
+    server.shutdown()
+
+
+def test_cancelled_stream_stops_and_closes_the_response(client):
+    cancelled = threading.Event()
+    tokens = []
+
+    def on_token(token):
+        tokens.append(token)
+        if len(tokens) == 3:
+            cancelled.set()
+
+    started = time.perf_counter()
+    with pytest.raises(GenerationCancelled):
+        client.generate('Create a presentation outline with exactly 5 slides', on_token=on_token,
+                        cancelled=cancelled)
+
+    assert len(tokens) == 3
+    assert time.perf_counter() - started < 1
+
+
+def test_outline_worker_stops_when_the_client_disconnects(client, monkeypatch):
+    monkeypatch.setattr(ollama_client, 'get_client', lambda: client)
+    finished = threading.Event()
+    outcome = []
+
+    def work(emit, cancelled):
+        outcome.append(ollama_client.generate_presentation_outline_enhanced(
+            'Solar power', 5, on_token=lambda text: emit('token', {'text': text}), use_cache=False,
+            cancelled=cancelled
+        ))
+        finished.set()
+
+    frames = sse.stream_worker_events(work)
+    assert next(frames).startswith('event: token')
+    frames.close()  # what the server does when the client goes away
+
+    assert finished.wait(1)
+    assert outcome == [None]
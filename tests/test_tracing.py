@@ -0,0 +1,45 @@
+from flask import Flask
+
+import tracing
+
+
+def make_app():
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    tracing.init_app(app)
+
+    @app.route('/work')
+    def work():
+        tracing.record('work', 0.001)
+        return 'ok'
+
+    return app
+
+
+def test_client_request_ids_cannot_replace_other_traces():
+    client = make_app().test_client()
+    with tracing.traced('job generate-outline', request_id='job123') as job_trace:
+        tracing.record('job.step', 0.001)
+
+    first = client.get('/work', headers={'X-Request-Id': 'job123'}).headers['X-Request-Id']
+    assert first == 'client-job123'
+    assert tracing.get_trace('job123') is job_trace
+
+    # The same client id again gets a fresh id rather than overwriting the first trace
+    second = client.get('/work', headers={'X-Request-Id': 'job123'}).headers['X-Request-Id']
+    assert second != first
+    assert tracing.get_trace(first).request_id == first
+    assert tracing.get_trace(second).request_id == second
+
+
+def test_trace_file_rotates(tmp_path, monkeypatch):
+    path = tmp_path / 'traces.jsonl'
+    monkeypatch.setattr(tracing, 'TRACE_FILE', str(path))
+    monkeypatch.setattr(tracing, 'TRACE_FILE_MAX_BYTES', 200)
+    client = make_app().test_client()
+
+    for _ in range(5):
+        client.get('/work')
+
+    assert path.exists() and (tmp_path / 'traces.jsonl.1').exists()
+    assert path.stat().st_size < 200 * 2
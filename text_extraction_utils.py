@@ -1,12 +1,25 @@
 import os
 import re
+import json
+import bisect
+import operator
+import time
 import logging
 import hashlib
+import struct
 import mimetypes
+import threading
+import multiprocessing
+from itertools import accumulate, count
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from werkzeug.utils import secure_filename
 from pathlib import Path
 from datetime import datetime
 
+from disk_cache import DiskLRUCache, CACHE_ROOT
+import blob_codec
+import tracing
 
 try:
     import fitz  
@@ -38,39 +51,152 @@ FILE_SIZE_LIMITS = {
     'text': 10 * 1024 * 1024,    
     'document': 25 * 1024 * 1024  
 }
-def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
-    """Smart text chunking with overlap for better context"""
-    if not text or not isinstance(text, str):
-        return []
-    
-    text = text.strip()
-    text_length = len(text)
-    
-    if text_length <= chunk_size:
-        return [text] if text_length >= MIN_CONTENT_LENGTH else []
-    
-    chunks = []
-    start = 0
-    
-    while start < text_length:
+MAX_UPLOAD_BYTES = max(FILE_SIZE_LIMITS.values()) + 1024 * 1024  # plus multipart overhead
+
+# Extraction output is cached by the SHA-256 of the uploaded bytes so a re-upload
+# skips parsing; bump the version when the stored output changes shape
+EXTRACTION_CACHE_VERSION = 4
+EXTRACTION_CACHE_DIR = os.environ.get('EXTRACTION_CACHE_DIR', os.path.join(CACHE_ROOT, 'extraction'))
+EXTRACTION_CACHE_MAX_MB = int(os.environ.get('EXTRACTION_CACHE_MAX_MB', 256))
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+DOCUMENT_PREVIEW_CHARS = 500
+EXTRACTED_LOG_CHARS = 5000
+DOCUMENT_ID_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+_extraction_cache = None
+
+# PDFs with at least this many pages are split across a process pool
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 64))
+PDF_EXTRACT_WORKERS = int(os.environ.get('PDF_EXTRACT_WORKERS', min(8, os.cpu_count() or 1)))
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+# Chunk boundaries tried in order, with how far back from the chunk end to look
+CHUNK_BOUNDARIES = [
+    ('\n\n', 300),  # Paragraph boundaries
+    ('.', 200),     # Sentence boundaries
+    ('!', 200),     # Exclamation boundaries
+    ('?', 200),     # Question boundaries
+    (';', 150),     # Semicolon boundaries
+    ('\n', 100),    # Line boundaries
+    (' ', 50)       # Word boundaries
+]
+
+# Chunk boundaries are indexed this many characters at a time
+CHUNK_INDEX_BLOCK = 64 * 1024
+
+def find_all(text, token, offset=0):
+    """Start offsets (plus offset) of every occurrence of a one-character token
+
+    Splitting and summing the part lengths keeps the whole scan in C, which is
+    several times faster than iterating regex matches.
+    """
+    parts = text.split(token)
+    parts.pop()
+    return list(map(operator.add, accumulate(map(len, parts)), count(offset)))
+
+def strip_text_stream(pieces):
+    """Yield pieces with leading and trailing whitespace of the whole stream removed"""
+    started = False
+    held = ''
+    for piece in pieces:
+        if not started:
+            piece = piece.lstrip()
+            if not piece:
+                continue
+            started = True
+        body = piece.rstrip()
+        if body:
+            # Whitespace between two pieces of content is kept, only the tail is dropped
+            yield held + body
+            held = piece[len(body):]
+        else:
+            held += piece
+
+class BoundaryIndex:
+    """Sorted positions of each chunk boundary in a sliding text buffer.
+
+    Every boundary except spaces is indexed once, a block at a time just ahead
+    of where chunks are being cut, and dropped once chunking has moved past
+    it. Spaces are too common to index cheaply and are only ever searched for
+    in a 50 character window. Positions are absolute offsets into the stream,
+    so trimming the front of the buffer never rewrites the index.
+    """
+
+    def __init__(self):
+        self.positions = {boundary: [] for boundary, _ in CHUNK_BOUNDARIES if boundary != ' '}
+        self.indexed_to = 0
+
+    def extend(self, buffer, base, upto, keep_from):
+        """Index buffer (which starts at absolute offset base) up to at least
+        buffer offset upto, one block at a time, forgetting boundaries before keep_from"""
+        while self.indexed_to - base < upto:
+            scan_from = self.indexed_to - base
+            region = buffer[scan_from:scan_from + CHUNK_INDEX_BLOCK]
+            offset = base + scan_from
+
+            for boundary in ('.', '!', '?', ';'):
+                self.positions[boundary].extend(find_all(region, boundary, offset))
+
+            # Paragraph breaks overlap inside longer runs of newlines, so derive
+            # them from adjacent line breaks, including one just before the block
+            line_breaks = self.positions['\n']
+            newlines = find_all(region, '\n', offset)
+            previous = [line_breaks[-1]] if line_breaks else [-2]
+            self.positions['\n\n'].extend(
+                p for p, q in zip(previous + newlines, newlines) if q == p + 1
+            )
+            line_breaks.extend(newlines)
+            self.indexed_to = offset + len(region)
+            self.discard_before(base + keep_from)
+
+    def last_before(self, boundary, lower, upper):
+        """Last start position p of boundary with lower <= p and p + len(boundary) <= upper, or -1"""
+        positions = self.positions[boundary]
+        i = bisect.bisect_right(positions, upper - len(boundary)) - 1
+        return positions[i] if i >= 0 and positions[i] >= lower else -1
+
+    def discard_before(self, position):
+        for positions in self.positions.values():
+            if positions and positions[0] < position:
+                del positions[:bisect.bisect_left(positions, position)]
+
+
+def iter_chunks(pieces, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Smart text chunking with overlap, over an iterable of text pieces
+
+    Boundaries are indexed once as text arrives and each chunk end is placed
+    by bisecting that index, so the work is O(n) in the input.
+    Each step advances at least half of the chunk just cut, which keeps the
+    total size of the chunks O(n) as well. With the default sizes that rule
+    never applies; it only caps overlaps close to or above the chunk size,
+    which used to advance one character at a time. Produces the same chunks
+    as chunk_text() on the joined text while only holding a window of
+    roughly one chunk in memory.
+    """
+    buffer = ''
+    base = 0           # absolute offset of buffer[0]
+    start = 0          # chunk start, relative to buffer
+    content_end = 0    # end of the last non-whitespace character in buffer
+    chunked = False
+    index = BoundaryIndex()
+
+    def next_chunk(text, start, text_length):
         end = start + chunk_size
         
         if end < text_length:
             # Smart boundary detection
-            boundaries = [
-                ('\n\n', 300),  # Paragraph boundaries
-                ('.', 200),     # Sentence boundaries
-                ('!', 200),     # Exclamation boundaries
-                ('?', 200),     # Question boundaries
-                (';', 150),     # Semicolon boundaries
-                ('\n', 100),    # Line boundaries
-                (' ', 50)       # Word boundaries
-            ]
-            
             best_boundary = end
-            for boundary_char, search_range in boundaries:
+            index.extend(text, base, end, start)
+            for boundary_char, search_range in CHUNK_BOUNDARIES:
                 search_start = max(start, end - search_range)
-                boundary_pos = text.rfind(boundary_char, search_start, end)
+                if boundary_char == ' ':
+                    boundary_pos = text.rfind(boundary_char, search_start, end)
+                else:
+                    boundary_pos = index.last_before(boundary_char, base + search_start, base + end)
+                    if boundary_pos >= 0:
+                        boundary_pos -= base
                 if boundary_pos > start:
                     best_boundary = boundary_pos + len(boundary_char)
                     break
@@ -78,16 +204,48 @@ def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
             end = best_boundary
         
         chunk = text[start:end].strip()
+        next_start = max(end - overlap, start + max(1, (end - start) // 2))
         
         # Validate chunk
-        if len(chunk) >= MIN_CONTENT_LENGTH and len(chunk.split()) >= 3:
-            chunks.append(chunk)
-        
-        start = max(end - overlap, start + 1)
-        if start >= text_length:
-            break
+        if len(chunk) >= MIN_CONTENT_LENGTH and len(chunk.split(None, 3)) >= 3:
+            return chunk, next_start
+        return None, next_start
+
+    for piece in strip_text_stream(pieces):
+        buffer += piece
+        content_end = len(buffer)
+        
+        # Only cut while more content follows the window, so the boundary
+        # search sees exactly what it would on the full text
+        while start + chunk_size < content_end:
+            chunked = True
+            chunk, start = next_chunk(buffer, start, content_end)
+            if chunk:
+                yield chunk
+        
+        if start > chunk_size * 4:
+            buffer = buffer[start:]
+            content_end -= start
+            base += start
+            start = 0
+
+    if not chunked:
+        if content_end <= chunk_size:
+            if content_end >= MIN_CONTENT_LENGTH:
+                yield buffer
+            return
+
+    while start < content_end:
+        chunk, start = next_chunk(buffer, start, content_end)
+        if chunk:
+            yield chunk
+
+def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Smart text chunking with overlap for better context"""
+    if not text or not isinstance(text, str):
+        return []
     
-    return chunks
+    return list(iter_chunks([text], chunk_size, overlap))
 
 def detect_file_type(file):
     """Detect file type from filename and MIME type"""
@@ -104,6 +262,16 @@ def detect_file_type(file):
     
     return None
 
+def detect_file_type_from_path(file_path):
+    """Auto-detect the extractor to use from a path's extension"""
+    ext = file_path.lower().rsplit('.', 1)[-1] if '.' in file_path else ''
+    
+    if ext == 'pdf':
+        return 'pdf'
+    elif ext in ['docx', 'doc']:
+        return 'document'
+    return 'text'
+
 def validate_file(file):
     """Validate file for processing"""
     if not file or not hasattr(file, 'filename'):
@@ -137,403 +305,513 @@ def validate_file_size(file_path, file_type):
     
     return True, None
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from PDF using PyMuPDF"""
+class ExtractionError(Exception):
+    """Raised by the streaming extractors when a file has no usable text"""
+
+def clean_pdf_page(page_num, page_text):
+    """Format one page as a "[Page N]" block, or None if it has no real content"""
+    if page_text and page_text.strip():
+        cleaned_text = page_text.strip()
+        if len(cleaned_text) > 10:  # Minimum content threshold
+            return f"[Page {page_num + 1}]\n{cleaned_text}"
+    return None
+
+def extract_pdf_page_range(pdf_path, start, stop):
+    """Extract pages [start, stop) with a private fitz document; runs inside pool workers
+
+    Returns ([(page_num, text), ...], [(page_num, error), ...]) so the parent can
+    merge in page order and log failures (worker processes have no log config).
+    """
+    pages = []
+    failures = []
+    doc = fitz.open(pdf_path)
+    try:
+        for page_num in range(start, stop):
+            try:
+                block = clean_pdf_page(page_num, doc[page_num].get_text())
+                if block:
+                    pages.append((page_num, block))
+            except Exception as e:
+                failures.append((page_num, str(e)))
+    finally:
+        doc.close()
+    return pages, failures
+
+def get_pdf_pool():
+    """Shared process pool for page extraction, started on first large PDF"""
+    global _pdf_pool
+    if _pdf_pool is None:
+        with _pdf_pool_lock:
+            if _pdf_pool is None:
+                # spawn rather than fork: the web server is multi-threaded. Spawned
+                # workers re-import __main__, so entry points keep startup work
+                # behind their __main__ guard.
+                _pdf_pool = ProcessPoolExecutor(
+                    max_workers=PDF_EXTRACT_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _pdf_pool
+
+def reset_pdf_pool(pool):
+    """Forget a broken pool so the next large PDF starts a fresh one"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+
+def iter_pdf_ranges_parallel(pdf_path, total_pages, workers=PDF_EXTRACT_WORKERS):
+    """Split the page range across the process pool and yield (stop, pages, failures) in page order"""
+    # A few ranges per worker keeps the pool busy when some pages are much heavier
+    span = max(8, -(-total_pages // (workers * 4)))
+    ranges = [(start, min(start + span, total_pages)) for start in range(0, total_pages, span)]
+
+    pool = get_pdf_pool()
+    futures = [(stop, pool.submit(extract_pdf_page_range, pdf_path, start, stop)) for start, stop in ranges]
+    try:
+        for stop, future in futures:
+            pages, failures = future.result()
+            yield stop, pages, failures
+    except BrokenProcessPool:
+        reset_pdf_pool(pool)
+        raise
+    finally:
+        for _, future in futures:
+            future.cancel()
+
+def iter_pdf_pages(pdf_path, parallel=None):
+    """Yield "[Page N]" blocks from a PDF in page order
+
+    parallel=None picks the process pool automatically for PDFs with at least
+    PDF_PARALLEL_MIN_PAGES pages; True/False forces the mode.
+    """
     if not PDF_AVAILABLE:
-        return "", "PyMuPDF not available. Install with: pip install PyMuPDF"
+        raise ExtractionError("PyMuPDF not available. Install with: pip install PyMuPDF")
     
     if not os.path.exists(pdf_path):
-        return "", f"PDF file not found: {pdf_path}"
+        raise ExtractionError(f"PDF file not found: {pdf_path}")
     
+    # Validate file size
+    size_ok, error = validate_file_size(pdf_path, 'pdf')
+    if not size_ok:
+        raise ExtractionError(error)
+    
+    started = time.perf_counter()
+    doc = fitz.open(pdf_path)
     try:
-        # Validate file size
-        size_ok, error = validate_file_size(pdf_path, 'pdf')
-        if not size_ok:
-            return "", error
-        
-        doc = fitz.open(pdf_path)
-        text_parts = []
         total_pages = len(doc)
-        
         if total_pages == 0:
-            doc.close()
-            return "", "PDF has no pages"
+            raise ExtractionError("PDF has no pages")
+        
+        if parallel is None:
+            parallel = PDF_EXTRACT_WORKERS > 1 and total_pages >= PDF_PARALLEL_MIN_PAGES
         
+        next_page = 0
         successful_pages = 0
+        characters = 0
+        workers = 1
         
-        for page_num in range(total_pages):
+        if parallel:
+            workers = PDF_EXTRACT_WORKERS
             try:
-                page = doc[page_num]
-                page_text = page.get_text()
-                
-                if page_text and page_text.strip():
-                    cleaned_text = page_text.strip()
-                    if len(cleaned_text) > 10:  # Minimum content threshold
-                        text_parts.append(f"[Page {page_num + 1}]\n{cleaned_text}")
+                for stop, pages, failures in iter_pdf_ranges_parallel(pdf_path, total_pages):
+                    for page_num, page_error in failures:
+                        logger.warning(f"Error processing page {page_num + 1}: {page_error}")
+                    for _, block in pages:
                         successful_pages += 1
-                
+                        characters += len(block)
+                        yield block
+                    next_page = stop
+            except Exception as e:
+                logger.warning(f"Parallel PDF extraction failed at page {next_page + 1}, continuing sequentially: {e}")
+        
+        # Sequential path, or the remainder after a pool failure
+        for page_num in range(next_page, total_pages):
+            try:
+                block = clean_pdf_page(page_num, doc[page_num].get_text())
             except Exception as e:
                 logger.warning(f"Error processing page {page_num + 1}: {e}")
                 continue
-        
+            if block:
+                successful_pages += 1
+                characters += len(block)
+                yield block
+    finally:
         doc.close()
-        
-        if successful_pages == 0:
-            return "", "No readable content found in PDF"
-        
-        extracted_text = "\n\n".join(text_parts)
-        logger.info(f"PDF extraction: {successful_pages}/{total_pages} pages, {len(extracted_text)} characters")
-        
-        return extracted_text, None
-        
-    except Exception as e:
-        logger.error(f"Error extracting text from PDF: {e}")
-        return "", f"PDF extraction failed: {str(e)}"
+    
+    if successful_pages == 0:
+        raise ExtractionError("No readable content found in PDF")
+    
+    elapsed = time.perf_counter() - started
+    pages_per_sec = total_pages / elapsed if elapsed > 0 else float(total_pages)
+    logger.info(
+        f"PDF extraction: {successful_pages}/{total_pages} pages, {characters} characters, "
+        f"{pages_per_sec:.1f} pages/sec ({workers} worker{'s' if workers > 1 else ''})"
+    )
 
-def extract_text_from_docx(docx_path):
-    """Extract text from DOCX using python-docx"""
+def iter_docx_blocks(docx_path):
+    """Yield paragraph and table-row text from a DOCX file"""
     if not DOCX_AVAILABLE:
-        return "", "python-docx not available. Install with: pip install python-docx"
+        raise ExtractionError("python-docx not available. Install with: pip install python-docx")
     
     if not os.path.exists(docx_path):
-        return "", f"DOCX file not found: {docx_path}"
+        raise ExtractionError(f"DOCX file not found: {docx_path}")
+    
+    # Validate file size
+    size_ok, error = validate_file_size(docx_path, 'document')
+    if not size_ok:
+        raise ExtractionError(error)
+    
+    doc = docx.Document(docx_path)
+    elements = 0
+    
+    # Extract paragraphs
+    for paragraph in doc.paragraphs:
+        if paragraph.text.strip():
+            elements += 1
+            yield paragraph.text.strip()
+    
+    # Extract tables
+    for table in doc.tables:
+        for row in table.rows:
+            row_text = []
+            for cell in row.cells:
+                if cell.text.strip():
+                    row_text.append(cell.text.strip())
+            if row_text:
+                elements += 1
+                yield " | ".join(row_text)
+    
+    if not elements:
+        raise ExtractionError("No readable content found in DOCX")
+    
+    logger.info(f"DOCX extraction: {elements} elements")
+
+def detect_text_encoding(file_path):
+    """Return the first supported encoding that decodes the whole file to non-blank text"""
+    encodings = ['utf-8', 'utf-16', 'utf-8-sig', 'latin-1', 'cp1252']
     
-    try:
-        # Validate file size
-        size_ok, error = validate_file_size(docx_path, 'document')
-        if not size_ok:
-            return "", error
-        
-        doc = docx.Document(docx_path)
-        text_parts = []
-        
-        # Extract paragraphs
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                text_parts.append(paragraph.text.strip())
-        
-        # Extract tables
-        for table in doc.tables:
-            for row in table.rows:
-                row_text = []
-                for cell in row.cells:
-                    if cell.text.strip():
-                        row_text.append(cell.text.strip())
-                if row_text:
-                    text_parts.append(" | ".join(row_text))
-        
-        if not text_parts:
-            return "", "No readable content found in DOCX"
-        
-        extracted_text = "\n\n".join(text_parts)
-        logger.info(f"DOCX extraction: {len(text_parts)} elements, {len(extracted_text)} characters")
-        
-        return extracted_text, None
-        
-    except Exception as e:
-        logger.error(f"Error extracting text from DOCX: {e}")
-        return "", f"DOCX extraction failed: {str(e)}"
+    for encoding in encodings:
+        try:
+            has_content = False
+            with open(file_path, 'r', encoding=encoding) as f:
+                while True:
+                    block = f.read(UPLOAD_BLOCK_SIZE)
+                    if not block:
+                        break
+                    has_content = has_content or bool(block.strip())
+            if has_content:
+                return encoding
+        except (UnicodeDecodeError, UnicodeError):
+            continue
+        except Exception as e:
+            logger.error(f"Error reading with {encoding}: {e}")
+            break
+    
+    return None
 
-def extract_text_from_text_file(file_path):
-    """Extract text from plain text files with encoding detection"""
+def iter_text_file_blocks(file_path):
+    """Yield decoded blocks of a plain text file, detecting the encoding first"""
     if not os.path.exists(file_path):
-        return "", f"Text file not found: {file_path}"
+        raise ExtractionError(f"Text file not found: {file_path}")
+    
+    # Validate file size
+    size_ok, error = validate_file_size(file_path, 'text')
+    if not size_ok:
+        raise ExtractionError(error)
+    
+    encoding = detect_text_encoding(file_path)
+    if not encoding:
+        raise ExtractionError("Could not read text file with any supported encoding")
+    
+    characters = 0
+    with open(file_path, 'r', encoding=encoding) as f:
+        while True:
+            block = f.read(UPLOAD_BLOCK_SIZE)
+            if not block:
+                break
+            characters += len(block)
+            yield block
     
+    logger.info(f"Text file read with {encoding}: {characters} characters")
+
+def join_blocks(blocks, separator="\n\n"):
+    """Yield blocks with separators between them, so the stream joins to the full text"""
+    first = True
+    for block in blocks:
+        if not first:
+            yield separator
+        first = False
+        yield block
+
+def iter_text_from_file(file_path, file_type=None):
+    """Stream the extracted text of a file as pieces that join to the full text
+
+    Raises ExtractionError when the file cannot be read.
+    """
+    if not file_type:
+        file_type = detect_file_type_from_path(file_path)
+    
+    if file_type == 'pdf':
+        pieces = join_blocks(iter_pdf_pages(file_path))
+    elif file_type == 'document':
+        pieces = join_blocks(iter_docx_blocks(file_path))
+    else:
+        pieces = iter_text_file_blocks(file_path)
+    
+    return strip_text_stream(pieces)
+
+def read_extracted_text(pieces, label):
+    """Collect a piece stream into (text, error) for the non-streaming extractors"""
     try:
-        # Validate file size
-        size_ok, error = validate_file_size(file_path, 'text')
-        if not size_ok:
-            return "", error
-        
-        # Try multiple encodings
-        encodings = ['utf-8', 'utf-16', 'utf-8-sig', 'latin-1', 'cp1252']
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                
-                if content and content.strip():
-                    logger.info(f"Text file read with {encoding}: {len(content)} characters")
-                    return content.strip(), None
-                    
-            except (UnicodeDecodeError, UnicodeError):
-                continue
-            except Exception as e:
-                logger.error(f"Error reading with {encoding}: {e}")
-                break
-        
-        return "", "Could not read text file with any supported encoding"
-        
+        return "".join(strip_text_stream(pieces)), None
+    except ExtractionError as e:
+        return "", str(e)
     except Exception as e:
-        logger.error(f"Error processing text file: {e}")
-        return "", f"Text file processing failed: {str(e)}"
+        logger.error(f"Error extracting text from {label}: {e}")
+        return "", f"{label} extraction failed: {str(e)}"
+
+def extract_text_from_pdf(pdf_path, parallel=None):
+    """Extract text from PDF using PyMuPDF"""
+    return read_extracted_text(join_blocks(iter_pdf_pages(pdf_path, parallel)), 'PDF')
+
+def extract_text_from_docx(docx_path):
+    """Extract text from DOCX using python-docx"""
+    return read_extracted_text(join_blocks(iter_docx_blocks(docx_path)), 'DOCX')
+
+def extract_text_from_text_file(file_path):
+    """Extract text from plain text files with encoding detection"""
+    return read_extracted_text(iter_text_file_blocks(file_path), 'Text file')
 
 
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 
-def detect_headings_and_structure(text: str) -> List[Dict[str, Any]]:
-    """
-    Detect headings and create slide structure from text content
-    Returns a list of slide dictionaries with content and metadata
+# Heading detection: every line is classified once, with precompiled patterns,
+# by a generator that can run over any iterable of lines
+MARKDOWN_HEADING = re.compile(r'(#+)\s*(.*)')
+NUMBERED_HEADING = re.compile(r'\d+\.\s+(?=[A-Z])')
+ROMAN_HEADING = re.compile(r'[IVX]+\.\s+(?=[A-Z])')
+MIN_HEADING_CONFIDENCE = 0.6
+
+HEADING_PROFILES = {
+    # The original rule set
+    'basic': {
+        'caps_words': (2, 8),
+        'colon_words': (2, 10),
+        'strict': False,          # extra digit/timestamp guards on caps and colon lines
+        'title_case': False,
+        'confidence': {'markdown': 0.95, 'caps': 0.7, 'colon': 0.6, 'numbered': 0.8, 'roman': 0.75},
+        'min_gap': 3,             # headings closer than this many lines compete
+        'min_section_words': 0    # headings with fewer words of body since the last one compete
+    },
+    # Tighter rules plus title-case lines; used for slide splitting
+    'enhanced': {
+        'caps_words': (3, 8),
+        'colon_words': (3, 10),
+        'strict': True,
+        'title_case': True,
+        'confidence': {'markdown': 0.95, 'caps': 0.75, 'colon': 0.65, 'numbered': 0.85, 'roman': 0.8,
+                       'title_case': 0.6},
+        'min_gap': 5,
+        'min_section_words': 20
+    }
+}
+
+
+def count_words(line, limit):
+    """Number of words in line, or limit + 1 if it has more"""
+    return len(line.split(None, limit))
+
+
+def is_title_case_line(line):
+    """Two to eight words, mostly capitalised, not ending a sentence"""
+    words = line.split(None, 8)
+    return 2 <= len(words) <= 8 and sum(1 for word in words if word[0].isupper()) >= len(words) * 0.7
+
+
+def scan_heading_candidates(lines: Iterable[str], profile: str = 'enhanced') -> Iterator[Dict[str, Any]]:
+    """Yield candidate headings from an iterable of lines in a single pass.
+
+    Each candidate carries gap_words, the words on the lines since the previous
+    candidate. Counting stops once it reaches the profile's min_section_words,
+    so body lines are only split until a section is known to be long enough.
+    A title-case candidate needs one line of lookahead (the next line must be
+    blank or start in lower case), so it is held until that line arrives.
     """
-    lines = text.split('\n')
-    headings = []
-    
-    # First pass: detect all potential headings
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line or len(line) < 3:
+    rules = HEADING_PROFILES[profile]
+    confidence = rules['confidence']
+    caps_min, caps_max = rules['caps_words']
+    colon_min, colon_max = rules['colon_words']
+    strict = rules['strict']
+    title_case = rules['title_case']
+    word_limit = max(caps_max, colon_max)
+    word_cap = rules['min_section_words']
+
+    pending = None
+    gap = 0
+
+    for i, raw_line in enumerate(lines):
+        line = raw_line.strip()
+
+        if pending is not None:
+            if not line or not line[0].isupper():
+                yield pending
+                gap = 0
+            else:
+                gap += pending['word_count']
+            pending = None
+
+        if len(line) < 3:
+            if line and gap < word_cap:
+                gap += 1
             continue
-            
-        heading_info = None
-        
-        # 1. Markdown headings (# ## ###)
-        if line.startswith('#'):
-            level = len(line) - len(line.lstrip('#'))
-            title = line.lstrip('#').strip()
-            if title and level <= 4:  # Only up to #### 
-                heading_info = {
-                    'line_number': i,
-                    'level': level,
-                    'title': title,
-                    'type': 'markdown',
-                    'confidence': 0.95
-                }
-        
-        # 2. ALL CAPS lines (potential headings)
-        elif (line.isupper() and 
-              len(line.split()) <= 8 and 
-              len(line.split()) >= 2 and
+
+        heading = None
+        first = line[0]
+
+        if first.islower() and not line.endswith(':'):
+            # Ordinary body text; only colon headings may start in lower case
+            pass
+
+        elif first == '#':
+            match = MARKDOWN_HEADING.match(line)
+            level = len(match.group(1))
+            title = match.group(2).strip()
+            if title and level <= 4:
+                heading = ('markdown', level, title)
+
+        elif (line.isupper() and
               not line.endswith('.') and
-              not line.startswith('HTTP')):
-            heading_info = {
-                'line_number': i,
-                'level': 2,
-                'title': line.title(),
-                'type': 'caps',
-                'confidence': 0.7
-            }
-        
-        # 3. Lines ending with colon (section headers)
-        elif (line.endswith(':') and 
-              len(line.split()) <= 10 and 
-              len(line.split()) >= 2 and
-              not line.lower().startswith('http')):
-            heading_info = {
-                'line_number': i,
-                'level': 3,
-                'title': line[:-1].strip(),
-                'type': 'colon',
-                'confidence': 0.6
-            }
-        
-        # 4. Numbered sections (1. 2. etc.)
-        elif re.match(r'^\d+\.\s+[A-Z]', line):
-            heading_info = {
-                'line_number': i,
-                'level': 2,
-                'title': re.sub(r'^\d+\.\s+', '', line),
-                'type': 'numbered',
-                'confidence': 0.8
-            }
-        
-        # 5. Roman numerals (I. II. III.)
-        elif re.match(r'^[IVX]+\.\s+[A-Z]', line):
-            heading_info = {
-                'line_number': i,
-                'level': 2,
-                'title': re.sub(r'^[IVX]+\.\s+', '', line),
-                'type': 'roman',
-                'confidence': 0.75
-            }
-        
-        if heading_info:
-            headings.append(heading_info)
-    
-    # Filter and validate headings
-    valid_headings = filter_valid_headings(headings, lines)
-    
-
-    
-
-def filter_valid_headings(headings: List[Dict], lines: List[str]) -> List[Dict]:
-    """Filter out false positive headings"""
-    if not headings:
-        return []
-    
-    # Remove headings that are too close together (likely false positives)
-    filtered = []
-    for i, heading in enumerate(headings):
-        if i == 0:
-            filtered.append(heading)
-            continue
-        
-        prev_heading = filtered[-1]
-        line_diff = heading['line_number'] - prev_heading['line_number']
-        
-        # Skip if headings are too close (less than 3 lines apart)
-        if line_diff < 3:
-            # Keep the one with higher confidence
-            if heading['confidence'] > prev_heading['confidence']:
-                filtered[-1] = heading
+              not line.startswith('HTTP') and
+              not (strict and line.isdigit()) and
+              caps_min <= count_words(line, word_limit) <= caps_max):
+            heading = ('caps', 2, line.title())
+
+        elif (line.endswith(':') and
+              not line[:4].lower() == 'http' and
+              not (strict and any(char.isdigit() for char in line[:3])) and  # Not time stamps
+              colon_min <= count_words(line, word_limit) <= colon_max):
+            heading = ('colon', 3, line[:-1].strip())
+
+        elif first.isdigit() and (match := NUMBERED_HEADING.match(line)):
+            heading = ('numbered', 2, line[match.end():])
+
+        elif first in 'IVX' and (match := ROMAN_HEADING.match(line)):
+            heading = ('roman', 2, line[match.end():])
+
+        elif title_case and first.isupper() and not line.endswith('.') and is_title_case_line(line):
+            heading = ('title_case', 2, line)
+
+        if heading is None:
+            if gap < word_cap:
+                gap += count_words(line, word_cap)
             continue
-        
-        filtered.append(heading)
-    
-    return filtered
 
+        kind, level, title = heading
+        found = {
+            'line_number': i,
+            'level': level,
+            'title': title,
+            'type': kind,
+            'confidence': confidence[kind],
+            'gap_words': gap,
+            'word_count': count_words(line, word_cap) if word_cap else 0
+        }
+        if kind == 'title_case':
+            pending = found
+        else:
+            yield found
+            gap = 0
 
+    if pending is not None:
+        yield pending
 
 
-def detect_headings_and_structure_enhanced(text):
+def iter_headings(lines: Iterable[str], profile: str = 'enhanced') -> Iterator[Dict[str, Any]]:
+    """Lazily yield validated headings from an iterable of lines.
+
+    A candidate that sits too close to the previous heading, or leaves too
+    little body text after it, competes with it and the more confident one is
+    kept. Headings are yielded as soon as the next one is accepted.
     """
-    Enhanced heading detection with better accuracy and slide creation
+    rules = HEADING_PROFILES[profile]
+    min_gap = rules['min_gap']
+    min_section_words = rules['min_section_words']
+
+    kept = None
+    words_since_kept = 0
+    for heading in scan_heading_candidates(lines, profile):
+        if kept is not None:
+            body_words = words_since_kept + heading['gap_words']
+            if heading['line_number'] - kept['line_number'] < min_gap or body_words < min_section_words:
+                if heading['confidence'] > kept['confidence']:
+                    kept = heading
+                    words_since_kept = 0
+                else:
+                    words_since_kept = body_words + heading['word_count']
+                continue
+            yield kept
+        kept = heading
+        words_since_kept = 0
+
+    if kept is not None:
+        yield kept
+
+
+def detect_headings(lines: Iterable[str], profile: str = 'enhanced') -> List[Dict[str, Any]]:
+    """All validated headings; low-confidence ones are dropped when there are plenty"""
+    headings = list(iter_headings(lines, profile))
+    if len(headings) > 3:
+        headings = [h for h in headings if h['confidence'] >= MIN_HEADING_CONFIDENCE]
+    return headings
+
+
+def detect_headings_and_structure(text: str, profile: str = 'basic') -> List[Dict[str, Any]]:
+    """
+    Detect headings and create slide structure from text content
+    Returns a list of slide dictionaries with content and metadata
     """
+    started = time.perf_counter()
     lines = text.split('\n')
-    headings = []
-    
-    # First pass: detect all potential headings with confidence scores
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line or len(line) < 3:
-            continue
-            
-        heading_info = None
-        
-        # 1. Markdown headings (# ## ### ####)
-        if line.startswith('#'):
-            level = len(line) - len(line.lstrip('#'))
-            title = line.lstrip('#').strip()
-            if title and level <= 4:
-                heading_info = {
-                    'line_number': i,
-                    'level': level,
-                    'title': title,
-                    'type': 'markdown',
-                    'confidence': 0.95
-                }
-        
-        # 2. ALL CAPS lines (section headers)
-        elif (line.isupper() and 
-              3 <= len(line.split()) <= 8 and 
-              not line.endswith('.') and
-              not line.startswith('HTTP') and
-              not line.isdigit()):
-            heading_info = {
-                'line_number': i,
-                'level': 2,
-                'title': line.title(),
-                'type': 'caps',
-                'confidence': 0.75
-            }
-        
-        # 3. Lines ending with colon (section headers)
-        elif (line.endswith(':') and 
-              3 <= len(line.split()) <= 10 and
-              not line.lower().startswith('http') and
-              not any(char.isdigit() for char in line[:3])):  # Not time stamps
-            heading_info = {
-                'line_number': i,
-                'level': 3,
-                'title': line[:-1].strip(),
-                'type': 'colon',
-                'confidence': 0.65
-            }
-        
-        # 4. Numbered sections (1. 2. I. II. etc.)
-        elif re.match(r'^\d+\.\s+[A-Z]', line):
-            heading_info = {
-                'line_number': i,
-                'level': 2,
-                'title': re.sub(r'^\d+\.\s+', '', line),
-                'type': 'numbered',
-                'confidence': 0.85
-            }
-        
-        # 5. Roman numerals (I. II. III.)
-        elif re.match(r'^[IVX]+\.\s+[A-Z]', line):
-            heading_info = {
-                'line_number': i,
-                'level': 2,
-                'title': re.sub(r'^[IVX]+\.\s+', '', line),
-                'type': 'roman',
-                'confidence': 0.8
-            }
-        
-        # 6. Lines that look like titles (standalone, properly capitalized)
-        elif (len(line.split()) >= 2 and 
-              len(line.split()) <= 8 and
-              line[0].isupper() and
-              not line.endswith('.') and
-              sum(1 for word in line.split() if word[0].isupper()) >= len(line.split()) * 0.7):
-            # Check if next line is empty or content starts (not another potential heading)
-            next_line = lines[i + 1].strip() if i + 1 < len(lines) else ""
-            if not next_line or (next_line and not next_line[0].isupper()):
-                heading_info = {
-                    'line_number': i,
-                    'level': 2,
-                    'title': line,
-                    'type': 'title_case',
-                    'confidence': 0.6
-                }
-        
-        if heading_info:
-            headings.append(heading_info)
-    
-    # Filter out false positives
-    valid_headings = filter_false_positives(headings, lines)
-    
-    if not valid_headings:
+    headings = detect_headings(lines, profile)
+    logger.debug(f"Detected {len(headings)} headings in {len(lines)} lines "
+                 f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    if not headings:
         # No clear headings found, use content-based sliding
         return create_slides_from_content_chunks(text)
-    
+
     # Create slides from validated headings
-    return create_slides_from_validated_headings(text, valid_headings)
+    return create_slides_from_validated_headings(text, headings, lines)
+
+
+def detect_headings_and_structure_enhanced(text):
+    """
+    Enhanced heading detection with better accuracy and slide creation
+    """
+    return detect_headings_and_structure(text, profile='enhanced')
 
-def filter_false_positives(headings, lines):
-    """Remove likely false positive headings"""
-    if not headings:
-        return []
-    
-    filtered = []
-    
-    # Remove headings that are too close together
-    for i, heading in enumerate(headings):
-        if i == 0:
-            filtered.append(heading)
-            continue
-        
-        prev_heading = filtered[-1]
-        line_diff = heading['line_number'] - prev_heading['line_number']
-        
-        # Skip if headings are too close (less than 5 lines apart)
-        if line_diff < 5:
-            # Keep the one with higher confidence
-            if heading['confidence'] > prev_heading['confidence']:
-                filtered[-1] = heading
-            continue
-        
-        # Skip if the content between headings is too short
-        content_lines = lines[prev_heading['line_number']+1:heading['line_number']]
-        content_text = '\n'.join(content_lines).strip()
-        if len(content_text.split()) < 20:  # Less than 20 words
-            if heading['confidence'] > prev_heading['confidence']:
-                filtered[-1] = heading
-            continue
-        
-        filtered.append(heading)
-    
-    # Remove headings with very low confidence if we have enough others
-    if len(filtered) > 3:
-        filtered = [h for h in filtered if h['confidence'] >= 0.6]
-    
-    return filtered
 
-def create_slides_from_validated_headings(text, headings):
+BULLET_LINE = re.compile(r'^[ \t]*(?:[-*•]|\d+[.)])[ \t]', re.MULTILINE)
+
+
+def determine_layout_from_content_enhanced(content, level, word_count=None):
+    """Pick a slide layout for a section from the shape of its body text"""
+    if word_count is None:
+        word_count = len(content.split())
+
+    if len(BULLET_LINE.findall(content)) >= 3:
+        return 'titleAndBullets'
+    if content.count('\n') <= 1 and content[:1] in '"“':
+        return 'quote'
+    if level <= 1 and word_count < 40:
+        return 'titleOnly'
+    return 'imageAndParagraph'
+
+def create_slides_from_validated_headings(text, headings, lines=None):
     """Create optimized slides from validated headings"""
-    lines = text.split('\n')
+    if lines is None:
+        lines = text.split('\n')
     slides = []
     
     # Add title slide if document starts with substantial content before first heading
@@ -560,11 +838,12 @@ def create_slides_from_validated_headings(text, headings):
         content = '\n'.join(content_lines).strip()
         
         # Skip if content is too short
-        if len(content.split()) < 15:
+        word_count = len(content.split())
+        if word_count < 15:
             continue
         
         # Determine the best layout for this content
-        layout = determine_layout_from_content_enhanced(content, heading['level'])
+        layout = determine_layout_from_content_enhanced(content, heading['level'], word_count)
         
         slides.append({
             'title': heading['title'],
@@ -575,7 +854,7 @@ def create_slides_from_validated_headings(text, headings):
             'confidence': heading['confidence'],
             'is_heading': True,
             'source_lines': (start_line, end_line),
-            'word_count': len(content.split())
+            'word_count': word_count
         })
     
     # Add conclusion slide if there's substantial content after the last heading
@@ -734,7 +1013,7 @@ def expand_slides(slides, original_text):
 def consolidate_slides(slides):
     """Consolidate slides when we have too many"""
     # Sort by word count and merge smallest ones
-    slides_with_size = [(slide, len(slide['content'].split())) for slide in slides]
+    slides_with_size = [(slide, slide.get('word_count') or len(slide['content'].split())) for slide in slides]
     slides_with_size.sort(key=lambda x: x[1])  # Sort by word count
     
     consolidated = []
@@ -826,15 +1105,7 @@ def extract_title_from_content(content: str) -> str:
 def extract_text_from_file(file_path, file_type=None):
     """Universal text extraction based on file type"""
     if not file_type:
-        # Auto-detect based on extension
-        ext = file_path.lower().rsplit('.', 1)[-1] if '.' in file_path else ''
-        
-        if ext == 'pdf':
-            file_type = 'pdf'
-        elif ext in ['docx', 'doc']:
-            file_type = 'document'
-        else:
-            file_type = 'text'
+        file_type = detect_file_type_from_path(file_path)
     
     # Route to appropriate extractor
     if file_type == 'pdf':
@@ -862,6 +1133,10 @@ def analyze_text_content(text):
     sentences = len(re.findall(r'[.!?]+', text))
     paragraphs = len([p for p in text.split('\n\n') if p.strip()])
     
+    return summarize_text_metrics(chars, words, sentences, paragraphs)
+
+def summarize_text_metrics(chars, words, sentences, paragraphs):
+    """Build the analysis dict, including the slide count suggestion, from raw counts"""
     # Smart slide suggestion
     if words < 100:
         suggested_slides = 3
@@ -887,8 +1162,199 @@ def analyze_text_content(text):
         'readability': 'high' if words > 500 else 'medium' if words > 100 else 'low'
     }
 
+class TextStats:
+    """analyze_text_content computed incrementally over a stream of text pieces
+
+    Text is counted a paragraph run at a time: words and sentence punctuation
+    never span a paragraph break, so cutting there gives the same totals.
+    """
+
+    def __init__(self):
+        self.chars = 0
+        self.words = 0
+        self.sentences = 0
+        self.paragraphs = 0
+        self._pending = []
+        self._last_char = ''
+
+    def feed(self, piece):
+        if not piece:
+            return
+        self.chars += len(piece)
+        self._pending.append(piece)
+        
+        # Include the previous character so a break split across pieces is found
+        window = self._last_char + piece
+        self._last_char = piece[-1]
+        cut = window.rfind('\n\n')
+        if cut == -1:
+            return
+        
+        text = ''.join(self._pending)
+        cut += len(text) - len(window)
+        self._count(text[:cut])
+        self._pending = [text[cut + 2:]]
+        self._last_char = text[-1] if cut + 2 < len(text) else ''
+
+    def _count(self, text):
+        self.words += len(text.split())
+        self.sentences += len(re.findall(r'[.!?]+', text))
+        self.paragraphs += len([p for p in text.split('\n\n') if p.strip()])
+
+    def finish(self):
+        if not self.chars:
+            return analyze_text_content('')
+        self._count(''.join(self._pending))
+        self._pending = []
+        return summarize_text_metrics(self.chars, self.words, self.sentences, self.paragraphs)
+
+def get_extraction_cache():
+    """Return the shared on-disk extraction cache, creating it on first use"""
+    global _extraction_cache
+    if _extraction_cache is None:
+        _extraction_cache = DiskLRUCache(EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_MB * 1024 * 1024)
+    return _extraction_cache
+
+def is_document_id(value):
+    return isinstance(value, str) and DOCUMENT_ID_PATTERN.fullmatch(value) is not None
+
+def document_cache_key(document_id):
+    return f"{document_id}-v{EXTRACTION_CACHE_VERSION}"
+
+def pack_document_entry(meta, text_blob, chunks_blob):
+    """One cache entry per document, so its parts can never be evicted separately"""
+    meta_blob = json.dumps(meta).encode('utf-8')
+    return struct.pack('>II', len(meta_blob), len(text_blob)) + meta_blob + bytes(text_blob) + bytes(chunks_blob)
+
+def load_document_entry(document_id):
+    """Return (meta, compressed text, compressed chunks) for a cached extraction, or None"""
+    if not is_document_id(document_id):
+        return None
+    blob = get_extraction_cache().get(document_cache_key(document_id))
+    if blob is None:
+        return None
+    try:
+        meta_length, text_length = struct.unpack_from('>II', blob)
+        text_start = 8 + meta_length
+        meta = json.loads(blob[8:text_start])
+        return meta, blob[text_start:text_start + text_length], blob[text_start + text_length:]
+    except (struct.error, ValueError) as e:
+        logger.warning(f"Ignoring unreadable cached document {document_id[:12]}: {e}")
+        return None
+
+def save_upload(file, file_path, limit=None):
+    """Copy an uploaded file to disk in blocks, hashing it on the way
+
+    Returns (sha256 hex, None), or (None, error) as soon as the copy passes
+    limit bytes, so oversized uploads are rejected without being read in full.
+    """
+    digest = hashlib.sha256()
+    written = 0
+    with open(file_path, 'wb') as out:
+        while True:
+            block = file.stream.read(UPLOAD_BLOCK_SIZE)
+            if not block:
+                break
+            written += len(block)
+            if limit is not None and written > limit:
+                break
+            digest.update(block)
+            out.write(block)
+    
+    if limit is not None and written > limit:
+        os.remove(file_path)
+        return None, f"File exceeds the {limit / (1024 * 1024):.1f}MB limit"
+    return digest.hexdigest(), None
+
+def ingest_document(document_id, file_path, file_type, filename):
+    """Extract, analyze and chunk a saved upload in one streaming pass and store it
+
+    Text and chunks are compressed as they are produced, so the full text is
+    never held in memory uncompressed. Returns (meta, head text, compressed
+    text, compressed chunks).
+    
+    The stages interleave, so each one's share of the pass is timed separately
+    and recorded as its own span once the pass is done.
+    """
+    codec = blob_codec.DOCUMENT_COMPRESSION
+    stats = TextStats()
+    text_compressor = blob_codec.compressobj(codec)
+    text_blob = bytearray()
+    head = []
+    head_length = 0
+    timings = {'extract': 0.0, 'analyze': 0.0, 'compress': 0.0}
+    
+    def extract(pieces):
+        pieces = iter(pieces)
+        while True:
+            started = time.perf_counter()
+            piece = next(pieces, None)
+            timings['extract'] += time.perf_counter() - started
+            if piece is None:
+                return
+            yield piece
+    
+    def observe(pieces):
+        nonlocal head_length
+        for piece in pieces:
+            started = time.perf_counter()
+            stats.feed(piece)
+            analyzed = time.perf_counter()
+            text_blob.extend(text_compressor.compress(piece.encode('utf-8')))
+            timings['analyze'] += analyzed - started
+            timings['compress'] += time.perf_counter() - analyzed
+            if head_length < EXTRACTED_LOG_CHARS:
+                head.append(piece[:EXTRACTED_LOG_CHARS - head_length])
+                head_length += len(head[-1])
+            yield piece
+    
+    started = time.perf_counter()
+    chunks_compressor = blob_codec.compressobj(codec)
+    chunks_blob = bytearray()
+    chunk_count = 0
+    for chunk in iter_chunks(observe(extract(iter_text_from_file(file_path, file_type)))):
+        compress_started = time.perf_counter()
+        chunks_blob.extend(chunks_compressor.compress(blob_codec.encode_lines([chunk])))
+        chunk_count += 1
+        timings['compress'] += time.perf_counter() - compress_started
+    text_blob.extend(text_compressor.flush())
+    chunks_blob.extend(chunks_compressor.flush())
+    elapsed = time.perf_counter() - started
+    
+    analysis = stats.finish()
+    tracing.record('document.extract', timings['extract'], file_type=file_type, chars=analysis['chars'])
+    tracing.record('document.analyze', timings['analyze'])
+    tracing.record('document.chunk', elapsed - sum(timings.values()), chunks=chunk_count)
+    tracing.record('document.compress', timings['compress'], codec=codec,
+                   stored_bytes=len(text_blob) + len(chunks_blob))
+    if analysis['chars'] < MIN_CONTENT_LENGTH:
+        raise ExtractionError("Could not extract meaningful text from file")
+    
+    head_text = ''.join(head)
+    meta = {
+        'id': document_id,
+        'codec': codec,
+        'analysis': analysis,
+        'chunk_count': chunk_count,
+        'file_type': file_type,
+        'original_filename': filename,
+        'preview': head_text[:DOCUMENT_PREVIEW_CHARS]
+    }
+    
+    get_extraction_cache().put(document_cache_key(document_id), pack_document_entry(meta, text_blob, chunks_blob))
+    
+    logger.info(
+        f"Ingested {filename}: {analysis['chars']} characters, {chunk_count} chunks, "
+        f"{len(text_blob) + len(chunks_blob)} bytes stored"
+    )
+    return meta, head_text, bytes(text_blob), bytes(chunks_blob)
+
 def process_uploaded_file(file, temp_dir):
-    """Process uploaded file and extract text content"""
+    """Process uploaded file and extract text content
+    
+    Returns the upload's content hash with stats and the compressed text and
+    chunks rather than the text itself; they are also cached under that hash.
+    """
     try:
         # Validate file
         is_valid, result = validate_file(file)
@@ -902,52 +1368,58 @@ def process_uploaded_file(file, temp_dir):
         if not filename:
             return None, "Invalid filename"
         
-        # Create unique filename to avoid conflicts
-        file_hash = hashlib.md5(filename.encode()).hexdigest()[:8]
-        safe_filename = f"{file_hash}_{filename}"
-        file_path = os.path.join(temp_dir, safe_filename)
-        
         # Ensure temp directory exists
         os.makedirs(temp_dir, exist_ok=True)
         
-        # Save uploaded file
-        file.save(file_path)
-        
-        # Extract text
-        extracted_text, error = extract_text_from_file(file_path, file_type)
-        
-        # Clean up
-        try:
-            os.remove(file_path)
-        except:
-            pass
-        
+        # Save uploaded file, hashing it on the way so identical uploads hit the cache
+        file_path = os.path.join(temp_dir, f"upload_{filename}")
+        limit = FILE_SIZE_LIMITS.get(file_type, MAX_FILE_SIZE_MB * 1024 * 1024)
+        with tracing.span('upload.save', file_type=file_type):
+            content_hash, error = save_upload(file, file_path, limit)
         if error:
             return None, error
         
-        if not extracted_text or len(extracted_text.strip()) < MIN_CONTENT_LENGTH:
-            return None, "Could not extract meaningful text from file"
-        
-        # Analyze content
-        analysis = analyze_text_content(extracted_text)
-                # Log extracted text to a file
         try:
-            log_dir = os.path.join(temp_dir, "logs")
-            os.makedirs(log_dir, exist_ok=True)
-            
-            log_filename = os.path.join(log_dir, "extracted_text.log")
-            with open(log_filename, "a", encoding="utf-8") as log_file:
-                log_file.write(f"\n----- {datetime.now()} - {filename} -----\n")
-                log_file.write(extracted_text[:5000])  # Limit to first 5000 chars to avoid overload
-                log_file.write("\n\n")
-        except Exception as log_error:
-            logger.warning(f"Failed to log extracted text: {log_error}")
+            entry = load_document_entry(content_hash)
+            cached = entry is not None and entry[0]['file_type'] == file_type
+            if cached:
+                meta, text_blob, chunks_blob = entry
+                logger.info(f"♻️ Extraction cache hit for {filename} ({content_hash[:12]})")
+            else:
+                meta, head_text, text_blob, chunks_blob = ingest_document(content_hash, file_path, file_type, filename)
+        except ExtractionError as e:
+            return None, str(e)
+        finally:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+        
+        if not cached:
+            # Log extracted text to a file
+            try:
+                log_dir = os.path.join(temp_dir, "logs")
+                os.makedirs(log_dir, exist_ok=True)
+                
+                log_filename = os.path.join(log_dir, "extracted_text.log")
+                with open(log_filename, "a", encoding="utf-8") as log_file:
+                    log_file.write(f"\n----- {datetime.now()} - {filename} -----\n")
+                    log_file.write(head_text)  # Limited to the first EXTRACTED_LOG_CHARS to avoid overload
+                    log_file.write("\n\n")
+            except Exception as log_error:
+                logger.warning(f"Failed to log extracted text: {log_error}")
 
         return {
-            'text': extracted_text,
-            'analysis': analysis,
+            'document_id': content_hash,
+            'analysis': meta['analysis'],
+            'chunk_count': meta['chunk_count'],
+            'preview': meta['preview'],
             'file_type': file_type,
-            'original_filename': filename
+            'original_filename': filename,
+            'cached': cached,
+            'codec': meta['codec'],
+            'text_blob': text_blob,
+            'chunks_blob': chunks_blob
         }, None
         
     except Exception as e:
@@ -0,0 +1,286 @@
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from itertools import count
+
+from flask import g, request, session
+
+logger = logging.getLogger(__name__)
+
+# Finished traces are appended here one JSON object per line; unset or empty disables the file
+TRACE_FILE = os.environ.get('TRACE_FILE', '')
+# The file is rotated to TRACE_FILE.1 once it grows past this many bytes
+TRACE_FILE_MAX_BYTES = int(os.environ.get('TRACE_FILE_MAX_BYTES', 50 * 1024 * 1024))
+# Recent traces kept in memory for the traces endpoint
+TRACE_HISTORY = int(os.environ.get('TRACE_HISTORY', 200))
+# Spans kept per trace; a runaway loop should not grow a trace without bound
+TRACE_MAX_SPANS = int(os.environ.get('TRACE_MAX_SPANS', 2000))
+
+REQUEST_ID_HEADER = 'X-Request-Id'
+# Client-supplied ids are only honoured when they look like ids, and are namespaced
+# so they can never name a server-generated trace such as a job's
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+CLIENT_REQUEST_ID_PREFIX = 'client-'
+
+# (trace, parent span id) for the code running in this context
+_current = contextvars.ContextVar('trace', default=(None, None))
+
+_recent = OrderedDict()
+_recent_lock = threading.Lock()
+_in_flight = set()  # client ids of traces still running
+_file_lock = threading.Lock()
+
+
+class Trace:
+    """Spans recorded for one request or job, in the order they finished"""
+
+    def __init__(self, request_id, name, user_id=None):
+        self.request_id = request_id
+        self.name = name
+        self.user_id = user_id
+        self.started_at = time.time()
+        self.finished = False
+        self.duration_ms = None
+        self.spans = []
+        self.dropped = 0
+        self._start = time.perf_counter()
+        self._ids = count(1)
+        self._lock = threading.Lock()
+
+    def offset_ms(self, at):
+        return round((at - self._start) * 1000, 3)
+
+    def next_span_id(self):
+        return next(self._ids)
+
+    def add(self, span):
+        with self._lock:
+            if len(self.spans) >= TRACE_MAX_SPANS:
+                self.dropped += 1
+                return
+            self.spans.append(span)
+            first = len(self.spans) == 1
+        if first:
+            # Only traces that recorded something are worth listing
+            _remember(self)
+
+    def summary(self):
+        return {
+            'request_id': self.request_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': self.duration_ms,
+            'finished': self.finished,
+            'span_count': len(self.spans)
+        }
+
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+        data = self.summary()
+        data['spans'] = spans
+        if self.dropped:
+            data['dropped_spans'] = self.dropped
+        return data
+
+
+class Span:
+    """Handle yielded by span() so the timed code can attach attributes"""
+
+    def __init__(self, attrs):
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+def current_trace():
+    return _current.get()[0]
+
+
+def current_request_id():
+    trace = current_trace()
+    return trace.request_id if trace else None
+
+
+def begin(name, request_id=None, user_id=None):
+    """Create a trace and make it current; returns (trace, token) for end()"""
+    trace = Trace(request_id or new_request_id(), name, user_id=user_id)
+    return trace, _current.set((trace, None))
+
+
+def end(trace, token=None):
+    if token is not None:
+        _current.reset(token)
+    finish(trace)
+
+
+@contextmanager
+def traced(name, request_id=None, user_id=None):
+    """Run the block under a new trace, finishing it on the way out"""
+    active, token = begin(name, request_id, user_id)
+    try:
+        yield active
+    finally:
+        end(active, token)
+
+
+def finish(trace):
+    """Close a trace once and append it to TRACE_FILE if it recorded any spans"""
+    with trace._lock:
+        if trace.finished:
+            return
+        trace.finished = True
+        trace.duration_ms = trace.offset_ms(time.perf_counter())
+    with _recent_lock:
+        _in_flight.discard(trace.request_id)
+    if trace.spans and TRACE_FILE:
+        _write(trace.to_dict())
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time the block as a span of the current trace; a no-op outside of one"""
+    handle = Span(attrs)
+    trace, parent = _current.get()
+    if trace is None:
+        yield handle
+        return
+
+    span_id = trace.next_span_id()
+    token = _current.set((trace, span_id))
+    started = time.perf_counter()
+    try:
+        yield handle
+    except BaseException as e:
+        handle.set(error=type(e).__name__)
+        raise
+    finally:
+        _current.reset(token)
+        trace.add(_span_record(trace, span_id, parent, name, started, time.perf_counter(), handle.attrs))
+
+
+def record(name, seconds, **attrs):
+    """Add a span measured by the caller that ended just now"""
+    trace, parent = _current.get()
+    if trace is None:
+        return
+    ended = time.perf_counter()
+    trace.add(_span_record(trace, trace.next_span_id(), parent, name, ended - seconds, ended, attrs))
+
+
+def bind(fn):
+    """Wrap fn so it runs in the caller's trace and span from any thread"""
+    captured = _current.get()
+    if captured[0] is None:
+        return fn
+
+    @wraps(fn)
+    def bound(*args, **kwargs):
+        token = _current.set(captured)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return bound
+
+
+def get_trace(request_id):
+    with _recent_lock:
+        return _recent.get(request_id)
+
+
+def recent_traces(user_id=None):
+    """Summaries of the kept traces, newest first, optionally for one user"""
+    with _recent_lock:
+        traces = list(_recent.values())
+    return [t.summary() for t in reversed(traces) if user_id is None or t.user_id == user_id]
+
+
+def init_app(app):
+    """Trace every request under an X-Request-Id, echoed back on the response"""
+
+    @app.before_request
+    def start_request_trace():
+        request_id = _client_request_id(request.headers.get(REQUEST_ID_HEADER, ''))
+        name = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        g.trace, g.trace_token = begin(name, request_id, user_id=session.get('user_id'))
+
+    @app.after_request
+    def attach_request_id(response):
+        trace = g.get('trace')
+        if trace is not None:
+            response.headers[REQUEST_ID_HEADER] = trace.request_id
+            if response.is_streamed:
+                # Streamed responses keep working after the view returns, so the
+                # trace is closed when the server closes the response body
+                response.call_on_close(lambda: finish(trace))
+            else:
+                finish(trace)
+        return response
+
+    @app.teardown_request
+    def leave_request_trace(exc):
+        token = g.pop('trace_token', None)
+        if token is not None:
+            _current.reset(token)
+        if exc is not None and g.get('trace') is not None:
+            finish(g.trace)
+
+
+def _span_record(trace, span_id, parent, name, started, ended, attrs):
+    record = {
+        'id': span_id,
+        'parent': parent,
+        'name': name,
+        'start_ms': trace.offset_ms(started),
+        'duration_ms': round((ended - started) * 1000, 3),
+        'thread': threading.current_thread().name
+    }
+    if attrs:
+        record['attrs'] = attrs
+    return record
+
+
+def _client_request_id(incoming):
+    # A namespaced client id, or None (a fresh id) if it is invalid or already in use
+    if not VALID_REQUEST_ID.match(incoming):
+        return None
+    request_id = CLIENT_REQUEST_ID_PREFIX + incoming
+    with _recent_lock:
+        if request_id in _recent or request_id in _in_flight:
+            return None
+        _in_flight.add(request_id)
+    return request_id
+
+
+def _remember(trace):
+    with _recent_lock:
+        _recent[trace.request_id] = trace
+        _recent.move_to_end(trace.request_id)
+        while len(_recent) > TRACE_HISTORY:
+            _recent.popitem(last=False)
+
+
+def _write(data):
+    try:
+        line = json.dumps(data, default=str)
+        with _file_lock:
+            if os.path.exists(TRACE_FILE) and os.path.getsize(TRACE_FILE) >= TRACE_FILE_MAX_BYTES:
+                os.replace(TRACE_FILE, TRACE_FILE + '.1')
+            with open(TRACE_FILE, 'a', encoding='utf-8') as out:
+                out.write(line + '\n')
+    except Exception as e:
+        logger.warning(f"Failed to write trace {data.get('request_id')}: {e}")